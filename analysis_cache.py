@@ -0,0 +1,135 @@
+"""
+Result cache for LLM analyses.
+
+Entries are keyed by a content hash of everything that determines the LLM
+result (see make_cache_key) and kept in an in-memory LRU with a TTL. When a
+SQLite path is configured, entries are written through to disk as well, so
+the cache survives restarts.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from sqlite_connection import ProcessConnection
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def normalize_requirements(requirements: List[str]) -> List[str]:
+    """Collapse whitespace, drop empty lines and duplicates, and sort."""
+    return sorted({" ".join(req.split()) for req in requirements if req.strip()})
+
+
+def make_cache_key(
+    cv_text: str,
+    requirements: List[str],
+    role: str,
+    model: str,
+    prompt_version: str,
+) -> str:
+    payload = json.dumps(
+        [cv_text, normalize_requirements(requirements), role, model, prompt_version],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 86400,
+        db_path: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        # key -> (created_at, JSON-encoded result)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.db_path = db_path
+        self._connection = ProcessConnection(db_path, SCHEMA) if db_path else None
+
+    @property
+    def _db(self) -> Optional[sqlite3.Connection]:
+        """The SQLite connection of this process, or None without a db_path."""
+        return self._connection.get() if self._connection is not None else None
+
+    def _expired(self, created_at: float) -> bool:
+        return time.time() - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, created_at: float, value: str) -> None:
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_from_db(self, key: str):
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT created_at, value FROM analysis_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if self._expired(row[0]):
+            self._db.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        return row
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return a fresh copy of the cached result, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                entry = self._load_from_db(key)
+                if entry is not None:
+                    self._remember(key, *entry)
+            else:
+                self._entries.move_to_end(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(entry[1])
+
+    def set(self, key: str, result: dict) -> None:
+        value = json.dumps(result, ensure_ascii=False)
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, value, created_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, value, created_at),
+                )
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "persistent": bool(self.db_path),
+            }
@@ -0,0 +1,108 @@
+"""
+Benchmark prompt size and LLM latency with and without context selection.
+
+Builds a corpus of long synthetic CVs, runs get_ai_analysis on each of them
+against the stub LLM server once with the whole CV in the prompt and once
+with the excerpts selected for CONTEXT_TOKEN_BUDGET, and reports prompt
+tokens and latency. The stub delay grows with the prompt (--latency-per-1k),
+as the prefill time of a real model does.
+
+    python -m bench.bench_context --pages 5 10 20 --budget 2000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from bench.load_test import REQUIREMENTS, SAMPLE_CV_LINES, _wait_until_up
+from bench.synthetic_pdf import LINES_PER_PAGE
+
+PROJECT_LINES = [
+    "Projekt: Rollout SAP IS-U Abrechnung für einen Netzbetreiber",
+    "Aufgaben: Customizing der Marktkommunikation nach GPKE und GeLi Gas",
+    "Entwicklung von ABAP Reports und Erweiterungen im Gerätemanagement",
+    "Moderation von Workshops zur Prozessaufnahme mit BPMN",
+    "Testmanagement und Koordination der Integrationstests",
+]
+
+FILLER_LINES = [
+    "Organisation des jährlichen Teamevents und interner Schulungen",
+    "Mitglied im Betriebssportverein, Schwerpunkt Laufen",
+    "Betreuung von Praktikanten und Werkstudierenden",
+    "Pflege der internen Wissensdatenbank und Dokumentationsvorlagen",
+    "Teilnahme an Konferenzen und Fachmessen",
+    "Ehrenamtliche Tätigkeit im örtlichen Verein",
+]
+
+
+def synthetic_cv(page_count: int, seed: int) -> str:
+    rng = random.Random(seed)
+    lines = list(SAMPLE_CV_LINES)
+    while len(lines) < page_count * LINES_PER_PAGE:
+        pool = PROJECT_LINES if rng.random() < 0.2 else FILLER_LINES
+        lines.append(rng.choice(pool) + f" ({2005 + rng.randrange(18)})")
+    return "\n".join(lines).lower()
+
+
+async def run(args) -> None:
+    import main
+
+    requirements = main.parse_requirements(REQUIREMENTS)
+    print(f"requirements={len(requirements)}  budget={args.budget} tokens")
+    for page_count in args.pages:
+        corpus = [synthetic_cv(page_count, seed) for seed in range(args.cvs)]
+        results = {}
+        for label, budget in (("full", 0), ("selected", args.budget)):
+            main.CONTEXT_TOKEN_BUDGET = budget
+            tokens_before = main.llm_gateway.prompt_tokens
+            latencies = []
+            for cv_text in corpus:
+                started = time.perf_counter()
+                await main.get_ai_analysis(cv_text, requirements, use_cache=False)
+                latencies.append(time.perf_counter() - started)
+            prompt_tokens = (main.llm_gateway.prompt_tokens - tokens_before) / len(corpus)
+            results[label] = (prompt_tokens, statistics.median(latencies))
+        (full_tokens, full_latency), (sel_tokens, sel_latency) = results["full"], results["selected"]
+        print(
+            f"pages={page_count:>3}  prompt tokens {full_tokens:>7.0f} -> {sel_tokens:>6.0f}  "
+            f"latency {full_latency * 1000:>7.1f} -> {sel_latency * 1000:>6.1f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--cvs", type=int, default=5)
+    parser.add_argument("--budget", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--latency-per-1k", type=float, default=0.1)
+    parser.add_argument("--stub-port", type=int, default=8100)
+    args = parser.parse_args()
+
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{args.stub_port}/v1"
+    os.environ.setdefault("OPENROUTER_API_KEY", "stub")
+    env = dict(
+        os.environ,
+        STUB_LLM_LATENCY=str(args.latency),
+        STUB_LLM_LATENCY_PER_1K_TOKENS=str(args.latency_per_1k),
+    )
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--log-level", "warning",
+         "bench.stub_llm:app", "--port", str(args.stub_port)],
+        env=env,
+    )
+    try:
+        asyncio.run(_wait_until_up(f"http://127.0.0.1:{args.stub_port}/"))
+        asyncio.run(run(args))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
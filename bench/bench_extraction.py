@@ -0,0 +1,82 @@
+"""
+Benchmark PDF text extraction on synthetic 1-, 10- and 100-page CVs.
+
+Compares the previous sequential extractor (string concatenation, then
+lowercasing the text once per pipeline stage) with the page-parallel
+extractor in pdf_extraction.
+
+    python -m bench.bench_extraction --pages 1 10 100 --repeat 5
+"""
+
+import argparse
+import io
+import statistics
+import time
+
+import PyPDF2
+
+from bench.synthetic_pdf import LINES_PER_PAGE, build_pdf
+from pdf_extraction import PDF_PROCESS_WORKERS, extract_pages, normalize_text, shutdown_page_pool
+
+PAGE_LINES = [
+    "Projekt: Einführung SAP S/4HANA Utilities bei einem Stadtwerk (2019 - 2021)",
+    "Rolle: Berater für Marktkommunikation, GPKE, WiM und Geräteverwaltung",
+    "Aufgaben: Fachkonzept, Prozessanalyse, Testkoordination und Schulungen",
+    "Technologien: ABAP, CDS Views, Fiori, BPMN Modellierung mit Signavio",
+]
+
+
+def synthetic_pdf(page_count: int) -> bytes:
+    page = [PAGE_LINES[i % len(PAGE_LINES)] for i in range(LINES_PER_PAGE)]
+    return build_pdf([page] * page_count)
+
+
+def legacy_extract(file_content: bytes) -> str:
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+    text = ""
+    for page in pdf_reader.pages:
+        text += page.extract_text()
+    text = text.lower()
+    # get_ai_analysis and determine_skill_level lowercased the text again
+    return text.lower().lower()
+
+
+def parallel_extract(file_content: bytes) -> str:
+    text = normalize_text("".join(extract_pages(file_content)))
+    return normalize_text(normalize_text(text))
+
+
+def _time(func, pdf: bytes, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(pdf)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"process workers: {PDF_PROCESS_WORKERS}")
+    try:
+        # Warm up the process pool so worker start-up is not measured
+        parallel_extract(synthetic_pdf(max(args.pages)))
+        for page_count in args.pages:
+            pdf = synthetic_pdf(page_count)
+            assert legacy_extract(pdf) == parallel_extract(pdf)
+            legacy = _time(legacy_extract, pdf, args.repeat)
+            parallel = _time(parallel_extract, pdf, args.repeat)
+            print(
+                f"pages={page_count:>4}  legacy={legacy * 1000:>9.1f} ms  "
+                f"parallel={parallel * 1000:>9.1f} ms  speedup={legacy / parallel:>5.1f}x"
+            )
+    finally:
+        shutdown_page_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark the rule-only fast path (mode=rules) on one core.
+
+Scores a corpus of synthetic CVs of 1 to 3 pages with rule_based_analysis
+(keyword scan, skill and seniority levels, requirement matches) and reports
+CVs per second. PDF text extraction is measured separately, as it dominates
+the per-CV cost of a real upload.
+
+    python -m bench.bench_rules --cvs 2000
+"""
+
+import argparse
+import time
+
+from bench.bench_context import synthetic_cv
+from bench.load_test import REQUIREMENTS
+from bench.synthetic_pdf import build_pdf, paginate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cvs", type=int, default=2000)
+    parser.add_argument("--pdfs", type=int, default=50)
+    args = parser.parse_args()
+
+    from main import find_keywords, parse_requirements, rule_based_analysis, score_rules_only
+    from pdf_extraction import normalize_text
+
+    requirements = parse_requirements(REQUIREMENTS)
+    corpus = [normalize_text(synthetic_cv(1 + seed % 3, seed)) for seed in range(args.cvs)]
+
+    started = time.perf_counter()
+    for cv_text in corpus:
+        rule_based_analysis(cv_text, find_keywords(cv_text), requirements, "consultant")
+    elapsed = time.perf_counter() - started
+    print(
+        f"rules from text:  {args.cvs} CVs in {elapsed:.2f}s  "
+        f"{args.cvs / elapsed:>8.0f} CVs/s  {elapsed / args.cvs * 1000:.3f} ms/CV"
+    )
+
+    pdfs = [build_pdf(paginate(corpus[i].splitlines())) for i in range(args.pdfs)]
+    started = time.perf_counter()
+    for pdf in pdfs:
+        score_rules_only(pdf, requirements, "consultant")
+    elapsed = time.perf_counter() - started
+    print(
+        f"rules from PDF:   {args.pdfs} CVs in {elapsed:.2f}s  "
+        f"{args.pdfs / elapsed:>8.0f} CVs/s  {elapsed / args.pdfs * 1000:.3f} ms/CV"
+    )
+
+
+if __name__ == "__main__":
+    main()
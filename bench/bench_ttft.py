@@ -0,0 +1,114 @@
+"""
+Benchmark time-to-first-token for the registered prompt versions.
+
+Streams analyses of different synthetic CVs with each prompt template and
+reports the median time until the first content chunk arrives. Against the
+stub LLM server (the default), prompt prefixes seen before are not charged
+prefill latency, as with provider-side prompt caching; templates with a
+stable static prefix therefore reach the first token sooner. Pass
+--base-url (and OPENROUTER_API_KEY) to measure a real provider instead.
+
+    python -m bench.bench_ttft --versions 2 3 --cvs 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from bench.bench_context import synthetic_cv
+from bench.load_test import REQUIREMENTS, _wait_until_up
+
+
+async def first_token_latency(gateway, model: str, messages) -> float:
+    started = time.perf_counter()
+    stream = await gateway.client.chat.completions.create(
+        model=model, messages=messages, temperature=0.3, max_tokens=1000, stream=True
+    )
+    latency = None
+    async for chunk in stream:
+        if latency is None and chunk.choices and chunk.choices[0].delta.content:
+            latency = time.perf_counter() - started
+    return latency
+
+
+async def run(args, base_url: str) -> None:
+    from context_selection import select_context
+    from llm_gateway import LLMGateway
+    from main import CONTEXT_TOKEN_BUDGET, LLM_MODEL, find_keywords
+    from main import format_requirements_section, parse_requirements
+    from prompts import get_prompt
+
+    gateway = LLMGateway(api_key=os.getenv("OPENROUTER_API_KEY"), base_url=base_url)
+    requirements = parse_requirements(REQUIREMENTS)
+    requirements_text = format_requirements_section(requirements)
+    req_texts = [req["text"] for req in requirements]
+    try:
+        for version in args.versions:
+            template = get_prompt(version)
+            latencies = []
+            # Seeds differ per version, so no CV is sent twice
+            for seed in range(args.cvs + 1):
+                cv_text = select_context(
+                    synthetic_cv(args.pages, seed + 1000 * int(version)),
+                    req_texts,
+                    CONTEXT_TOKEN_BUDGET,
+                    find_keywords,
+                )
+                messages = template.messages(
+                    role="consultant",
+                    seniority_level="Professional",
+                    cv_text=cv_text,
+                    requirements=requirements_text,
+                )
+                latencies.append(await first_token_latency(gateway, LLM_MODEL, messages))
+            # The first call of each version primes the prefix cache
+            latencies = latencies[1:]
+            print(
+                f"prompt v{version}  static prefix={len(template.user_prefix):>5} chars  "
+                f"ttft p50={statistics.median(latencies) * 1000:>7.1f} ms  "
+                f"max={max(latencies) * 1000:>7.1f} ms"
+            )
+    finally:
+        await gateway.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--versions", nargs="+", default=["2", "3"])
+    parser.add_argument("--cvs", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--base-url", help="OpenAI-compatible API; default: start the stub")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--latency-per-1k", type=float, default=0.5)
+    parser.add_argument("--stub-port", type=int, default=8100)
+    args = parser.parse_args()
+
+    if args.base_url:
+        asyncio.run(run(args, args.base_url))
+        return
+
+    os.environ.setdefault("OPENROUTER_API_KEY", "stub")
+    env = dict(
+        os.environ,
+        STUB_LLM_LATENCY=str(args.latency),
+        STUB_LLM_LATENCY_PER_1K_TOKENS=str(args.latency_per_1k),
+    )
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--log-level", "warning",
+         "bench.stub_llm:app", "--port", str(args.stub_port)],
+        env=env,
+    )
+    try:
+        asyncio.run(_wait_until_up(f"http://127.0.0.1:{args.stub_port}/"))
+        asyncio.run(run(args, f"http://127.0.0.1:{args.stub_port}/v1"))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
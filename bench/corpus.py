@@ -0,0 +1,146 @@
+"""
+Synthetic CV corpus for benchmarks.
+
+Generates German or English CVs of a given length and keyword density: the
+density is the share of lines that carry skill keywords (SAP modules, energy
+industry processes, tools, experience and language statements); the other
+lines are neutral filler. Generation is deterministic for a given seed.
+
+    python -m bench.corpus --out /tmp/cv-corpus --count 20 --pages 1 5 20 --density 0.1 0.5
+"""
+
+import argparse
+import itertools
+import os
+import random
+from typing import List, Tuple
+
+from bench.synthetic_pdf import LINES_PER_PAGE, build_pdf, paginate
+
+HEADER = {
+    "de": [
+        "Lebenslauf",
+        "{name}, {city}",
+        "Sprachen: Deutsch {german}, Englisch fließend",
+        "Studium: Master Wirtschaftsinformatik, Universität {city}",
+        "Berufserfahrung",
+    ],
+    "en": [
+        "Curriculum Vitae",
+        "{name}, {city}",
+        "Languages: German {german}, English native",
+        "Education: MSc Business Informatics, University of {city}",
+        "Work Experience",
+    ],
+}
+
+KEYWORD_LINES = {
+    "de": [
+        "{years} Jahre Beratung SAP IS-U bei einem Energieversorger",
+        "Projekt: Migration auf S/4HANA Utilities, Marktkommunikation nach GPKE und WiM",
+        "Entwicklung von ABAP Reports, CDS Views und Fiori Apps",
+        "Prozessmodellierung mit BPMN in Signavio und ARIS",
+        "Teilprojektleitung Geräteverwaltung und Abrechnung im Netzbetrieb",
+        "Anforderungsmanagement und Testkoordination im Messstellenbetrieb",
+        "Einführung von SAP FI/CO und Anbindung an das Energiedatenmanagement",
+        "Scrum Master in einem agilen Team für Vertriebsprozesse",
+    ],
+    "en": [
+        "{years} years of SAP IS-U consulting for a utility company",
+        "Project: S/4HANA Utilities migration, market communication (GPKE, WiM)",
+        "Development of ABAP reports, CDS views and Fiori apps",
+        "Process modeling with BPMN in Signavio and ARIS",
+        "Technical lead for device management and billing at a grid operator",
+        "Requirements engineering and test coordination for metering operations",
+        "Senior consultant, extensive experience with SAP FI/CO integration",
+        "Scrum master of an agile team for sales processes",
+    ],
+}
+
+FILLER_LINES = {
+    "de": [
+        "Organisation interner Schulungen und Teamevents",
+        "Betreuung von Praktikanten und Werkstudierenden",
+        "Pflege der internen Wissensdatenbank",
+        "Teilnahme an Konferenzen und Fachmessen",
+        "Ehrenamtliche Tätigkeit im örtlichen Sportverein",
+        "Dokumentation von Arbeitsabläufen und Besprechungsprotokollen",
+    ],
+    "en": [
+        "Organised internal trainings and team events",
+        "Mentored interns and working students",
+        "Maintained the internal knowledge base",
+        "Attended conferences and trade fairs",
+        "Volunteer work at the local sports club",
+        "Documented workflows and meeting minutes",
+    ],
+}
+
+NAMES = ["Max Mustermann", "Erika Musterfrau", "Alex Beispiel", "Sam Probe"]
+CITIES = ["Mannheim", "Köln", "Hamburg", "Leipzig", "München"]
+GERMAN_LEVELS = ["C1", "C2", "Muttersprache", "B2"]
+
+
+def generate_cv(seed: int, pages: int = 2, density: float = 0.3, language: str = "de") -> List[str]:
+    """Lines of a synthetic CV filling `pages` pages."""
+    rng = random.Random(seed)
+    fields = {
+        "name": rng.choice(NAMES),
+        "city": rng.choice(CITIES),
+        "german": rng.choice(GERMAN_LEVELS),
+    }
+    lines = [line.format(**fields) for line in HEADER[language]]
+    while len(lines) < pages * LINES_PER_PAGE:
+        if rng.random() < density:
+            line = rng.choice(KEYWORD_LINES[language]).format(years=rng.randint(1, 15))
+        else:
+            line = rng.choice(FILLER_LINES[language])
+        lines.append(f"{line} ({rng.randint(2005, 2024)})")
+    return lines
+
+
+def generate_pdf(seed: int, pages: int = 2, density: float = 0.3, language: str = "de") -> bytes:
+    return build_pdf(paginate(generate_cv(seed, pages, density, language)))
+
+
+def corpus_variants(
+    pages: List[int], densities: List[float], languages: List[str]
+) -> List[Tuple[int, float, str]]:
+    """Every combination of length, keyword density and language."""
+    return list(itertools.product(pages, densities, languages))
+
+
+def generate_corpus(
+    count: int,
+    pages: List[int],
+    densities: List[float],
+    languages: List[str] = ("de", "en"),
+) -> List[Tuple[str, bytes]]:
+    """`count` named PDFs, cycling through the variants."""
+    variants = corpus_variants(pages, densities, languages)
+    corpus = []
+    for seed in range(count):
+        page_count, density, language = variants[seed % len(variants)]
+        name = f"cv-{seed:04d}-{language}-{page_count}p-d{int(density * 100):02d}.pdf"
+        corpus.append((name, generate_pdf(seed, page_count, density, language)))
+    return corpus
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 2, 5])
+    parser.add_argument("--density", type=float, nargs="+", default=[0.1, 0.3, 0.6])
+    parser.add_argument("--languages", nargs="+", default=["de", "en"], choices=["de", "en"])
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for name, pdf in generate_corpus(args.count, args.pages, args.density, args.languages):
+        with open(os.path.join(args.out, name), "wb") as f:
+            f.write(pdf)
+    print(f"wrote {args.count} CVs to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
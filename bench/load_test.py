@@ -0,0 +1,163 @@
+"""
+Load test for /analyze against the stub LLM server.
+
+Starts the stub LLM and the backend as subprocesses, then fires batches of
+concurrent /analyze requests and reports throughput per concurrency level,
+together with /health latency measured while the batch is running. With a
+non-blocking request path, throughput grows with concurrency (up to
+LLM_CONCURRENCY) and /health stays fast.
+
+    python -m bench.load_test --latency 1.0 --concurrency 1 2 4 8 16
+"""
+
+import argparse
+import asyncio
+import atexit
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+import httpx
+
+from bench.synthetic_pdf import build_pdf, paginate
+
+SAMPLE_CV_LINES = [
+    "Lebenslauf",
+    "Max Mustermann, Mannheim",
+    "Sprachen: Deutsch C1, Englisch fließend",
+    "Berufserfahrung: 6 Jahre SAP IS-U Beratung bei einem Energieversorger",
+    "Projekte: S/4HANA Utilities Migration, Marktkommunikation, GPKE, WiM",
+    "Kenntnisse: ABAP, Fiori, CDS, BPMN, Signavio, Scrum",
+    "Studium: Master Wirtschaftsinformatik, Universität Mannheim",
+]
+
+REQUIREMENTS = "SAP IS-U Erfahrung\nMarktkommunikation\nABAP Kenntnisse"
+
+
+async def _wait_until_up(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            try:
+                await http.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not come up")
+
+
+def start_servers(port: int, stub_port: int, **env: str) -> List[subprocess.Popen]:
+    """
+    Start the stub LLM and the backend pointing at it; wait until both answer.
+    The backend runs without the candidate store and with an empty job
+    database, so earlier runs cannot answer requests from stored results;
+    `env` can override both.
+    """
+    job_dir = tempfile.mkdtemp(prefix="bench-jobs-")
+    atexit.register(shutil.rmtree, job_dir, True)
+    env = {
+        **os.environ,
+        "OPENROUTER_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+        "OPENROUTER_API_KEY": os.getenv("OPENROUTER_API_KEY", "stub"),
+        "CANDIDATE_DB_PATH": "",
+        "JOB_DB_PATH": os.path.join(job_dir, "jobs.db"),
+        **env,
+    }
+    uvicorn = [sys.executable, "-m", "uvicorn", "--log-level", "warning"]
+    servers = [
+        subprocess.Popen(uvicorn + ["bench.stub_llm:app", "--port", str(stub_port)], env=env),
+        subprocess.Popen(uvicorn + ["main:app", "--port", str(port)], env=env),
+    ]
+    try:
+        asyncio.run(_wait_until_up(f"http://127.0.0.1:{stub_port}/"))
+        asyncio.run(_wait_until_up(f"http://127.0.0.1:{port}/health"))
+    except BaseException:
+        stop_servers(servers)
+        raise
+    return servers
+
+
+def stop_servers(servers: List[subprocess.Popen]) -> None:
+    for server in servers:
+        server.terminate()
+        server.wait()
+
+
+async def _run_level(
+    http: httpx.AsyncClient, base_url: str, pdf: bytes, concurrency: int, rounds: int
+) -> dict:
+    async def one_request():
+        # Every request sends the same CV: without no_cache all but the
+        # first would be answered from the analysis cache
+        response = await http.post(
+            f"{base_url}/analyze",
+            params={"requirements": REQUIREMENTS, "role": "consultant", "no_cache": 1},
+            files={"file": ("cv.pdf", pdf, "application/pdf")},
+        )
+        response.raise_for_status()
+
+    async def probe_health():
+        await asyncio.sleep(0.1)
+        started = time.perf_counter()
+        await http.get(f"{base_url}/health")
+        return time.perf_counter() - started
+
+    total = concurrency * rounds
+    started = time.perf_counter()
+    health_task = asyncio.create_task(probe_health())
+    for _ in range(rounds):
+        await asyncio.gather(*(one_request() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    health_latency = await health_task
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 2),
+        "health_latency_ms": round(health_latency * 1000, 1),
+    }
+
+
+async def run(args) -> None:
+    pdf = build_pdf(paginate(SAMPLE_CV_LINES))
+    base_url = f"http://127.0.0.1:{args.port}"
+    async with httpx.AsyncClient(timeout=None) as http:
+        for concurrency in args.concurrency:
+            result = await _run_level(http, base_url, pdf, concurrency, args.rounds)
+            print(
+                f"concurrency={result['concurrency']:>3}  "
+                f"requests={result['requests']:>4}  "
+                f"time={result['seconds']:>7.2f}s  "
+                f"throughput={result['requests_per_second']:>6.2f} req/s  "
+                f"/health={result['health_latency_ms']:>7.1f} ms"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--llm-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    servers = start_servers(
+        args.port,
+        args.stub_port,
+        STUB_LLM_LATENCY=str(args.latency),
+        LLM_CONCURRENCY=str(args.llm_concurrency),
+    )
+    try:
+        asyncio.run(run(args))
+    finally:
+        stop_servers(servers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Benchmark runner with machine-readable output.
+
+Runs microbenchmarks of the pipeline stages in-process
+(extract_text_from_pdf, determine_skill_level, determine_seniority_level)
+and an end-to-end /analyze benchmark against the backend and the stub LLM
+server, on a synthetic corpus of varying length, keyword density and
+language. Results (throughput and p50/p95/p99 latencies, plus the commit
+and settings they were measured with) are written as JSON, so runs can be
+compared over time; a summary goes to stderr.
+
+    python -m bench.runner --requests 200 --concurrency 8 --latency 0.5 --output bench.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+import httpx
+
+from bench.corpus import generate_corpus, generate_cv
+from bench.load_test import REQUIREMENTS, start_servers, stop_servers
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Throughput and latency percentiles (in ms) of per-call durations in seconds."""
+    cuts = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {
+        "calls": len(samples),
+        "ops_per_second": round(len(samples) / sum(samples), 2) if sum(samples) else None,
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def _time_calls(func: Callable, inputs: list, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        for item in inputs:
+            started = time.perf_counter()
+            func(item)
+            samples.append(time.perf_counter() - started)
+    return samples
+
+
+def run_micro(args) -> dict:
+    from main import (
+        determine_seniority_level,
+        determine_skill_level,
+        extract_text_from_pdf,
+    )
+    from pdf_extraction import normalize_text
+
+    results = {}
+    for pages in args.pages:
+        pdfs = [pdf for _, pdf in generate_corpus(args.micro_cvs, [pages], args.density)]
+        results[f"extract_text_from_pdf/{pages}p"] = summarize(
+            _time_calls(extract_text_from_pdf, pdfs, args.repeat)
+        )
+
+    texts = [
+        normalize_text("\n".join(generate_cv(seed, pages, density, language)))
+        for seed, (pages, density, language) in enumerate(
+            (p, d, lang) for p in args.pages for d in args.density for lang in ("de", "en")
+        )
+    ]
+    results["determine_skill_level"] = summarize(
+        _time_calls(determine_skill_level, texts, args.repeat * 10)
+    )
+    skill_levels = [determine_skill_level(text) for text in texts]
+    results["determine_seniority_level"] = summarize(
+        _time_calls(determine_seniority_level, skill_levels, args.repeat * 10)
+    )
+    return results
+
+
+async def _run_analyze(args, corpus: List[tuple]) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    params = {"requirements": REQUIREMENTS, "role": "consultant", "no_cache": not args.cache}
+    if args.mode:
+        params["mode"] = args.mode
+    semaphore = asyncio.Semaphore(args.concurrency)
+    samples = []
+    errors = 0
+
+    async def one_request(http: httpx.AsyncClient, name: str, pdf: bytes):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await http.post(
+                f"{base_url}/analyze",
+                params=params,
+                files={"file": (name, pdf, "application/pdf")},
+            )
+            samples.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    async with httpx.AsyncClient(timeout=None) as http:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                one_request(http, *corpus[i % len(corpus)])
+                for i in range(args.requests)
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+    result = summarize(samples)
+    # Throughput of the whole run, not of single calls
+    result["ops_per_second"] = round(args.requests / elapsed, 2)
+    result["errors"] = errors
+    result["concurrency"] = args.concurrency
+    return result
+
+
+def run_analyze(args) -> dict:
+    corpus = generate_corpus(args.corpus_size, args.pages, args.density)
+    servers = start_servers(
+        args.port,
+        args.stub_port,
+        STUB_LLM_LATENCY=str(args.latency),
+        LLM_CONCURRENCY=str(args.concurrency),
+    )
+    try:
+        return asyncio.run(_run_analyze(args, corpus))
+    finally:
+        stop_servers(servers)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--density", type=float, nargs="+", default=[0.1, 0.3, 0.6])
+    parser.add_argument("--repeat", type=int, default=3, help="microbenchmark repetitions")
+    parser.add_argument("--micro-cvs", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--corpus-size", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub LLM latency")
+    parser.add_argument("--mode", choices=["llm", "rules"])
+    parser.add_argument("--cache", action="store_true", help="allow result cache hits")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-analyze", action="store_true")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--output", help="JSON file; default: stdout")
+    args = parser.parse_args()
+
+    report = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": vars(args),
+        "micro": {} if args.skip_micro else run_micro(args),
+        "analyze": None if args.skip_analyze else run_analyze(args),
+    }
+
+    for name, result in [*report["micro"].items(), ("/analyze", report["analyze"])]:
+        if result:
+            print(
+                f"{name:<32} {result['ops_per_second']:>10} ops/s  p50={result['p50_ms']:>9.3f}  "
+                f"p95={result['p95_ms']:>9.3f}  p99={result['p99_ms']:>9.3f} ms",
+                file=sys.stderr,
+            )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
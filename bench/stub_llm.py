@@ -0,0 +1,170 @@
+"""
+Local stand-in for the OpenRouter chat completions API.
+
+Answers every completion with a fixed, valid analysis after a configurable
+delay, so the backend can be load-tested without network access or API cost.
+A share of the requests can be failed with an HTTP error status to exercise
+the retries and the circuit breaker of the LLM gateway. Prompt tokens are
+estimated from the message length and reported in `usage`; with
+STUB_LLM_LATENCY_PER_1K_TOKENS the delay grows with the prompt, like the
+prefill time of a real model. Like provider-side prompt caching, prompt
+prefixes seen before (in blocks of PREFIX_BLOCK_TOKENS) are not charged that
+per-token latency again. With "stream": true the analysis is sent as
+server-sent event chunks, STUB_LLM_CHUNK_INTERVAL seconds apart, followed
+by a usage chunk if "stream_options" asks for it.
+
+The analysis has one requirement match (with a fixed pseudo-random score)
+per requirement listed in the prompt, at most 5 like the prompt demands.
+
+    STUB_LLM_LATENCY=1.0 python -m uvicorn bench.stub_llm:app --port 8100
+    STUB_LLM_ERROR_RATE=0.3 STUB_LLM_ERROR_STATUS=429 python -m uvicorn bench.stub_llm:app --port 8100
+
+Point the backend at it with OPENROUTER_BASE_URL=http://127.0.0.1:8100/v1.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from collections import OrderedDict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI()
+
+STUB_LLM_LATENCY = float(os.getenv("STUB_LLM_LATENCY", "1.0"))
+STUB_LLM_LATENCY_PER_1K_TOKENS = float(os.getenv("STUB_LLM_LATENCY_PER_1K_TOKENS", "0"))
+STUB_LLM_ERROR_RATE = float(os.getenv("STUB_LLM_ERROR_RATE", "0"))
+STUB_LLM_ERROR_STATUS = int(os.getenv("STUB_LLM_ERROR_STATUS", "503"))
+STUB_LLM_CHUNK_INTERVAL = float(os.getenv("STUB_LLM_CHUNK_INTERVAL", "0.01"))
+STUB_LLM_CHUNK_CHARS = 16
+
+PREFIX_BLOCK_TOKENS = 256
+PREFIX_CACHE_BLOCKS = 10000
+
+# Hashes of cached prompt prefixes, oldest first
+_prefix_cache = OrderedDict()
+
+CANNED_ANALYSIS = {
+    "overall_score": 70,
+    "seniority_level": "Professional",
+    "requirement_matches": [
+        {
+            "requirement": "SAP IS-U",
+            "match_percentage": 80,
+            "explanation": "Mehrjährige Projekterfahrung",
+        }
+    ],
+    "summary": "Solide Erfahrung im SAP-Umfeld der Energiewirtschaft.",
+    "key_strengths": ["SAP IS-U", "Marktkommunikation"],
+    "improvement_areas": ["S/4HANA Utilities"],
+}
+
+
+def _cached_prefix_tokens(prompt: str) -> int:
+    """Tokens of the longest cached block prefix of `prompt`; caches all its blocks."""
+    block_chars = PREFIX_BLOCK_TOKENS * 4
+    cached = 0
+    digest = hashlib.sha256()
+    for end in range(block_chars, len(prompt) + 1, block_chars):
+        digest.update(prompt[end - block_chars : end].encode("utf-8"))
+        key = digest.hexdigest()
+        if key in _prefix_cache and cached == end - block_chars:
+            cached = end
+            _prefix_cache.move_to_end(key)
+        else:
+            _prefix_cache[key] = True
+    while len(_prefix_cache) > PREFIX_CACHE_BLOCKS:
+        _prefix_cache.popitem(last=False)
+    return cached // 4
+
+
+def _analysis(prompt: str) -> dict:
+    analysis = dict(CANNED_ANALYSIS)
+    section = prompt.rpartition("Stellenanforderungen:")[2]
+    requirements = [line[2:] for line in section.splitlines() if line.startswith("- ")]
+    if requirements:
+        analysis["requirement_matches"] = [
+            {
+                "requirement": requirement,
+                "match_percentage": int(hashlib.sha256(requirement.encode()).hexdigest(), 16) % 101,
+                "explanation": "Im Lebenslauf erwähnt",
+            }
+            for requirement in requirements[:5]
+        ]
+    return analysis
+
+
+def _chunk(body: dict, delta: dict, finish_reason=None) -> str:
+    chunk = {
+        "id": "stub-completion",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+
+async def _stream(body: dict, content: str, usage: dict):
+    yield _chunk(body, {"role": "assistant", "content": ""})
+    for start in range(0, len(content), STUB_LLM_CHUNK_CHARS):
+        yield _chunk(body, {"content": content[start : start + STUB_LLM_CHUNK_CHARS]})
+        await asyncio.sleep(STUB_LLM_CHUNK_INTERVAL)
+    yield _chunk(body, {}, finish_reason="stop")
+    if (body.get("stream_options") or {}).get("include_usage"):
+        usage_chunk = {
+            "id": "stub-completion",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [],
+            "usage": usage,
+        }
+        yield f"data: {json.dumps(usage_chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt = "\n".join(m.get("content") or "" for m in body.get("messages", []))
+    prompt_tokens = len(prompt) // 4
+    cached_tokens = _cached_prefix_tokens(prompt)
+    await asyncio.sleep(
+        STUB_LLM_LATENCY
+        + STUB_LLM_LATENCY_PER_1K_TOKENS * (prompt_tokens - cached_tokens) / 1000
+    )
+    if random.random() < STUB_LLM_ERROR_RATE:
+        return JSONResponse(
+            status_code=STUB_LLM_ERROR_STATUS,
+            content={"error": {"message": "injected failure", "code": STUB_LLM_ERROR_STATUS}},
+        )
+    content = json.dumps(_analysis(prompt), ensure_ascii=False)
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": 0,
+        "total_tokens": prompt_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+    }
+    if body.get("stream"):
+        return StreamingResponse(
+            _stream(body, content, usage), media_type="text/event-stream"
+        )
+    return {
+        "id": "stub-completion",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": usage,
+    }
@@ -0,0 +1,68 @@
+"""
+Minimal PDF writer for benchmark inputs.
+
+Produces plain-text PDFs (Helvetica, WinAnsi encoding) that PyPDF2 can
+extract again, without pulling in a PDF generation library.
+"""
+
+from typing import List
+
+LINES_PER_PAGE = 45
+
+
+def _escape(line: str) -> bytes:
+    encoded = line.encode("cp1252", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _page_stream(lines: List[str]) -> bytes:
+    parts = [b"BT", b"/F1 10 Tf", b"14 TL", b"50 800 Td"]
+    for line in lines:
+        parts.append(b"(" + _escape(line) + b") Tj T*")
+    parts.append(b"ET")
+    return b"\n".join(parts)
+
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """Build a PDF with one page per entry, each entry being a list of text lines."""
+    page_count = len(pages)
+    # Object layout: 1 catalog, 2 page tree, 3 font, then (page, content) pairs
+    page_ids = [4 + 2 * i for i in range(page_count)]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids ["
+        + b" ".join(f"{pid} 0 R".encode() for pid in page_ids)
+        + f"] /Count {page_count} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica"
+        b" /Encoding /WinAnsiEncoding >>",
+    ]
+    for i, lines in enumerate(pages):
+        stream = _page_stream(lines)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842]"
+            f" /Resources << /Font << /F1 3 0 R >> >> /Contents {page_ids[i] + 1} 0 R >>".encode()
+        )
+        objects.append(
+            f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"
+        )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref_offset}\n%%EOF\n"
+    ).encode()
+    return bytes(out)
+
+
+def paginate(lines: List[str], lines_per_page: int = LINES_PER_PAGE) -> List[List[str]]:
+    return [
+        lines[i : i + lines_per_page] for i in range(0, len(lines), lines_per_page)
+    ] or [[]]
@@ -0,0 +1,408 @@
+"""
+Persistent store of analyzed candidates.
+
+Every analyzed CV is kept with its extracted text and rule-based skill
+levels, so it can be searched and re-analyzed against new requirements
+without uploading the PDF again. Candidates are identified by a hash of
+their normalized text, which makes re-uploads of the same CV update one
+entry. Analyses are stored per candidate, role, requirement set and mode;
+a new analysis replaces the previous one for the same combination.
+
+Role, seniority level and overall score of the analyses and the level of
+each skill category are indexed for the candidate search.
+
+For incremental re-scoring, uploaded PDFs are mapped to their candidate by
+a hash of the file, so a known PDF is not extracted again, and the LLM
+answer for each requirement is kept on its own: a re-analysis against an
+edited requirement list only sends the new or changed requirements to the
+LLM.
+
+Skill levels are stored with the version of the scoring config they were
+computed with; readers that pass the active version get None instead of
+skill levels from another config, and recompute them from the text.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from analysis_cache import normalize_requirements
+from sqlite_connection import ProcessConnection
+
+# Skill levels in ascending order; their position is stored as the rank
+SKILL_LEVELS = ["None", "Basic", "Advanced", "Expert"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    id TEXT PRIMARY KEY,
+    filename TEXT,
+    cv_text TEXT NOT NULL,
+    skill_levels TEXT NOT NULL,
+    config_version TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    sha256 TEXT PRIMARY KEY,
+    candidate_id TEXT NOT NULL REFERENCES candidates (id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS candidate_skills (
+    candidate_id TEXT NOT NULL REFERENCES candidates (id) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    level TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    PRIMARY KEY (candidate_id, category)
+);
+CREATE INDEX IF NOT EXISTS candidate_skills_level
+    ON candidate_skills (category, rank, candidate_id);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    candidate_id TEXT NOT NULL REFERENCES candidates (id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    requirements_key TEXT NOT NULL,
+    requirements TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    seniority_level TEXT,
+    overall_score REAL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (candidate_id, role, requirements_key, mode)
+);
+CREATE INDEX IF NOT EXISTS analyses_role_seniority_score
+    ON analyses (role, seniority_level, overall_score);
+CREATE INDEX IF NOT EXISTS analyses_score ON analyses (overall_score);
+CREATE INDEX IF NOT EXISTS analyses_requirements_score
+    ON analyses (requirements_key, overall_score);
+CREATE TABLE IF NOT EXISTS requirement_analyses (
+    candidate_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    version TEXT NOT NULL,
+    requirement TEXT NOT NULL,
+    analysis TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (candidate_id, role, version, requirement)
+);
+"""
+
+
+def make_candidate_id(cv_text: str) -> str:
+    return hashlib.sha256(cv_text.encode("utf-8")).hexdigest()[:32]
+
+
+def normalize_requirement(requirement: str) -> str:
+    return " ".join(requirement.split())
+
+
+def requirements_key(requirements: List[str]) -> str:
+    """Hash of a requirement list, independent of order and whitespace."""
+    payload = json.dumps(normalize_requirements(requirements), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CandidateStore:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = ProcessConnection(db_path, SCHEMA, self._setup, timeout=30)
+
+    @staticmethod
+    def _setup(connection: sqlite3.Connection) -> None:
+        connection.execute("PRAGMA foreign_keys=ON")
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(candidates)")}
+        if "config_version" not in columns:
+            # Stores created before the scoring config was versioned
+            connection.execute("ALTER TABLE candidates ADD COLUMN config_version TEXT")
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        return self._connection.get()
+
+    def save_candidate(
+        self,
+        cv_text: str,
+        skill_levels: Dict[str, str],
+        filename: Optional[str] = None,
+        document_hash: Optional[str] = None,
+        config_version: Optional[str] = None,
+    ) -> str:
+        """
+        Insert or update a candidate and return its ID. `document_hash`
+        identifies the uploaded file for find_document; `config_version` is
+        the scoring config the skill levels were computed with.
+        """
+        key = make_candidate_id(cv_text)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO candidates (id, filename, cv_text, skill_levels, config_version, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET filename = COALESCE(excluded.filename, filename), "
+                "skill_levels = excluded.skill_levels, config_version = excluded.config_version, "
+                "updated_at = excluded.updated_at",
+                (key, filename, cv_text, json.dumps(skill_levels), config_version, now, now),
+            )
+            # A new scoring config may have dropped categories
+            self._db.execute("DELETE FROM candidate_skills WHERE candidate_id = ?", (key,))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO candidate_skills (candidate_id, category, level, rank) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (key, category, level, SKILL_LEVELS.index(level))
+                    for category, level in skill_levels.items()
+                    if level in SKILL_LEVELS
+                ],
+            )
+            if document_hash is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO documents (sha256, candidate_id) VALUES (?, ?)",
+                    (document_hash, key),
+                )
+            self._db.commit()
+        return key
+
+    @staticmethod
+    def _skill_levels(row: sqlite3.Row, config_version: Optional[str]) -> Optional[dict]:
+        """The stored skill levels, or None if they are from another scoring config."""
+        if config_version is not None and row["config_version"] != config_version:
+            return None
+        return json.loads(row["skill_levels"])
+
+    def find_document(
+        self, document_hash: str, config_version: Optional[str] = None
+    ) -> Optional[tuple]:
+        """(cv_text, skill_levels) of the candidate of an uploaded file, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT c.cv_text, c.skill_levels, c.config_version FROM documents d "
+                "JOIN candidates c ON c.id = d.candidate_id WHERE d.sha256 = ?",
+                (document_hash,),
+            ).fetchone()
+        if row is None:
+            return None
+        return row["cv_text"], self._skill_levels(row, config_version)
+
+    def save_analysis(
+        self,
+        candidate_id: str,
+        role: str,
+        requirements: List[str],
+        mode: str,
+        result: dict,
+    ) -> None:
+        score = result.get("overall_score")
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO analyses (candidate_id, role, requirements_key, "
+                "requirements, mode, seniority_level, overall_score, result, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    candidate_id,
+                    role,
+                    requirements_key(requirements),
+                    json.dumps(requirements, ensure_ascii=False),
+                    mode,
+                    result.get("seniority_level"),
+                    score if isinstance(score, (int, float)) else None,
+                    json.dumps(result, ensure_ascii=False),
+                    time.time(),
+                ),
+            )
+            self._db.commit()
+
+    def get_candidate(self, candidate_id: str, include_text: bool = False) -> Optional[dict]:
+        """The candidate with its skill levels and all of its analyses, newest first."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM candidates WHERE id = ?", (candidate_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            analyses = self._db.execute(
+                "SELECT * FROM analyses WHERE candidate_id = ? ORDER BY created_at DESC",
+                (candidate_id,),
+            ).fetchall()
+        candidate = {
+            "candidate_id": row["id"],
+            "filename": row["filename"],
+            "skill_levels": json.loads(row["skill_levels"]),
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "analyses": [
+                {
+                    "role": analysis["role"],
+                    "requirements": json.loads(analysis["requirements"]),
+                    "mode": analysis["mode"],
+                    "analyzed_at": analysis["created_at"],
+                    "result": json.loads(analysis["result"]),
+                }
+                for analysis in analyses
+            ],
+        }
+        if include_text:
+            candidate["cv_text"] = row["cv_text"]
+        return candidate
+
+    def get_profile(
+        self, candidate_id: str, config_version: Optional[str] = None
+    ) -> Optional[tuple]:
+        """(cv_text, skill_levels, filename) of a candidate, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT cv_text, skill_levels, config_version, filename FROM candidates "
+                "WHERE id = ?",
+                (candidate_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return row["cv_text"], self._skill_levels(row, config_version), row["filename"]
+
+    def profiles(
+        self, limit: Optional[int] = None, config_version: Optional[str] = None
+    ) -> List[tuple]:
+        """(candidate_id, cv_text, skill_levels, filename) of all candidates."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, cv_text, skill_levels, config_version, filename FROM candidates "
+                "ORDER BY updated_at DESC LIMIT ?",
+                (-1 if limit is None else limit,),
+            ).fetchall()
+        return [
+            (
+                row["id"],
+                row["cv_text"],
+                self._skill_levels(row, config_version),
+                row["filename"],
+            )
+            for row in rows
+        ]
+
+    def requirement_analyses(
+        self, candidate_id: str, role: str, version: str, requirements: List[str]
+    ) -> Dict[str, dict]:
+        """
+        The stored single-requirement analyses (see save_requirement_analyses)
+        of a candidate, keyed by the requirements as given.
+        """
+        wanted = {normalize_requirement(req): req for req in requirements}
+        if not wanted:
+            return {}
+        placeholders = ", ".join("?" * len(wanted))
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT requirement, analysis FROM requirement_analyses "
+                "WHERE candidate_id = ? AND role = ? AND version = ? "
+                f"AND requirement IN ({placeholders})",
+                (candidate_id, role, version, *wanted),
+            ).fetchall()
+        return {wanted[row["requirement"]]: json.loads(row["analysis"]) for row in rows}
+
+    def save_requirement_analyses(
+        self, candidate_id: str, role: str, version: str, analyses: Dict[str, dict]
+    ) -> None:
+        """
+        Keep per requirement the LLM analysis it came from, reduced to that
+        requirement's match. `version` identifies model and prompt.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO requirement_analyses "
+                "(candidate_id, role, version, requirement, analysis, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        candidate_id,
+                        role,
+                        version,
+                        normalize_requirement(requirement),
+                        json.dumps(analysis, ensure_ascii=False),
+                        now,
+                    )
+                    for requirement, analysis in analyses.items()
+                ],
+            )
+            self._db.commit()
+
+    def search(
+        self,
+        role: Optional[str] = None,
+        seniority_level: Optional[str] = None,
+        skills: Optional[Dict[str, str]] = None,
+        min_score: Optional[float] = None,
+        requirements: Optional[List[str]] = None,
+        mode: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> List[dict]:
+        """
+        Candidates ranked by overall score. Each candidate appears once, with
+        its most recent analysis that matches the filters; `skills` maps a
+        skill category to the minimum level.
+        """
+        conditions = []
+        params = []
+        for column, value in (
+            ("role", role),
+            ("seniority_level", seniority_level),
+            ("mode", mode),
+        ):
+            if value is not None:
+                conditions.append(f"a.{column} = ?")
+                params.append(value)
+        if requirements is not None:
+            conditions.append("a.requirements_key = ?")
+            params.append(requirements_key(requirements))
+        if min_score is not None:
+            conditions.append("a.overall_score >= ?")
+            params.append(min_score)
+        for category, level in (skills or {}).items():
+            conditions.append(
+                "EXISTS (SELECT 1 FROM candidate_skills s WHERE s.candidate_id = a.candidate_id "
+                "AND s.category = ? AND s.rank >= ?)"
+            )
+            params.extend([category, SKILL_LEVELS.index(level)])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        query = f"""
+            SELECT ranked.*, c.filename, c.skill_levels FROM (
+                SELECT a.candidate_id, a.role, a.requirements, a.mode, a.seniority_level,
+                    a.overall_score, a.created_at,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY a.candidate_id ORDER BY a.created_at DESC
+                    ) AS recency
+                FROM analyses a {where}
+            ) ranked
+            JOIN candidates c ON c.id = ranked.candidate_id
+            WHERE ranked.recency = 1
+            ORDER BY ranked.overall_score IS NULL, ranked.overall_score DESC, ranked.created_at DESC
+            LIMIT ? OFFSET ?
+        """
+        with self._lock:
+            rows = self._db.execute(query, [*params, limit, offset]).fetchall()
+        return [
+            {
+                "candidate_id": row["candidate_id"],
+                "filename": row["filename"],
+                "role": row["role"],
+                "seniority_level": row["seniority_level"],
+                "overall_score": row["overall_score"],
+                "mode": row["mode"],
+                "requirements": json.loads(row["requirements"]),
+                "skill_levels": json.loads(row["skill_levels"]),
+                "analyzed_at": row["created_at"],
+            }
+            for row in rows
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            candidates = self._db.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+            analyses = self._db.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        return {"candidates": candidates, "analyses": analyses, "db_path": self.db_path}
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
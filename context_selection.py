@@ -0,0 +1,128 @@
+"""
+Selection of the CV excerpts sent to the LLM.
+
+Long CVs are split into sentences and lines, each excerpt is scored by its
+term overlap with every requirement and by the skill keywords it contains,
+and the best excerpts are packed into a token budget. Every requirement
+first gets its best-matching excerpt, then every keyword hit is covered by at
+least one excerpt, and the remaining budget goes to the highest-scoring
+excerpts overall. The selection is returned in CV order, so
+the LLM still reads a coherent (if shortened) CV. CVs that already fit the
+budget are passed through unchanged.
+"""
+
+import math
+import re
+from typing import Callable, Iterable, List, Optional, Set
+
+from semantic import split_sentences
+
+# Rough token estimate for German and English text with GPT-style tokenizers
+CHARS_PER_TOKEN = 4
+
+# Words are compared by prefix, so inflected forms match
+# ("Erfahrung" / "Erfahrungen", "Projekt" / "Projekten")
+TERM_PREFIX_LENGTH = 6
+MIN_TERM_LENGTH = 3
+
+# Score of one keyword hit relative to a fully covered requirement
+KEYWORD_WEIGHT = 0.25
+
+# Marks left-out text between selected excerpts
+GAP_MARKER = "[...]"
+
+WORD = re.compile(r"\w[\w/+#.-]*\w|\w")
+
+STOPWORDS = {
+    "and", "the", "for", "with", "von", "und", "der", "die", "das", "den",
+    "dem", "des", "ein", "eine", "einer", "eines", "mit", "für", "auf", "aus",
+    "bei", "sowie", "oder", "sehr", "gute", "guter", "gutes", "kenntnisse",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def terms(text: str) -> Set[str]:
+    return {
+        word[:TERM_PREFIX_LENGTH]
+        for word in WORD.findall(text.lower())
+        if len(word) >= MIN_TERM_LENGTH and word not in STOPWORDS
+    }
+
+
+def select_context(
+    cv_text: str,
+    requirements: List[str],
+    token_budget: int,
+    find_keywords: Optional[Callable[[str], Iterable[str]]] = None,
+) -> str:
+    """
+    Return the excerpts of `cv_text` most relevant to `requirements` that
+    fit into `token_budget` tokens. A budget of 0 disables the selection.
+    `find_keywords` returns the skill keywords found in a piece of text;
+    excerpts with keyword hits rank higher.
+    """
+    if token_budget <= 0 or estimate_tokens(cv_text) <= token_budget:
+        return cv_text
+
+    # Excerpts repeated with other numbers (dates, page footers) count once
+    segments = []
+    positions = []
+    seen = set()
+    sentences = split_sentences(cv_text)
+    for position, segment in enumerate(sentences):
+        key = frozenset(term for term in terms(segment) if not term.isdigit())
+        if key not in seen:
+            seen.add(key)
+            segments.append(segment)
+            positions.append(position)
+    requirement_terms = [t for t in (terms(req) for req in requirements) if t]
+
+    requirement_scores = []
+    keyword_hits = []
+    totals = []
+    for segment in segments:
+        segment_terms = terms(segment)
+        scores = [len(req & segment_terms) / len(req) for req in requirement_terms]
+        hits = set(find_keywords(segment)) if find_keywords else set()
+        requirement_scores.append(scores)
+        keyword_hits.append(hits)
+        totals.append(sum(scores) + KEYWORD_WEIGHT * len(hits))
+    by_score = sorted(range(len(segments)), key=lambda i: (-totals[i], i))
+
+    # Best excerpt per requirement first, then one excerpt for every keyword
+    # hit, then the rest by overall score; ties keep CV order
+    order = []
+    for r in range(len(requirement_terms)):
+        best = max(range(len(segments)), key=lambda i: (requirement_scores[i][r], -i))
+        if requirement_scores[best][r] > 0:
+            order.append(best)
+    covered = set()
+    for i in by_score:
+        if keyword_hits[i] - covered:
+            order.append(i)
+            covered |= keyword_hits[i]
+    order += by_score
+
+    selected = set()
+    remaining = token_budget
+    for i in order:
+        if i in selected:
+            continue
+        cost = estimate_tokens(segments[i]) + 1
+        if cost <= remaining:
+            selected.add(i)
+            remaining -= cost
+
+    parts = []
+    previous = -1
+    for i in sorted(selected):
+        if positions[i] != previous + 1:
+            parts.append(GAP_MARKER)
+        parts.append(segments[i])
+        previous = positions[i]
+    if previous != len(sentences) - 1:
+        parts.append(GAP_MARKER)
+    return "\n".join(parts)
@@ -411,6 +411,8 @@ function App() {
   const [error, setError] = useState("");
   const [loading, setLoading] = useState(false);
   const [selectedRole, setSelectedRole] = useState("developer");
+  // The stored requirement set and the text it was saved from
+  const [requirementSet, setRequirementSet] = useState(null);
 
   const toggleColorMode = () => {
     setMode((prevMode) => (prevMode === "light" ? "dark" : "light"));
@@ -430,6 +432,23 @@ function App() {
     setRequirements(event.target.value);
   };
 
+  // Store the requirements as a requirement set (a new version if they were
+  // edited since the last analysis) and return its ID
+  const saveRequirementSet = async () => {
+    if (requirementSet && requirementSet.text === requirements) {
+      return requirementSet.id;
+    }
+    const body = { name: selectedRole, requirements: requirements.split("\n") };
+    const response = requirementSet
+      ? await axios.put(
+          `http://localhost:8000/requirement-sets/${requirementSet.id}`,
+          body
+        )
+      : await axios.post("http://localhost:8000/requirement-sets", body);
+    setRequirementSet({ id: response.data.id, text: requirements });
+    return response.data.id;
+  };
+
   const handleSubmit = async (event) => {
     event.preventDefault();
     setError("");
@@ -445,11 +464,14 @@ function App() {
     const formData = new FormData();
     formData.append("file", selectedFile);
 
-    // Encode the requirements as a query parameter
-    const apiUrl = `http://localhost:8000/analyze?requirements=${encodeURIComponent(requirements)}&role=${selectedRole}`;
-
     try {
-      const response = await axios.post(apiUrl, formData, {
+      // The requirements are passed by requirement set ID
+      const params = { role: selectedRole };
+      if (requirements.trim()) {
+        params.requirement_set = await saveRequirementSet();
+      }
+      const response = await axios.post("http://localhost:8000/analyze", formData, {
+        params,
         headers: { "Content-Type": "multipart/form-data" },
       });
       setResults(response.data);
@@ -0,0 +1,363 @@
+"""
+Persistent queue of analysis jobs.
+
+Jobs are stored in SQLite together with the uploaded document, so queued
+and interrupted jobs survive a restart. Worker tasks claim the oldest queued
+job in a transaction, which also works with several server processes on one
+database file. A claimed job holds a lease; if its worker dies, the job is
+picked up again once the lease has expired, up to `max_attempts` times;
+while the job runs, its worker renews the lease every third of
+`lease_seconds`, so a long job is not taken for a lost one. The workers make their SQLite calls in threads (asyncio.to_thread), so
+waiting for a locked database does not block the event loop.
+
+When a job has finished, its result is POSTed to the job's callback URL,
+if one was given. Callback URLs must use one of `callback_schemes` and point
+to one of `callback_hosts` (exact names, or "*.example.com" for its
+subdomains); with no hosts, callbacks are off. Submissions are rejected with QueueFullError while
+`max_queued` jobs are waiting.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Iterable, Optional
+
+import httpx
+
+from sqlite_connection import ProcessConnection
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT,
+    document BLOB,
+    params TEXT NOT NULL,
+    callback_url TEXT,
+    callback_status TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class QueueFullError(Exception):
+    """Too many jobs are waiting; the client should retry later."""
+
+
+class JobQueue:
+    def __init__(
+        self,
+        db_path: str,
+        handler: Callable[[dict], Awaitable[dict]],
+        workers: int = 4,
+        max_queued: int = 1000,
+        lease_seconds: float = 600.0,
+        max_attempts: int = 3,
+        poll_interval: float = 1.0,
+        callback_timeout: float = 10.0,
+        callback_retries: int = 3,
+        callback_schemes: Iterable[str] = ("https",),
+        callback_hosts: Iterable[str] = (),
+    ):
+        self.handler = handler
+        self.worker_count = workers
+        self.max_queued = max_queued
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.callback_timeout = callback_timeout
+        self.callback_retries = callback_retries
+        self.callback_schemes = frozenset(scheme.lower() for scheme in callback_schemes)
+        self.callback_hosts = frozenset(host.lower() for host in callback_hosts)
+        self.running = 0
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = ProcessConnection(db_path, SCHEMA, timeout=30, isolation_level=None)
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        return self._connection.get()
+
+    def check_callback_url(self, url: str) -> None:
+        """Raise ValueError unless callbacks may be sent to `url`."""
+        if not self.callback_hosts:
+            raise ValueError("callbacks are disabled")
+        try:
+            parsed = httpx.URL(url)
+        except httpx.InvalidURL as e:
+            raise ValueError(str(e))
+        if parsed.scheme not in self.callback_schemes:
+            raise ValueError(f"scheme {parsed.scheme!r} is not allowed")
+        host = parsed.host.lower()
+        if host not in self.callback_hosts and not any(
+            pattern.startswith("*.") and host.endswith(pattern[1:])
+            for pattern in self.callback_hosts
+        ):
+            raise ValueError(f"host {host!r} is not allowed")
+
+    def submit(
+        self,
+        filename: str,
+        document: bytes,
+        params: dict,
+        callback_url: Optional[str] = None,
+    ) -> str:
+        """Queue a job and return its ID. Raises QueueFullError if the queue is full."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                queued = self._db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued'"
+                ).fetchone()[0]
+                if queued >= self.max_queued:
+                    raise QueueFullError(f"{queued} jobs are waiting")
+                self._db.execute(
+                    "INSERT INTO jobs (id, status, filename, document, params, callback_url, "
+                    "created_at) VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                    (
+                        job_id,
+                        filename,
+                        document,
+                        json.dumps(params, ensure_ascii=False),
+                        callback_url,
+                        time.time(),
+                    ),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """The public view of a job: status, timestamps and result or error."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, filename, callback_url, callback_status, result, error, "
+                "attempts, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = {
+            "job_id": row["id"],
+            "status": row["status"],
+            "filename": row["filename"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if row["callback_url"]:
+            job["callback_status"] = row["callback_status"]
+        if row["result"] is not None:
+            job["result"] = json.loads(row["result"])
+        if row["error"] is not None:
+            job["error"] = row["error"]
+        return job
+
+    def _claim(self) -> Optional[dict]:
+        """Take the oldest queued job, or a running one whose lease has expired."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose worker died too often are given up
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'Worker lost too often', "
+                    "finished_at = ? WHERE status = 'running' AND lease_until < ? "
+                    "AND attempts >= ?",
+                    (now, now, self.max_attempts),
+                )
+                row = self._db.execute(
+                    "SELECT id, filename, document, params FROM jobs "
+                    "WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                        "lease_until = ?, started_at = ? WHERE id = ?",
+                        (now + self.lease_seconds, now, row["id"]),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "filename": row["filename"],
+            "document": row["document"],
+            "params": json.loads(row["params"]),
+        }
+
+    def _finish(self, job_id: str, result: Optional[dict], error: Optional[str]) -> None:
+        with self._lock:
+            # The document is no longer needed once the job is done
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, document = NULL, "
+                "lease_until = NULL, finished_at = ? WHERE id = ?",
+                (
+                    "failed" if error is not None else "done",
+                    None if result is None else json.dumps(result, ensure_ascii=False),
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def _renew(self, job_id: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, job_id),
+            )
+
+    async def _keep_lease(self, job_id: str) -> None:
+        """Renew the lease of a running job until cancelled."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self._renew, job_id)
+            except Exception:
+                # Retried at the next interval, well before the lease expires
+                logging.exception(f"Could not renew the lease of job {job_id}")
+
+    def _release(self, job_id: str) -> None:
+        """Put an interrupted job back in the queue, without counting the attempt."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, "
+                "lease_until = NULL WHERE id = ?",
+                (job_id,),
+            )
+
+    def _callback_url(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT callback_url FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return row["callback_url"] if row else None
+
+    def _set_callback_status(self, job_id: str, status: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET callback_status = ? WHERE id = ?", (status, job_id)
+            )
+
+    async def _notify(self, job_id: str) -> None:
+        """POST the finished job to its callback URL, retrying failed deliveries."""
+        url = await asyncio.to_thread(self._callback_url, job_id)
+        if not url:
+            return
+        try:
+            # The allowlist may have changed since the job was queued
+            self.check_callback_url(url)
+        except ValueError as e:
+            logging.warning(f"Callback for job {job_id} to {url} not sent: {e}")
+            await asyncio.to_thread(self._set_callback_status, job_id, f"failed: {e}")
+            return
+        payload = await asyncio.to_thread(self.get, job_id)
+        for attempt in range(self.callback_retries + 1):
+            try:
+                response = await self._http.post(url, json=payload)
+                if response.status_code < 500:
+                    await asyncio.to_thread(
+                        self._set_callback_status, job_id, str(response.status_code)
+                    )
+                    return
+                error = f"HTTP {response.status_code}"
+            except Exception as e:
+                # Also invalid URLs, which are not httpx.HTTPErrors
+                error = repr(e)
+            if attempt < self.callback_retries:
+                await asyncio.sleep(random.uniform(0, 2**attempt))
+        logging.warning(f"Callback for job {job_id} to {url} failed: {error}")
+        await asyncio.to_thread(self._set_callback_status, job_id, f"failed: {error}")
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                await self._run_next()
+            except Exception:
+                # A locked database or a failing callback must not end the worker
+                logging.exception("Job worker error")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run_next(self) -> None:
+        """Run the next job, or wait for one to be submitted."""
+        job = await asyncio.to_thread(self._claim)
+        if job is None:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            return
+
+        self.running += 1
+        lease = asyncio.create_task(self._keep_lease(job["job_id"]))
+        try:
+            result = await self.handler(job)
+        except asyncio.CancelledError:
+            # Shutdown: another worker or the next start runs the job
+            await asyncio.to_thread(self._release, job["job_id"])
+            raise
+        except Exception as e:
+            logging.exception(f"Job {job['job_id']} failed")
+            await asyncio.to_thread(self._finish, job["job_id"], None, str(e))
+        else:
+            await asyncio.to_thread(self._finish, job["job_id"], result, None)
+        finally:
+            lease.cancel()
+            self.running -= 1
+        await self._notify(job["job_id"])
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        self._wakeup = asyncio.Event()
+        self._http = httpx.AsyncClient(timeout=self.callback_timeout)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(
+                self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+            )
+        return {
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "running_here": self.running,
+            "max_queued": self.max_queued,
+        }
@@ -0,0 +1,298 @@
+"""
+Gateway for OpenAI-compatible chat completion APIs.
+
+All calls of a process share one keep-alive HTTP connection pool and a
+concurrency limit. Every call has a deadline that covers all of its attempts;
+rate limits (429), server errors (5xx), timeouts and connection errors are
+retried with jittered exponential backoff. A circuit breaker opens after
+repeated failures and rejects calls immediately until a cool-down has
+passed, so callers can fall back to rule-only results instead of waiting.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Optional
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APIError,
+    APIStatusError,
+    AsyncOpenAI,
+    RateLimitError,
+)
+
+
+class LLMUnavailableError(Exception):
+    """The LLM did not produce a completion: breaker open, deadline or error."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. While open, calls
+    are rejected; every `reset_timeout` seconds a single trial call is let
+    through (half-open), and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "half-open":
+            # Restart the cool-down so only this call goes through as a trial
+            self.opened_at = time.monotonic()
+            return True
+        return state == "closed"
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(
+        error,
+        (asyncio.TimeoutError, RateLimitError, APIConnectionError, httpx.TransportError),
+    ):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code >= 500
+    # An error event in a stream, sent by the server after it answered 200
+    return isinstance(error, APIError)
+
+
+def _usage_tokens(usage) -> tuple:
+    """(prompt, completion) tokens of a usage object or of its raw dict."""
+    if isinstance(usage, dict):
+        return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0
+    return usage.prompt_tokens, usage.completion_tokens
+
+
+def _retry_after(error: Exception) -> float:
+    """Seconds requested by a Retry-After header, or 0."""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after", 0)) if response else 0.0
+    except ValueError:
+        return 0.0
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: str,
+        default_headers: Optional[dict] = None,
+        max_concurrency: int = 8,
+        max_connections: int = 16,
+        attempt_timeout: float = 30.0,
+        deadline: float = 60.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.default_headers = default_headers or {}
+        self.max_connections = max_connections
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.in_flight = 0
+        self.waiting = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.calls_by_tag = Counter()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[AsyncOpenAI] = None
+        self._client_pid: Optional[int] = None
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """
+        The pooled client, created on first use in each process so that
+        forked workers never share connections with their parent.
+        """
+        if self._client is None or self._client_pid != os.getpid():
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=httpx.Timeout(self.attempt_timeout),
+            )
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                default_headers=self.default_headers,
+                http_client=http_client,
+                max_retries=0,
+            )
+            self._client_pid = os.getpid()
+        return self._client
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        # Full jitter keeps retrying workers from synchronizing
+        backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+        return max(backoff, _retry_after(error))
+
+    async def _call(
+        self,
+        tag: Optional[str],
+        attempt_call: Callable[[], Awaitable],
+        can_retry: Callable[[], bool] = lambda: True,
+    ):
+        """
+        Run `attempt_call()` under the concurrency limit, retrying transient
+        failures until the deadline, as long as `can_retry()` allows it.
+        Raises LLMUnavailableError if no attempt succeeded.
+        """
+        if tag is not None:
+            self.calls_by_tag[tag] += 1
+        if not self.breaker.allow():
+            raise LLMUnavailableError("LLM circuit breaker is open")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        attempt = 0
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            while True:
+                try:
+                    result = await asyncio.wait_for(
+                        attempt_call(),
+                        timeout=min(self.attempt_timeout, deadline - loop.time()),
+                    )
+                except (APIError, httpx.HTTPError, asyncio.TimeoutError) as error:
+                    delay = self._backoff(attempt, error)
+                    if (
+                        not _is_retryable(error)
+                        or not can_retry()
+                        or attempt >= self.max_retries
+                        or loop.time() + delay >= deadline
+                    ):
+                        self.breaker.record_failure()
+                        raise LLMUnavailableError(
+                            f"LLM call failed after {attempt + 1} attempt(s): "
+                            f"{error!r}"
+                        ) from error
+                    logging.warning(f"LLM call failed ({error!r}), retrying in {delay:.2f}s")
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                except LLMUnavailableError:
+                    self.breaker.record_failure()
+                    raise
+                else:
+                    self.breaker.record_success()
+                    return result
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def chat_completion(self, tag: Optional[str] = None, **params):
+        """
+        Create a chat completion, retrying transient failures until the
+        deadline. Raises LLMUnavailableError if no completion was obtained.
+        `tag` names the prompt (template and version) in the statistics.
+        """
+        response = await self._call(
+            tag, lambda: self.client.chat.completions.create(**params)
+        )
+        self._record_usage(response.usage)
+        return response
+
+    def _record_usage(self, usage) -> None:
+        if usage is not None:
+            prompt_tokens, completion_tokens = _usage_tokens(usage)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    async def stream_chat_completion(
+        self,
+        tag: Optional[str] = None,
+        on_delta: Optional[Callable[[str], Awaitable]] = None,
+        **params,
+    ) -> str:
+        """
+        Stream a chat completion and return its text; `on_delta(text)` is
+        awaited with every piece as it arrives. Failures before the first
+        piece is handed out are retried like in chat_completion, including a
+        stream that breaks off; a stream that breaks off or times out after
+        that is not, as a retry would hand out its beginning again. The token
+        usage is requested as the last chunk of the stream.
+        """
+        delivered = False
+
+        async def attempt_call() -> str:
+            nonlocal delivered
+            stream = await self.client.chat.completions.create(
+                stream=True,
+                # Not a parameter of the pinned client version yet
+                extra_body={"stream_options": {"include_usage": True}},
+                **params,
+            )
+            parts = []
+            try:
+                async for chunk in stream:
+                    # The usage chunk comes last, so a retried attempt has none
+                    self._record_usage(getattr(chunk, "usage", None))
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        if on_delta is not None:
+                            delivered = True
+                            await on_delta(delta)
+            except (APIError, httpx.HTTPError) as error:
+                if not delivered:
+                    # Retried by _call like a failed request
+                    raise
+                raise LLMUnavailableError(f"LLM stream broke off: {error!r}") from error
+            return "".join(parts)
+
+        return await self._call(tag, attempt_call, can_retry=lambda: not delivered)
+
+    def stats(self) -> dict:
+        return {
+            "breaker_state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "calls_by_tag": dict(self.calls_by_tag),
+        }
+
+    async def aclose(self) -> None:
+        if self._client is not None and self._client_pid == os.getpid():
+            await self._client.close()
+        self._client = None
@@ -0,0 +1,281 @@
+"""
+Tolerant parsing of the LLM analysis responses.
+
+repair_json fixes the defects LLM output commonly has: text or code fences
+around the object, smart quotes, unescaped quotes and line breaks inside
+strings, trailing commas, mismatched brackets and truncation (an unfinished
+string, key or value at the end is dropped and the open brackets are
+closed; so is a number at the very end, which may have lost digits). The
+result is validated against AnalysisResponse, which coerces sloppy values
+("80%") and drops requirement matches that stay invalid instead of
+rejecting the whole answer. Only an answer without a numeric overall_score
+(e.g. one cut off inside it) is rejected.
+
+MatchStreamParser follows a streamed response and returns each
+requirement_matches entry as soon as its object is complete.
+"""
+
+import json
+import re
+from typing import Any, List, Optional
+
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+
+SMART_QUOTES = "“”„‟″«»"
+CLOSING_FOLLOWERS = ",:}]"
+NUMBER = re.compile(r"-?\d+(?:[.,]\d+)?")
+
+
+def _to_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        found = NUMBER.search(value)
+        if found:
+            return float(found.group().replace(",", "."))
+    return None
+
+
+class RequirementMatch(BaseModel):
+    requirement: str
+    match_percentage: float
+    explanation: str = ""
+
+    @field_validator("requirement", "explanation", mode="before")
+    @classmethod
+    def _text(cls, value):
+        return "" if value is None else str(value)
+
+    @field_validator("match_percentage", mode="before")
+    @classmethod
+    def _percentage(cls, value):
+        number = _to_number(value)
+        if number is None:
+            raise ValueError(f"not a percentage: {value!r}")
+        return number
+
+
+class AnalysisResponse(BaseModel):
+    # Fields the prompt does not ask for are kept as they are
+    model_config = ConfigDict(extra="allow")
+
+    # Required: the score is what the analysis is ranked and adjusted by
+    overall_score: float
+    seniority_level: Optional[str] = None
+    requirement_matches: List[RequirementMatch] = []
+    summary: str = ""
+    key_strengths: List[str] = []
+    improvement_areas: List[str] = []
+
+    @field_validator("overall_score", mode="before")
+    @classmethod
+    def _score(cls, value):
+        return _to_number(value)
+
+    @field_validator("seniority_level", "summary", mode="before")
+    @classmethod
+    def _text(cls, value):
+        return value if value is None or isinstance(value, str) else str(value)
+
+    @field_validator("requirement_matches", mode="before")
+    @classmethod
+    def _matches(cls, value):
+        if not isinstance(value, list):
+            return []
+        matches = []
+        for item in value:
+            try:
+                matches.append(RequirementMatch.model_validate(item))
+            except ValidationError:
+                continue
+        return matches
+
+    @field_validator("key_strengths", "improvement_areas", mode="before")
+    @classmethod
+    def _texts(cls, value):
+        if not isinstance(value, list):
+            return []
+        return [str(item) for item in value if item is not None]
+
+
+def _is_quote(char: str) -> bool:
+    return char == '"' or char in SMART_QUOTES
+
+
+def _closes_string(text: str, position: int) -> bool:
+    """Whether a quote before `position` ends a string rather than being part of it."""
+    while position < len(text) and text[position] in " \t\r\n":
+        position += 1
+    return position >= len(text) or text[position] in CLOSING_FOLLOWERS
+
+
+def _strip_trailing_comma(out: List[str]) -> None:
+    end = len(out)
+    while end and out[end - 1] in " \t\r\n":
+        end -= 1
+    if end and out[end - 1] == ",":
+        del out[end - 1]
+
+
+def _closers(stack: List[str]) -> str:
+    return "".join("}" if opener == "{" else "]" for opener in reversed(stack))
+
+
+def _cut_back(out: List[str], safe_points: list) -> str:
+    """Drop the unfinished key or value at the end and close the open brackets."""
+    cut, open_brackets = safe_points[-1]
+    out = out[:cut]
+    _strip_trailing_comma(out)
+    return "".join(out) + _closers(open_brackets)
+
+
+def repair_json(text: str) -> str:
+    """Return the first JSON object in `text`, repaired so that json.loads accepts it."""
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("No JSON object in the response")
+
+    out: List[str] = []
+    stack: List[str] = []
+    # Positions in `out` where the text can be cut, with the brackets open there
+    safe_points = []
+    in_string = False
+    escape = False
+    for position in range(start, len(text)):
+        char = text[position]
+        if in_string:
+            if escape:
+                out.append(char)
+                escape = False
+            elif char == "\\":
+                out.append(char)
+                escape = True
+            elif _is_quote(char):
+                if _closes_string(text, position + 1):
+                    out.append('"')
+                    in_string = False
+                else:
+                    out.append('\\"')
+            elif char == "\n":
+                out.append("\\n")
+            elif char == "\r":
+                out.append("\\r")
+            elif char == "\t":
+                out.append("\\t")
+            else:
+                out.append(char)
+        elif _is_quote(char):
+            out.append('"')
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+            out.append(char)
+            safe_points.append((len(out), list(stack)))
+        elif char in "}]":
+            _strip_trailing_comma(out)
+            out.append("}" if stack.pop() == "{" else "]")
+            if not stack:
+                # Text after the top-level object is ignored
+                return "".join(out)
+            safe_points.append((len(out), list(stack)))
+        elif char == ",":
+            safe_points.append((len(out), list(stack)))
+            out.append(char)
+        else:
+            out.append(char)
+
+    # Truncated response: close the open string and brackets
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    elif out and out[-1].isdigit():
+        # "match_percentage": 8 may have been cut from 85
+        return _cut_back(out, safe_points)
+    _strip_trailing_comma(out)
+    candidate = "".join(out) + _closers(stack)
+    try:
+        json.loads(candidate)
+        return candidate
+    except json.JSONDecodeError:
+        # An unfinished key or value: cut back to the last complete one
+        return _cut_back(out, safe_points)
+
+
+def parse_analysis(text: str) -> dict:
+    """
+    Parse and validate an analysis response. Raises json.JSONDecodeError or
+    ValueError if no usable JSON object can be recovered.
+    """
+    data = json.loads(repair_json(text))
+    if not isinstance(data, dict):
+        raise ValueError("The response is not a JSON object")
+    return AnalysisResponse.model_validate(data).model_dump()
+
+
+def parse_match(text: str) -> Optional[dict]:
+    """Parse one requirement match object, or return None if it is unusable."""
+    try:
+        return RequirementMatch.model_validate(json.loads(repair_json(text))).model_dump()
+    except (ValueError, ValidationError):
+        return None
+
+
+class MatchStreamParser:
+    """
+    Feed the text of a streamed analysis chunk by chunk; feed() returns the
+    requirement_matches entries completed by that chunk.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._position = 0
+        # One (bracket, key) per open container; key is set for object members
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._chars = []
+        self._last_string = None
+        self._key = None
+        self._match_start = None
+
+    def _in_matches_array(self) -> bool:
+        return len(self._stack) == 2 and self._stack[1] == ("[", "requirement_matches")
+
+    def feed(self, chunk: str) -> List[dict]:
+        self.text += chunk
+        completed = []
+        for position in range(self._position, len(self.text)):
+            char = self.text[position]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = "".join(self._chars)
+                else:
+                    self._chars.append(char)
+            elif char == '"':
+                self._in_string = True
+                self._chars = []
+            elif char == ":":
+                self._key = self._last_string
+            elif char in "{[":
+                if char == "{" and self._in_matches_array():
+                    self._match_start = position
+                in_object = bool(self._stack) and self._stack[-1][0] == "{"
+                self._stack.append((char, self._key if in_object else None))
+                self._key = None
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                if char == "}" and self._match_start is not None and self._in_matches_array():
+                    match = parse_match(self.text[self._match_start : position + 1])
+                    if match is not None:
+                        completed.append(match)
+                    self._match_start = None
+        self._position = len(self.text)
+        return completed
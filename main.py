@@ -1,36 +1,314 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Query
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict
-import PyPDF2
+from typing import List, Dict, Optional, Tuple, Union
+import contextvars
+import functools
+import hashlib
+import hmac
 import io
-import spacy
-import numpy as np
 import json
-from openai import OpenAI
+import mmap
+import re
+import zipfile
+import ahocorasick
+import numpy as np
 import os
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import logging
+from starlette.datastructures import Headers
+from prometheus_client import CONTENT_TYPE_LATEST
+
+# Load environment variables before the modules below read their settings
+load_dotenv()
+
+from analysis_cache import AnalysisCache, make_cache_key
+from candidate_store import SKILL_LEVELS, CandidateStore, make_candidate_id, normalize_requirement
+from context_selection import select_context, terms
+from job_queue import JobQueue, QueueFullError
+from llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailableError
+from llm_response import MatchStreamParser, parse_analysis
+from semantic import calculate_semantic_similarity, semantic_requirement_matches
+from prompts import active_prompt
+from requirement_sets import RequirementSetStore, normalize_requirement_list
+from scoring_config import ScoringConfigStore, pinned_config_var
+from telemetry import (
+    REQUEST_SECONDS,
+    StatsCollector,
+    configure_logging,
+    latest_metrics,
+    new_request_id,
+    publish_stats,
+    register_stats,
+    request_id_var,
+    span,
+)
+from pdf_extraction import (
+    NormalizedText,
+    extract_pages,
+    iter_pdf_pages,
+    normalize_text,
+    shutdown_page_pool,
+)
+
+configure_logging()
 
 app = FastAPI()
 
-# Load environment variables
-load_dotenv()
+# Concurrency limits for the request path
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "4"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+
+# PDF parsing is CPU-bound and runs on this pool instead of the event loop
+pdf_executor = ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix="pdf")
 
-# Initialize OpenRouter client
-client = OpenAI(
+# Threads for the SQLite calls of the candidate store, job queue, requirement
+# sets and persistent cache, so a busy database never blocks the event loop
+DB_THREADS = int(os.getenv("DB_THREADS", "4"))
+db_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="db")
+
+# OpenRouter client: pooled connections, at most LLM_CONCURRENCY calls in
+# flight per worker, retries within a per-call deadline and a circuit breaker
+llm_gateway = LLMGateway(
     api_key=os.getenv("OPENROUTER_API_KEY"),
-    base_url="https://openrouter.ai/api/v1",
+    base_url=os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
     default_headers={"HTTP-Referer": "http://localhost:3000", "X-Title": "CV Parser"},
+    max_concurrency=LLM_CONCURRENCY,
+    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", str(LLM_CONCURRENCY))),
+    attempt_timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "30")),
+    deadline=float(os.getenv("LLM_DEADLINE_SECONDS", "60")),
+    max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+        reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+    ),
 )
 
-# Load the German language model
-try:
-    nlp = spacy.load("de_core_news_sm")
-except OSError:
-    raise RuntimeError(
-        "The German language model is not installed. Please run: python -m spacy download de_core_news_sm"
+# Limits for /analyze/batch: CVs processed at once and CVs per request
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+
+# Upload limits: one CV, and a whole /analyze/batch request
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "20")) * 2**20)
+MAX_BATCH_UPLOAD_BYTES = int(float(os.getenv("MAX_BATCH_UPLOAD_MB", "500")) * 2**20)
+# Starlette spools uploads from 1 MB to a temporary file; those are
+# memory-mapped instead of read into memory
+UPLOAD_MAP_MIN_BYTES = 2**20
+# Room for the multipart framing and the other form fields
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+PDF_MAGIC = b"%PDF-"
+
+LLM_MODEL = os.getenv("LLM_MODEL", "openai/gpt-3.5-turbo")
+
+# Prompt template from the registry; its version is part of the cache key
+ANALYSIS_PROMPT = active_prompt()
+
+# Requirements per LLM call; longer lists are split into chunks that are
+# analyzed concurrently. Matches the prompt's limit of 5 array elements.
+REQUIREMENT_CHUNK_SIZE = int(os.getenv("REQUIREMENT_CHUNK_SIZE", "5"))
+
+# Token budget for the CV excerpts in the prompt; 0 sends the whole CV
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+
+# Cache for LLM analysis results; CACHE_DB_PATH enables the on-disk backend
+analysis_cache = AnalysisCache(
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.getenv("CACHE_TTL_SECONDS", "86400")),
+    db_path=os.getenv("CACHE_DB_PATH") or None,
+)
+
+# Store of analyzed candidates for search and re-analysis, enabled by setting
+# CANDIDATE_DB_PATH. Stored texts must be complete, so with the store the
+# rules-only scoring reads every page instead of stopping early.
+CANDIDATE_DB_PATH = os.getenv("CANDIDATE_DB_PATH", "")
+candidate_store = CandidateStore(CANDIDATE_DB_PATH) if CANDIDATE_DB_PATH else None
+
+# Requirement lists saved under an ID by /requirement-sets
+REQUIREMENT_SET_DB_PATH = os.getenv("REQUIREMENT_SET_DB_PATH", "requirement_sets.db")
+requirement_sets = RequirementSetStore(REQUIREMENT_SET_DB_PATH)
+
+# Stored per-requirement LLM answers are reused only with the same model,
+# prompt and context budget; get_ai_analysis adds the scoring config version
+REQUIREMENT_ANALYSIS_VERSION = f"{LLM_MODEL}:{ANALYSIS_PROMPT.version}:{CONTEXT_TOKEN_BUDGET}"
+
+# Queue of /jobs analyses, run by JOB_WORKERS tasks per server process
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+# Where finished jobs may be POSTed; no hosts turns callbacks off
+JOB_CALLBACK_SCHEMES = [
+    scheme.strip()
+    for scheme in os.getenv("JOB_CALLBACK_SCHEMES", "https").split(",")
+    if scheme.strip()
+]
+JOB_CALLBACK_HOSTS = [
+    host.strip() for host in os.getenv("JOB_CALLBACK_HOSTS", "").split(",") if host.strip()
+]
+
+# Prometheus metrics read from the components at scrape time (see telemetry.py)
+register_stats(
+    StatsCollector(
+        analysis_cache.stats,
+        counters={
+            "hits": ("cv_parser_cache_hits", "Analysis cache hits"),
+            "misses": ("cv_parser_cache_misses", "Analysis cache misses"),
+        },
+        gauges={
+            # Rates do not add up across workers
+            "hit_rate": ("cv_parser_cache_hit_rate", "Analysis cache hit rate", "liveall"),
+            "entries": ("cv_parser_cache_entries", "Entries in the in-memory analysis cache"),
+        },
+    )
+)
+register_stats(
+    StatsCollector(
+        llm_gateway.stats,
+        counters={
+            "prompt_tokens": ("cv_parser_llm_prompt_tokens", "Prompt tokens sent to the LLM"),
+            "completion_tokens": ("cv_parser_llm_completion_tokens", "Completion tokens received"),
+        },
+        gauges={
+            "in_flight": ("cv_parser_llm_in_flight", "LLM calls in flight"),
+            "waiting": ("cv_parser_llm_waiting", "LLM calls waiting for a free slot"),
+        },
+    )
+)
+register_stats(
+    StatsCollector(
+        lambda: {
+            "pdf_queue_depth": pdf_executor._work_queue.qsize(),
+            "llm_breaker_open": llm_gateway.breaker.state == "open",
+        },
+        gauges={
+            "pdf_queue_depth": (
+                "cv_parser_pdf_queue_depth",
+                "PDF jobs waiting for a worker thread",
+            ),
+            "llm_breaker_open": (
+                "cv_parser_llm_breaker_open",
+                "1 while the LLM circuit breaker is open",
+                "livemax",
+            ),
+        },
     )
+)
+# The job queue is one database for all workers
+register_stats(
+    StatsCollector(
+        lambda: job_queue.stats(),
+        gauges={"queued": ("cv_parser_jobs_queued", "Analysis jobs waiting for a worker")},
+        shared=True,
+    )
+)
+
+class UploadSizeLimit:
+    """
+    Reject uploads over the limit: before reading them if Content-Length
+    declares more, else as soon as more has arrived, which also covers
+    chunked bodies without a Content-Length. Plain ASGI, as the limit has to
+    wrap `receive`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        limit = (
+            MAX_BATCH_UPLOAD_BYTES
+            if scope["path"] == "/analyze/batch"
+            else MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD
+        )
+        detail = f"The upload is larger than {limit // 2**20} MB"
+        length = Headers(scope=scope).get("content-length", "")
+        if length.isdigit() and int(length) > limit:
+            response = JSONResponse(status_code=413, content={"detail": detail})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Aborts the form parsing; answered by the exception handler
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(UploadSizeLimit)
+
+
+@app.middleware("http")
+async def pin_scoring_config(request: Request, call_next):
+    """Score the whole request with the config current at its start, across reloads."""
+    with scoring_configs.pinned():
+        return await call_next(request)
+
+
+@app.middleware("http")
+async def request_telemetry(request: Request, call_next):
+    """Tag the request with an ID for its logs and record its duration."""
+    request_id = new_request_id(request.headers.get("x-request-id"))
+    token = request_id_var.set(request_id)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        REQUEST_SECONDS.labels(
+            request.method, route.path if route else "unmatched", str(status)
+        ).observe(elapsed)
+        # Pre-forked workers: keep this worker's share of /metrics current
+        publish_stats()
+        logging.info(
+            "request finished",
+            extra={
+                "method": request.method,
+                "path": request.url.path,
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 1),
+            },
+        )
+        request_id_var.reset(token)
+
+
+def run_in_pdf_executor(func, *args):
+    """Run `func` on the PDF pool, keeping the request ID for its logs."""
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(
+        pdf_executor, functools.partial(context.run, func, *args)
+    )
+
+
+def run_in_db_executor(func, *args, **kwargs):
+    """
+    Run a database call on the DB threads. The request context goes along,
+    so the request ID and the pinned scoring config apply there as well.
+    """
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(
+        db_executor, functools.partial(context.run, func, *args, **kwargs)
+    )
+
 
 # Configure CORS
 app.add_middleware(
@@ -51,305 +329,41 @@ class Requirement(BaseModel):
     text: str
 
 
-# Seniority level criteria for consultant role
-CONSULTANT_CRITERIA = {
-    "process_modeling": {
-        "Junior": "Basic",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-    "sap_core": {
-        "Junior": "None",
-        "Professional": "Basic",
-        "Senior": "Basic",
-        "Principal": "Basic",
-    },
-    "ecc_systems": {
-        "Junior": "None",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-    "s4_systems": {
-        "Junior": "None",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-    "ecc_s4_processes": {
-        "Junior": "None",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Advanced",
-    },
-    "sap_technology": {
-        "Junior": "Basic",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Advanced",
-    },
-    "non_sap": {
-        "Junior": "Basic",
-        "Professional": "Advanced",
-        "Senior": "Advanced",
-        "Principal": "Advanced",
-    },
-    "modeling": {
-        "Junior": "Basic",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-    "process_management": {
-        "Junior": "None",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Advanced",
-    },
-    "requirements_engineering": {
-        "Junior": "None",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-    "project_management": {
-        "Junior": "None",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-    "energy_industry_general": {
-        "Junior": "Basic",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Advanced",
-    },
-    "energy_industry_network": {
-        "Junior": "None",
-        "Professional": "None",
-        "Senior": "Basic",
-        "Principal": "Basic",
-    },
-    "energy_industry_supply": {
-        "Junior": "None",
-        "Professional": "None",
-        "Senior": "Basic",
-        "Principal": "Basic",
-    },
-    "energy_industry_msb": {
-        "Junior": "None",
-        "Professional": "None",
-        "Senior": "Basic",
-        "Principal": "Advanced",
-    },
-    "language_skills": {
-        "Junior": "None",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-}
+# The seniority criteria, level requirements and keyword tables of the
+# rule-based assessment are read from SCORING_CONFIG_PATH (see scoring_config.py)
+SCORING_CONFIG_PATH = os.getenv(
+    "SCORING_CONFIG_PATH", os.path.join(os.path.dirname(__file__), "scoring_config.json")
+)
+SCORING_CONFIG_CHECK_SECONDS = float(os.getenv("SCORING_CONFIG_CHECK_SECONDS", "5"))
+# Bearer token for POST /config/reload; without one the endpoint is off and
+# changed files are only picked up by the periodic check
+CONFIG_ADMIN_TOKEN = os.getenv("CONFIG_ADMIN_TOKEN", "")
 
-# Seniority level criteria for developer role
-DEVELOPER_CRITERIA = {
-    "process_modeling": {
-        "Junior": "None",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-    "sap_core": {
-        "Junior": "None",
-        "Professional": "Basic",
-        "Senior": "Basic",
-        "Principal": "Basic",
-    },
-    "ecc_systems": {
-        "Junior": "None",
-        "Professional": "None",
-        "Senior": "None",
-        "Principal": "Basic",
-    },
-    "s4_systems": {
-        "Junior": "Basic",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-    "ecc_s4_processes": {
-        "Junior": "None",
-        "Professional": "Basic",
-        "Senior": "Basic",
-        "Principal": "Basic",
-    },
-    "sap_technology": {
-        "Junior": "Basic",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-    "non_sap": {
-        "Junior": "Basic",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-    "modeling": {
-        "Junior": "Basic",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-    "process_management": {
-        "Junior": "Basic",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-    "requirements_engineering": {
-        "Junior": "None",
-        "Professional": "Advanced",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-    "energy_industry_general": {
-        "Junior": "Basic",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Advanced",
-    },
-    "energy_industry_network": {
-        "Junior": "None",
-        "Professional": "None",
-        "Senior": "Basic",
-        "Principal": "Basic",
-    },
-    "energy_industry_supply": {
-        "Junior": "None",
-        "Professional": "None",
-        "Senior": "Basic",
-        "Principal": "Basic",
-    },
-    "energy_industry_msb": {
-        "Junior": "None",
-        "Professional": "None",
-        "Senior": "Basic",
-        "Principal": "Basic",
-    },
-    "language_skills": {
-        "Junior": "None",
-        "Professional": "Basic",
-        "Senior": "Advanced",
-        "Principal": "Expert",
-    },
-}
 
-# Additional criteria for specific levels
-LEVEL_SPECIFIC_REQUIREMENTS = {
-    "Principal": {
-        "required_expert": ["requirements_engineering"],
-        "required_advanced": [
-            "process_modeling",
-            "ecc_systems",
-            "s4_systems",
-            "project_management",
-            "energy_industry_general",
-            "energy_industry_msb",
-        ],
-    },
-    "Senior": {
-        "required_advanced": [
-            "process_modeling",
-            "ecc_systems",
-            "s4_systems",
-            "sap_technology",
-            "modeling",
-            "process_management",
-            "requirements_engineering",
-        ],
-        "required_basic": [
-            "energy_industry_general",
-            "energy_industry_network",
-            "energy_industry_supply",
-            "energy_industry_msb",
-        ],
-    },
-    "Professional": {
-        "required_basic": [
-            "sap_core",
-            "ecc_systems",
-            "s4_systems",
-            "process_management",
-            "requirements_engineering",
-            "project_management",
-            "energy_industry_general",
-        ]
-    },
-    "Junior": {"required_basic": ["ms_office", "process_modeling", "sap_technology"]},
-}
+def _flatten_keywords(*tables) -> List[str]:
+    keywords = []
+    for table in tables:
+        groups = table.values() if isinstance(table, dict) else [table]
+        for group in groups:
+            keywords.extend(group)
+    return sorted(set(keywords))
 
-# Additional criteria for specific developer levels
-DEVELOPER_LEVEL_SPECIFIC_REQUIREMENTS = {
-    "Principal": {
-        "required_expert": [
-            "process_modeling",
-            "s4_systems",
-            "sap_technology",
-            "requirements_engineering",
-            "non_sap",
-        ],
-        "required_advanced": [
-            "project_management",
-            "process_management",
-            "energy_industry_general",
-        ],
-        "required_basic": [
-            "ecc_systems",
-            "energy_industry_network",
-            "energy_industry_supply",
-            "energy_industry_msb",
-        ],
-    },
-    "Senior": {
-        "required_advanced": [
-            "process_modeling",
-            "s4_systems",
-            "sap_technology",
-            "non_sap",
-            "modeling",
-            "process_management",
-            "requirements_engineering",
-        ],
-        "required_basic": [
-            "energy_industry_general",
-            "energy_industry_network",
-            "energy_industry_supply",
-            "energy_industry_msb",
-        ],
-    },
-    "Professional": {
-        "required_advanced": [
-            "ms_office",
-            "requirements_engineering",
-            "project_management",
-        ],
-        "required_basic": [
-            "process_modeling",
-            "sap_core",
-            "s4_systems",
-            "ecc_s4_processes",
-            "sap_technology",
-            "non_sap",
-            "modeling",
-            "process_management",
-            "energy_industry_general",
-        ],
-    },
-    "Junior": {
-        "required_basic": ["ms_office", "sap_technology", "non_sap", "modeling"]
-    },
-}
+
+def _build_automaton(keywords: List[str]) -> ahocorasick.Automaton:
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+def find_keywords(text: str) -> set:
+    """
+    Return every keyword of the scoring config that occurs in the (already
+    lowercased) text, in a single pass. Overlapping matches are reported too,
+    so the result is exactly the set of keywords for which `kw in text`.
+    """
+    return {keyword for _, keyword in active_scoring_config().automaton.iter(text)}
 
 
 def determine_skill_level(text: str) -> Dict[str, str]:
@@ -357,23 +371,27 @@ def determine_skill_level(text: str) -> Dict[str, str]:
     Determine the skill level for each category based on the CV text.
     Returns a dictionary with skill categories and their levels (None, Basic, Advanced, Expert).
     """
-    skill_levels = {}
-    text = text.lower()
+    with span("skill_levels"):
+        return skill_levels_from_hits(find_keywords(normalize_text(text)))
 
-    # Language Skills with enhanced recognition
-    language_keywords = {
-        "expert": ["muttersprachler", "native", "c2", "verhandlungssicher"],
-        "advanced": ["deutsch c1", "fließend", "sehr gut", "business fluent"],
-        "basic": ["gut", "b2", "b1", "a2", "a1"],
-    }
+
+def skill_levels_from_hits(hits: set) -> Dict[str, str]:
+    """
+    Derive the skill levels from the set of keywords found in the CV text
+    (see find_keywords).
+    """
+    config = active_scoring_config()
+    tables = config.keywords
+    markers = tables["markers"]
+    skill_levels = {}
 
     # Default language skills to None
     skill_levels["language_skills"] = "None"
 
     # Check for advanced and expert level keywords
-    if any(kw in text for kw in language_keywords["advanced"]):
+    if any(kw in hits for kw in tables["language"]["advanced"]):
         skill_levels["language_skills"] = "Advanced"
-    elif any(kw in text for kw in language_keywords["expert"]):
+    elif any(kw in hits for kw in tables["language"]["expert"]):
         skill_levels["language_skills"] = "Expert"
 
     # Ensure candidates with language skills 'None' or 'Basic' receive a 0% match
@@ -384,57 +402,11 @@ def determine_skill_level(text: str) -> Dict[str, str]:
         skill_levels["language_skills"] = "None"
         # We'll continue with the skill assessment but will enforce 0% match in get_ai_analysis
 
-    # Expert level indicators with stronger recognition
-    expert_indicators = [
-        "expert",
-        "lead",
-        "leitung",
-        "führung",
-        "architect",
-        "principal",
-        "senior",
-        "mehrjährige erfahrung",
-        "langjährige erfahrung",
-        "umfangreiche erfahrung",
-        "extensive experience",
-        "projektleiter",
-        "teamleiter",
-        "chief",
-        "head of",
-        "leiter",
-        "manager",
-        "berater",
-        "solution architect",
-        "enterprise architect",
-        "technical lead",
-        "fachexperte",
-        "specialist",
-        "spezialist",
-        "strategisch",
-    ]
-
-    expert_matches = sum(1 for indicator in expert_indicators if indicator in text)
+    expert_matches = sum(1 for indicator in tables["expert_indicators"] if indicator in hits)
     is_expert_level = expert_matches >= 3
 
     # Similar company experience assessment with stronger weighting
-    similar_companies = [
-        "convista",
-        "koenig.solutions",
-        "incept4",
-        "cronos",
-        "intense ag",
-        "hochfrequenz",
-        "dsc unternehmensberatung",
-        "power reply",
-        "nea gruppe",
-        "cerebricks",
-        "energy4u",
-        "nexus nova",
-        "demando",
-        "adesso orange",
-    ]
-
-    company_matches = sum(1 for company in similar_companies if company in text)
+    company_matches = sum(1 for company in tables["similar_companies"] if company in hits)
     if company_matches > 1:
         skill_levels["similar_company_experience"] = "Expert"
     elif company_matches > 0:
@@ -443,19 +415,11 @@ def determine_skill_level(text: str) -> Dict[str, str]:
         skill_levels["similar_company_experience"] = "Basic"
 
     # Location assessment
-    location_keywords = {
-        "mannheim": ["mannheim", "ludwigshafen", "heidelberg"],
-        "rhein_neckar": ["rhein-neckar", "rhein neckar", "metropolregion"],
-        "frankfurt": ["frankfurt", "main-taunus", "rhein-main"],
-        "nrw": ["düsseldorf", "wuppertal", "nrw", "nordrhein-westfalen"],
-        "thueringen": ["thüringen", "erfurt", "jena", "gera"],
-    }
-
     location_matches = sum(
         1
-        for region in location_keywords.values()
+        for region in tables["location"].values()
         for keyword in region
-        if keyword in text
+        if keyword in hits
     )
 
     if location_matches > 0:
@@ -464,83 +428,57 @@ def determine_skill_level(text: str) -> Dict[str, str]:
         skill_levels["location"] = "Basic"
 
     # Education with enhanced recognition
-    education_keywords = {
-        "expert": ["promotion", "doktor", "dr.", "phd", "master", "diplom"],
-        "advanced": ["hochschulabschluss", "universität", "studium", "bachelor"],
-        "basic": ["ausbildung", "berufsausbildung", "fachhochschule"],
-    }
-
-    if any(kw in text for kw in education_keywords["expert"]):
+    if any(kw in hits for kw in tables["education"]["expert"]):
         skill_levels["education"] = "Expert"
-    elif any(kw in text for kw in education_keywords["advanced"]):
+    elif any(kw in hits for kw in tables["education"]["advanced"]):
         skill_levels["education"] = "Advanced"
-    elif any(kw in text for kw in education_keywords["basic"]):
+    elif any(kw in hits for kw in tables["education"]["basic"]):
         skill_levels["education"] = "Basic"
 
     # Soft Skills with enhanced recognition
-    soft_skills_keywords = {
-        "expert": [
-            "führungserfahrung",
-            "personalverantwortung",
-            "teamleitung",
-            "mentoring",
-        ],
-        "advanced": ["projektleitung", "kundenberatung", "verhandlung", "präsentation"],
-        "basic": ["teamfähigkeit", "engagement", "kundenorientierung"],
-    }
-
-    if any(kw in text for kw in soft_skills_keywords["expert"]):
+    if any(kw in hits for kw in tables["soft_skills"]["expert"]):
         skill_levels["soft_skills"] = "Expert"
-    elif any(kw in text for kw in soft_skills_keywords["advanced"]):
+    elif any(kw in hits for kw in tables["soft_skills"]["advanced"]):
         skill_levels["soft_skills"] = "Advanced"
-    elif any(kw in text for kw in soft_skills_keywords["basic"]):
+    elif any(kw in hits for kw in tables["soft_skills"]["basic"]):
         skill_levels["soft_skills"] = "Basic"
 
     # MS Office skills
-    if "ms office" in text or "microsoft office" in text:
-        if "expert" in text or "sehr gut" in text:
+    if any(kw in hits for kw in tables["ms_office"]):
+        if any(kw in hits for kw in markers["expert_level"]):
             skill_levels["ms_office"] = "Expert"
-        elif "fortgeschritten" in text or "advanced" in text:
+        elif any(kw in hits for kw in markers["advanced_level"]):
             skill_levels["ms_office"] = "Advanced"
         else:
             skill_levels["ms_office"] = "Basic"
 
     # Process modeling with enhanced recognition
-    process_modeling_tools = [
-        "camunda",
-        "signavio",
-        "bpmn",
-        "prozessmodellierung",
-        "aris",
-    ]
-    if any(tool in text for tool in process_modeling_tools):
-        if is_expert_level or "prozessoptimierung" in text:
+    if any(tool in hits for tool in tables["process_modeling_tools"]):
+        if is_expert_level or any(kw in hits for kw in markers["process_optimization"]):
             skill_levels["process_modeling"] = "Expert"
-        elif "fortgeschritten" in text or "advanced" in text:
+        elif any(kw in hits for kw in markers["advanced_level"]):
             skill_levels["process_modeling"] = "Advanced"
         else:
             skill_levels["process_modeling"] = "Basic"
 
     # SAP Core and ECC Systems with enhanced recognition
-    if "sap" in text:
+    if any(kw in hits for kw in markers["sap"]):
         if is_expert_level:
             skill_levels["sap_core"] = "Expert"
         else:
             skill_levels["sap_core"] = "Advanced"
 
         # Check ECC systems expertise
-        ecc_keywords = ["is-u", "idex", "im4g", "sap ecc"]
-        ecc_matches = sum(1 for keyword in ecc_keywords if keyword in text)
+        ecc_matches = sum(1 for keyword in tables["ecc"] if keyword in hits)
         if ecc_matches >= 2 and is_expert_level:
             skill_levels["ecc_systems"] = "Expert"
         elif ecc_matches >= 1:
             skill_levels["ecc_systems"] = "Advanced"
-        elif "ecc" in text:
+        elif any(kw in hits for kw in markers["ecc"]):
             skill_levels["ecc_systems"] = "Basic"
 
     # S/4 Systems with enhanced recognition
-    s4_keywords = ["s/4", "s4", "s4hana", "s/4 hana", "utilities", "maco", "ucom"]
-    s4_matches = sum(1 for keyword in s4_keywords if keyword in text)
+    s4_matches = sum(1 for keyword in tables["s4"] if keyword in hits)
     if s4_matches >= 3 and is_expert_level:
         skill_levels["s4_systems"] = "Expert"
     elif s4_matches >= 2:
@@ -549,20 +487,7 @@ def determine_skill_level(text: str) -> Dict[str, str]:
         skill_levels["s4_systems"] = "Basic"
 
     # ECC and S/4 Processes with enhanced recognition
-    process_keywords = [
-        "stammdaten",
-        "datenmodelle",
-        "messkonzepte",
-        "geräteverwaltung",
-        "edm",
-        "abrechnung",
-        "fakturierung",
-        "fi-ca",
-        "mos-billing",
-        "memi",
-        "eeg billing",
-    ]
-    process_matches = sum(1 for keyword in process_keywords if keyword in text)
+    process_matches = sum(1 for keyword in tables["process"] if keyword in hits)
     if process_matches >= 5 and is_expert_level:
         skill_levels["ecc_s4_processes"] = "Expert"
     elif process_matches >= 3:
@@ -571,19 +496,9 @@ def determine_skill_level(text: str) -> Dict[str, str]:
         skill_levels["ecc_s4_processes"] = "Basic"
 
     # SAP Technology with enhanced recognition
-    tech_keywords = {
-        "transport": ["transportverwaltung", "transport management"],
-        "rap": ["rap", "rest application programming"],
-        "cap": ["cap", "cloud application programming"],
-        "btp": ["btp", "business technology platform"],
-        "fiori": ["fiori", "cds", "core data services"],
-        "abap": ["abap", "abap oo"],
-        "integration": ["integration platform", "cpi"],
-    }
-
     tech_matches = {
-        category: sum(1 for kw in keywords if kw in text)
-        for category, keywords in tech_keywords.items()
+        category: sum(1 for kw in keywords if kw in hits)
+        for category, keywords in tables["tech"].items()
     }
 
     total_matches = sum(tech_matches.values())
@@ -595,26 +510,9 @@ def determine_skill_level(text: str) -> Dict[str, str]:
         skill_levels["sap_technology"] = "Basic"
 
     # Non-SAP Technologies with enhanced recognition
-    nonsap_keywords = {
-        "programming": ["java", "javascript", "nodejs", "python", "flask", "django"],
-        "web": ["html", "css", "soap", "rest", "odata", "soa"],
-        "architecture": [
-            "solution design",
-            "software-architektur",
-            "software-lifecycle",
-        ],
-        "devops": [
-            "ci/cd",
-            "unit tests",
-            "integration tests",
-            "testdriven development",
-        ],
-        "database": ["nosql", "sql"],
-    }
-
     nonsap_matches = {
-        category: sum(1 for kw in keywords if kw in text)
-        for category, keywords in nonsap_keywords.items()
+        category: sum(1 for kw in keywords if kw in hits)
+        for category, keywords in tables["nonsap"].items()
     }
 
     total_nonsap = sum(nonsap_matches.values())
@@ -626,272 +524,365 @@ def determine_skill_level(text: str) -> Dict[str, str]:
         skill_levels["non_sap"] = "Basic"
 
     # Modeling with enhanced recognition
-    modeling_keywords = ["bpmn", "uml", "enterprise architecture"]
-    modeling_matches = sum(1 for keyword in modeling_keywords if keyword in text)
+    modeling_matches = sum(1 for keyword in tables["modeling"] if keyword in hits)
     if modeling_matches >= 2 and is_expert_level:
         skill_levels["modeling"] = "Expert"
     elif modeling_matches >= 1:
         skill_levels["modeling"] = "Advanced"
-    elif "modellierung" in text:
+    elif any(kw in hits for kw in markers["modeling"]):
         skill_levels["modeling"] = "Basic"
 
     # Process Management with enhanced recognition
-    process_mgmt_keywords = {
-        "expert": ["prozessoptimierung", "change management", "transformation"],
-        "advanced": ["prozessanalyse", "prozessbeschreibung"],
-        "basic": ["testfälle", "testkoordination", "testen"],
-    }
-
-    if any(kw in text for kw in process_mgmt_keywords["expert"]) and is_expert_level:
+    if any(kw in hits for kw in tables["process_mgmt"]["expert"]) and is_expert_level:
         skill_levels["process_management"] = "Expert"
-    elif any(kw in text for kw in process_mgmt_keywords["advanced"]):
+    elif any(kw in hits for kw in tables["process_mgmt"]["advanced"]):
         skill_levels["process_management"] = "Advanced"
-    elif any(kw in text for kw in process_mgmt_keywords["basic"]):
+    elif any(kw in hits for kw in tables["process_mgmt"]["basic"]):
         skill_levels["process_management"] = "Basic"
 
     # Requirements Engineering with enhanced recognition
-    req_eng_keywords = {
-        "expert": [
-            "anforderungsmanagement",
-            "requirements engineering",
-            "spezifikation",
-        ],
-        "advanced": ["fachkonzept", "technisches konzept", "anforderungsdefinition"],
-        "basic": ["lastenheft", "pflichtenheft"],
-    }
-
-    if any(kw in text for kw in req_eng_keywords["expert"]) and is_expert_level:
+    if any(kw in hits for kw in tables["req_eng"]["expert"]) and is_expert_level:
         skill_levels["requirements_engineering"] = "Expert"
-    elif any(kw in text for kw in req_eng_keywords["advanced"]):
+    elif any(kw in hits for kw in tables["req_eng"]["advanced"]):
         skill_levels["requirements_engineering"] = "Advanced"
-    elif any(kw in text for kw in req_eng_keywords["basic"]):
+    elif any(kw in hits for kw in tables["req_eng"]["basic"]):
         skill_levels["requirements_engineering"] = "Basic"
 
     # Project Management with enhanced recognition
-    pm_keywords = {
-        "expert": ["portfoliomanagement", "programm management", "multi-project"],
-        "advanced": ["projektleitung", "scrum master", "agile coach"],
-        "basic": ["scrum", "kanban", "wasserfall", "projektplanung"],
-    }
-
-    if any(kw in text for kw in pm_keywords["expert"]) and is_expert_level:
+    if any(kw in hits for kw in tables["pm"]["expert"]) and is_expert_level:
         skill_levels["project_management"] = "Expert"
-    elif any(kw in text for kw in pm_keywords["advanced"]):
+    elif any(kw in hits for kw in tables["pm"]["advanced"]):
         skill_levels["project_management"] = "Advanced"
-    elif any(kw in text for kw in pm_keywords["basic"]):
+    elif any(kw in hits for kw in tables["pm"]["basic"]):
         skill_levels["project_management"] = "Basic"
 
     # Energy Industry General with enhanced recognition
-    energy_keywords = {
-        "expert": ["energiemarkt", "energiewende", "regulierung"],
-        "advanced": ["kundenservice", "messdatenmanagement", "marktkommunikation"],
-        "basic": ["messkonzepte", "wechselprozesse", "gpke", "geli", "wim"],
-    }
-
-    if any(kw in text for kw in energy_keywords["expert"]) and is_expert_level:
+    if any(kw in hits for kw in tables["energy"]["expert"]) and is_expert_level:
         skill_levels["energy_industry_general"] = "Expert"
-    elif any(kw in text for kw in energy_keywords["advanced"]):
+    elif any(kw in hits for kw in tables["energy"]["advanced"]):
         skill_levels["energy_industry_general"] = "Advanced"
-    elif any(kw in text for kw in energy_keywords["basic"]):
+    elif any(kw in hits for kw in tables["energy"]["basic"]):
         skill_levels["energy_industry_general"] = "Basic"
 
     # Energy Industry Network
-    network_keywords = ["netzabrechnung", "einspeiserabrechnung", "netznutzung"]
-    if any(kw in text for kw in network_keywords) and is_expert_level:
+    if any(kw in hits for kw in tables["network"]) and is_expert_level:
         skill_levels["energy_industry_network"] = "Expert"
-    elif any(kw in text for kw in network_keywords):
+    elif any(kw in hits for kw in tables["network"]):
         skill_levels["energy_industry_network"] = "Advanced"
 
     # Energy Industry Supply
-    supply_keywords = ["crm", "rechnungseingangsprüfung", "endkundenabrechnung"]
-    if any(kw in text for kw in supply_keywords) and is_expert_level:
+    if any(kw in hits for kw in tables["supply"]) and is_expert_level:
         skill_levels["energy_industry_supply"] = "Expert"
-    elif any(kw in text for kw in supply_keywords):
+    elif any(kw in hits for kw in tables["supply"]):
         skill_levels["energy_industry_supply"] = "Advanced"
 
     # Energy Industry MSB with enhanced recognition
-    msb_keywords = {
-        "expert": ["smart meter strategie", "msb transformation"],
-        "advanced": ["smart meter rollout", "gateway administration"],
-        "basic": ["gdew", "msbg", "gateway", "mdm"],
-    }
-
-    if any(kw in text for kw in msb_keywords["expert"]) and is_expert_level:
+    if any(kw in hits for kw in tables["msb"]["expert"]) and is_expert_level:
         skill_levels["energy_industry_msb"] = "Expert"
-    elif any(kw in text for kw in msb_keywords["advanced"]):
+    elif any(kw in hits for kw in tables["msb"]["advanced"]):
         skill_levels["energy_industry_msb"] = "Advanced"
-    elif any(kw in text for kw in msb_keywords["basic"]):
+    elif any(kw in hits for kw in tables["msb"]["basic"]):
         skill_levels["energy_industry_msb"] = "Basic"
 
     # Set default "None" for any missing categories
-    for category in DEVELOPER_CRITERIA.keys():
+    for category in config.skill_categories:
         if category not in skill_levels:
             skill_levels[category] = "None"
 
     return skill_levels
 
 
-def determine_seniority_level(
-    skill_levels: Dict[str, str], role: str = "consultant"
-) -> str:
-    """
-    Determine the overall seniority level based on skill levels.
-    Returns "Junior", "Professional", "Senior", or "Principal".
+# Numeric value of each skill level for weighted seniority scoring
+LEVEL_SCORES = {
+    "None": 0.0,
+    "Basic": 1.0,
+    "Advanced": 2.5,  # Increased weight for Advanced
+    "Expert": 4.0,  # Increased weight for Expert
+}
 
-    Args:
-        skill_levels: Dictionary of skill categories and their levels
-        role: Either "consultant" or "developer"
+# Minimum percentage score for each level, checked from highest to lowest
+SENIORITY_THRESHOLDS = {
+    "Principal": 65,  # Further lowered to recognize experienced candidates
+    "Senior": 55,  # Further lowered to recognize experienced candidates
+    "Professional": 45,  # Further lowered to recognize experienced candidates
+    "Junior": 0,  # No threshold for Junior
+}
+
+# Explicit year mentions
+EXPERIENCE_PATTERNS = [
+    re.compile(r"(\d+)\s*(?:jahre|year|jr)"),
+    re.compile(r"(?:über|more than)\s*(\d+)\s*(?:jahre|year)"),
+    re.compile(r"(\d+)\+\s*(?:jahre|year)"),
+]
+
+SENIORITY_EXPERT_INDICATORS = [
+    "expert",
+    "lead",
+    "leitung",
+    "führung",
+    "architect",
+    "principal",
+    "senior",
+    "mehrjährige erfahrung",
+    "langjährige erfahrung",
+    "umfangreiche erfahrung",
+    "extensive experience",
+]
+
+
+# Weight of each requirement list in the level scores
+REQUIREMENT_WEIGHTS = {
+    "required_expert": 3.0,  # Higher weight for expert requirements
+    "required_advanced": 2.0,  # Medium weight for advanced requirements
+    "required_basic": 1.0,  # Base weight for basic requirements
+}
+
+SENIORITY_LEVELS = list(SENIORITY_THRESHOLDS)
+
+def _compile_seniority_matrix(
+    level_requirements: Dict[str, Dict[str, List[str]]], skill_index: List[str]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compile a role's level requirements into a weight matrix (one row per
+    seniority level, one column per skill of `skill_index`) and the maximum
+    possible score of each level, so scoring a skill vector is a single
+    matrix-vector product.
+    """
+    weights = np.zeros((len(SENIORITY_LEVELS), len(skill_index)))
+    max_scores = np.zeros(len(SENIORITY_LEVELS))
+    for level, requirements in level_requirements.items():
+        row = SENIORITY_LEVELS.index(level)
+        for requirement_type, skills in requirements.items():
+            weight = REQUIREMENT_WEIGHTS[requirement_type]
+            for skill in skills:
+                weights[row, skill_index.index(skill)] += weight
+                max_scores[row] += weight * LEVEL_SCORES["Expert"]
+    unscored = [level for level, score in zip(SENIORITY_LEVELS, max_scores) if not score]
+    if unscored:
+        raise ValueError(f"no requirements for the levels {', '.join(unscored)}")
+    return weights, max_scores
+
+
+class ScoringConfig:
+    """
+    A scoring config file compiled for the scoring: one Aho-Corasick
+    automaton over all keyword tables and the seniority matrix of each role.
     """
-    # Ensure no higher seniority level for language skills below C1
-    if skill_levels["language_skills"] == "None":
-        return "Junior"
 
-    # Select the appropriate criteria based on role
-    criteria = CONSULTANT_CRITERIA if role == "consultant" else DEVELOPER_CRITERIA
-    level_requirements = (
-        LEVEL_SPECIFIC_REQUIREMENTS
-        if role == "consultant"
-        else DEVELOPER_LEVEL_SPECIFIC_REQUIREMENTS
-    )
+    def __init__(self, data: dict, version: str):
+        self.version = version
+        self.criteria = data["criteria"]
+        self.level_requirements = data["level_requirements"]
+        self.keywords = data["keywords"]
+
+        self.all_keywords = _flatten_keywords(*self.keywords.values())
+        self.automaton = _build_automaton(self.all_keywords)
+        self.all_keywords_set = frozenset(self.all_keywords)
+        # Characters carried over between pages so keywords spanning a page break are found
+        self.keyword_overlap = max(len(keyword) for keyword in self.all_keywords) - 1
+        # Categories reported as "None" when none of their keywords occur
+        self.skill_categories = list(self.criteria["developer"])
+
+        # Fixed skill order shared by all seniority matrices and skill vectors
+        self.seniority_skill_index = sorted(
+            {
+                skill
+                for level_requirements in self.level_requirements.values()
+                for requirements in level_requirements.values()
+                for skills in requirements.values()
+                for skill in skills
+            }
+        )
+        self.seniority_matrices = {
+            role: _compile_seniority_matrix(level_requirements, self.seniority_skill_index)
+            for role, level_requirements in self.level_requirements.items()
+        }
 
-    # Initialize score for each level
-    level_scores = {"Principal": 0, "Senior": 0, "Professional": 0, "Junior": 0}
 
-    # Helper function to convert level to numeric value with weighted scoring
-    def level_to_score(level: str) -> float:
-        return {
-            "None": 0.0,
-            "Basic": 1.0,
-            "Advanced": 2.5,  # Increased weight for Advanced
-            "Expert": 4.0,  # Increased weight for Expert
-        }[level]
+def active_scoring_config() -> ScoringConfig:
+    """
+    The config pinned by the running request, else the current one (see
+    scoring_config.py). A config being tried by the store is pinned too.
+    """
+    pinned = pinned_config_var.get()
+    return pinned if pinned is not None else scoring_configs.current()
 
-    # Calculate scores for each level with weighted requirements
-    for level, requirements in level_requirements.items():
-        score = 0
-        total_possible = 0
-
-        # Check expert level requirements (highest weight)
-        if "required_expert" in requirements:
-            weight = 3.0  # Higher weight for expert requirements
-            for skill in requirements["required_expert"]:
-                total_possible += (
-                    weight * 4.0
-                )  # Maximum possible score for expert level
-                score += weight * level_to_score(skill_levels.get(skill, "None"))
-
-        # Check advanced level requirements
-        if "required_advanced" in requirements:
-            weight = 2.0  # Medium weight for advanced requirements
-            for skill in requirements["required_advanced"]:
-                total_possible += weight * 4.0  # Maximum possible score
-                score += weight * level_to_score(skill_levels.get(skill, "None"))
-
-        # Check basic level requirements
-        if "required_basic" in requirements:
-            weight = 1.0  # Base weight for basic requirements
-            for skill in requirements["required_basic"]:
-                total_possible += weight * 4.0  # Maximum possible score
-                score += weight * level_to_score(skill_levels.get(skill, "None"))
-
-        # Calculate percentage score for this level
-        if total_possible > 0:
-            percentage = (score / total_possible) * 100
-            level_scores[level] = percentage
 
-    # Experience detection with more specific patterns
-    years_experience = 0
-    cv_text = str(skill_levels).lower()
+SENIORITY_THRESHOLD_VECTOR = np.array(list(SENIORITY_THRESHOLDS.values()), dtype=float)
 
-    # Check for explicit year mentions
-    experience_patterns = [
-        r"(\d+)\s*(?:jahre|year|jr)",
-        r"(?:über|more than)\s*(\d+)\s*(?:jahre|year)",
-        r"(\d+)\+\s*(?:jahre|year)",
-    ]
 
-    import re
+def skill_vector(skill_levels: Dict[str, str], skill_index: List[str]) -> np.ndarray:
+    """Numeric skill levels in `skill_index` order (see ScoringConfig)."""
+    return np.fromiter(
+        (LEVEL_SCORES[skill_levels.get(skill, "None")] for skill in skill_index),
+        dtype=float,
+        count=len(skill_index),
+    )
 
-    for pattern in experience_patterns:
-        matches = re.findall(pattern, cv_text)
-        if matches:
-            try:
-                years = max(int(match) for match in matches)
-                years_experience = max(years_experience, years)
-            except ValueError:
-                continue
 
-    # Check for expert/senior indicators
-    expert_indicators = [
-        "expert",
-        "lead",
-        "leitung",
-        "führung",
-        "architect",
-        "principal",
-        "senior",
-        "mehrjährige erfahrung",
-        "langjährige erfahrung",
-        "umfangreiche erfahrung",
-        "extensive experience",
-    ]
+@functools.lru_cache(maxsize=4096)
+def _experience_indicators(skill_levels_repr: str) -> Tuple[int, int]:
+    """
+    Years of experience and number of expert indicators found in the textual
+    representation of the skill levels.
+    """
+    # Experience detection with more specific patterns
+    years_experience = 0
+    cv_text = skill_levels_repr.lower()
+
+    # Check for explicit year mentions (every pattern needs one of these words)
+    if any(word in cv_text for word in ("jahre", "year", "jr")):
+        for pattern in EXPERIENCE_PATTERNS:
+            matches = pattern.findall(cv_text)
+            if matches:
+                try:
+                    years = max(int(match) for match in matches)
+                    years_experience = max(years_experience, years)
+                except ValueError:
+                    continue
 
-    expert_matches = sum(1 for indicator in expert_indicators if indicator in cv_text)
+    # Check for expert/senior indicators
+    expert_matches = sum(
+        1 for indicator in SENIORITY_EXPERT_INDICATORS if indicator in cv_text
+    )
     if expert_matches >= 3:
         years_experience = max(years_experience, 8)
     elif expert_matches >= 2:
         years_experience = max(years_experience, 5)
 
+    return years_experience, expert_matches
+
+
+# Experience brackets (3-4, 5-7 and 8+ years) and the score bonus each one adds,
+# in SENIORITY_LEVELS order (Principal, Senior, Professional, Junior)
+EXPERIENCE_BRACKETS = np.array([3, 5, 8])
+EXPERIENCE_BONUSES = np.array(
+    [
+        [0, 0, 0, 0],
+        [0, 0, 25, 0],
+        [0, 35, 15, 0],  # Increased bonus for Senior
+        [35, 20, 0, 0],  # Increased bonus for Principal
+    ],
+    dtype=float,
+)
+
+
+def _seniority_from_scores(
+    level_scores: np.ndarray, years: np.ndarray, expert_matches: np.ndarray
+) -> np.ndarray:
+    """
+    Apply the experience bonuses, overrides and thresholds to percentage
+    level scores (columns in SENIORITY_LEVELS order; one row per candidate
+    for a matrix). Returns the index of the chosen level per candidate.
+    """
     # Adjust scores based on experience with higher impact
-    if years_experience >= 8:
-        level_scores["Principal"] += 35  # Increased bonus for Principal
-        level_scores["Senior"] += 20
-    elif years_experience >= 5:
-        level_scores["Senior"] += 35  # Increased bonus for Senior
-        level_scores["Professional"] += 15
-    elif years_experience >= 3:
-        level_scores["Professional"] += 25
+    bracket = np.searchsorted(EXPERIENCE_BRACKETS, years, side="right")
+    level_scores = level_scores + EXPERIENCE_BONUSES[bracket]
+
+    # Highest level that meets its threshold; Junior always does
+    chosen = np.argmax(level_scores >= SENIORITY_THRESHOLD_VECTOR, axis=-1)
 
     # ENHANCED: Experience-based overrides for senior and principal levels
     # This ensures that candidates with significant experience are properly classified
-    if years_experience >= 10:
-        logging.debug(f"Experience-based override: Principal (10+ years)")
-        return "Principal"
-    elif years_experience >= 7:
-        logging.debug(f"Experience-based override: Senior (7+ years)")
-        return "Senior"
-    elif years_experience >= 5 and expert_matches >= 2:
-        logging.debug(
-            f"Experience-based override: Senior (5+ years with expert indicators)"
-        )
-        return "Senior"
-
-    # Set adjusted thresholds for each level
-    thresholds = {
-        "Principal": 65,  # Further lowered to recognize experienced candidates
-        "Senior": 55,  # Further lowered to recognize experienced candidates
-        "Professional": 45,  # Further lowered to recognize experienced candidates
-        "Junior": 0,  # No threshold for Junior
-    }
+    senior = SENIORITY_LEVELS.index("Senior")
+    chosen = np.where((years >= 5) & (expert_matches >= 2), senior, chosen)
+    chosen = np.where(years >= 7, senior, chosen)
+    chosen = np.where(years >= 10, SENIORITY_LEVELS.index("Principal"), chosen)
+    return chosen
+
+
+def determine_seniority_levels(
+    skill_levels_list: List[Dict[str, str]],
+    roles: Tuple[str, ...] = ("consultant", "developer"),
+) -> List[Dict[str, str]]:
+    """
+    Determine the seniority level of many candidates for several roles at
+    once. Returns one {role: level} dict per candidate, with the same levels
+    as determine_seniority_level.
+    """
+    if not skill_levels_list:
+        return []
+    config = active_scoring_config()
+    skills = np.array(
+        [skill_vector(levels, config.seniority_skill_index) for levels in skill_levels_list]
+    )
+    indicators = np.array(
+        [_experience_indicators(str(levels)) for levels in skill_levels_list]
+    )
+    years, expert_matches = indicators[:, 0], indicators[:, 1]
+    # Ensure no higher seniority level for language skills below C1
+    below_c1 = np.array(
+        [levels["language_skills"] == "None" for levels in skill_levels_list]
+    )
+
+    results = [{} for _ in skill_levels_list]
+    junior = SENIORITY_LEVELS.index("Junior")
+    for role in roles:
+        weights, max_scores = config.seniority_matrices[
+            "consultant" if role == "consultant" else "developer"
+        ]
+        level_scores = skills @ weights.T / max_scores * 100
+        chosen = _seniority_from_scores(level_scores, years, expert_matches)
+        chosen = np.where(below_c1, junior, chosen)
+        for result, level_index in zip(results, chosen):
+            result[role] = SENIORITY_LEVELS[level_index]
+    return results
+
+
+def determine_seniority_level(
+    skill_levels: Dict[str, str], role: str = "consultant"
+) -> str:
+    """
+    Determine the overall seniority level based on skill levels.
+    Returns "Junior", "Professional", "Senior", or "Principal".
+
+    Args:
+        skill_levels: Dictionary of skill categories and their levels
+        role: Either "consultant" or "developer"
+    """
+    # Ensure no higher seniority level for language skills below C1
+    if skill_levels["language_skills"] == "None":
+        return "Junior"
+
+    # Select the appropriate precompiled matrix based on role
+    config = active_scoring_config()
+    weights, max_scores = config.seniority_matrices[
+        "consultant" if role == "consultant" else "developer"
+    ]
+    level_scores = (
+        weights @ skill_vector(skill_levels, config.seniority_skill_index) / max_scores * 100
+    )
+    years_experience, expert_matches = _experience_indicators(str(skill_levels))
+
+    level = SENIORITY_LEVELS[
+        _seniority_from_scores(level_scores, years_experience, expert_matches)
+    ]
 
-    # Log the initial skill levels and role
     logging.debug(f"Skill Levels: {skill_levels}")
     logging.debug(f"Role: {role}")
+    logging.debug(f"Level Scores: {dict(zip(SENIORITY_LEVELS, level_scores))}")
+    logging.debug(f"Years of Experience: {years_experience}")
+    logging.debug(f"Determined Level: {level}")
+    return level
 
-    # Log the calculated scores for each level
-    logging.debug(f"Level Scores: {level_scores}")
 
-    # Log the detected years of experience
-    logging.debug(f"Years of Experience: {years_experience}")
+def _dry_run_scoring(config: ScoringConfig) -> None:
+    """
+    Score a CV containing every keyword with a new config (pinned by the
+    store), so a config the scoring cannot work with fails to load.
+    """
+    skill_levels = skill_levels_from_hits(config.all_keywords_set)
+    for role in ("consultant", "developer"):
+        determine_seniority_level(skill_levels, role)
+    determine_seniority_levels([skill_levels])
 
-    # Determine the highest level that meets its threshold
-    for level, threshold in thresholds.items():
-        if level_scores[level] >= threshold:
-            logging.debug(f"Determined Level: {level}")
-            return level
 
-    logging.debug("Determined Level: Junior")
-    return "Junior"
+scoring_configs = ScoringConfigStore(
+    SCORING_CONFIG_PATH,
+    ScoringConfig,
+    check_interval=SCORING_CONFIG_CHECK_SECONDS,
+    dry_run=_dry_run_scoring,
+)
 
 
 def level_meets_requirement(actual: str, required: str) -> bool:
@@ -902,25 +893,364 @@ def level_meets_requirement(actual: str, required: str) -> bool:
     return levels.index(actual) >= levels.index(required)
 
 
-def extract_text_from_pdf(file_content: bytes) -> str:
+def extract_text_from_pdf(file_content: bytes) -> NormalizedText:
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-        return text.lower()
+        with span("extract_text"):
+            return normalize_text("".join(extract_pages(file_content)))
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Error extracting text from PDF: {str(e)}"
         )
 
 
-def get_ai_analysis(
-    cv_text: str, requirements: List[dict], role: str = "consultant"
+def skill_levels_decided(hits: set) -> bool:
+    """
+    True when no further keyword can change the rule-based skill levels.
+
+    Every category only moves up as keywords are added, except language
+    skills, where an "advanced" keyword overrides an "expert" one. Comparing
+    against the levels for the complete keyword set covers both cases.
+    """
+    return skill_levels_from_hits(hits) == skill_levels_from_hits(
+        hits | active_scoring_config().all_keywords_set
+    )
+
+
+def scan_pdf(
+    file_content: bytes, need_full_text: bool = True
+) -> Tuple[NormalizedText, set, bool]:
+    """
+    Extract the CV text and collect its keyword hits.
+
+    Without `need_full_text`, pages are parsed one at a time and extraction
+    stops at the first page after which the skill levels are decided; the
+    remaining pages are never parsed.
+    An ineligible language verdict is based on the absence of keywords, so it
+    is only final after the last page.
+
+    Returns the (possibly partial) lowercased text, the keyword hits and
+    whether every page was read.
+    """
+    if need_full_text:
+        # All pages are needed anyway, so extract them in parallel
+        cv_text = extract_text_from_pdf(file_content)
+        with span("keyword_scan"):
+            hits = find_keywords(cv_text)
+        return cv_text, hits, True
+
+    try:
+        pages = []
+        hits = set()
+        tail = ""
+        overlap = active_scoring_config().keyword_overlap
+        # Extraction and keyword scan are interleaved page by page
+        with span("extract_text"):
+            for page_text in iter_pdf_pages(file_content):
+                pages.append(page_text)
+                window = tail + page_text
+                hits |= find_keywords(window)
+                tail = window[-overlap:]
+                if skill_levels_decided(hits):
+                    return NormalizedText("".join(pages)), hits, False
+        return NormalizedText("".join(pages)), hits, True
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, detail=f"Error extracting text from PDF: {str(e)}"
+        )
+
+
+def parse_requirements(requirements: Optional[str]) -> List[dict]:
+    """Split the newline-separated requirements query parameter into items."""
+    if not requirements:
+        return []
+    return [{"text": line.strip()} for line in requirements.split("\n") if line.strip()]
+
+
+def format_requirements_section(requirements: List[dict]) -> str:
+    """Format requirements for the prompt, escaping double quotes."""
+    return "\n".join(
+        "- " + req["text"].replace('"', '\\"') for req in requirements
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def prepared_requirement_set(set_id: str, version: int) -> Tuple[Tuple[dict, ...], str]:
+    """
+    Requirements and prompt section of a stored requirement set version,
+    loaded and formatted once per version (versions never change). The
+    keyword profiles for the rule scoring are built here as well; they and
+    the semantic embeddings are cached by the requirement texts, which a
+    set version pins.
+    """
+    record = requirement_sets.get(set_id, version)
+    if record is None:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown requirement set {set_id} version {version}"
+        )
+    requirements = tuple({"text": text} for text in record["requirements"])
+    _requirement_profiles(tuple(record["requirements"]), active_scoring_config())
+    return requirements, format_requirements_section(requirements)
+
+
+async def resolve_requirements(
+    requirements: Optional[str],
+    requirement_set: Optional[str] = None,
+    requirement_set_version: Optional[int] = None,
+) -> Tuple[List[dict], str]:
+    """
+    The requirements of a request and their prompt section: from the stored
+    requirement set if one is given (by default its latest version), else
+    parsed from the `requirements` query parameter.
+    """
+    if requirement_set is None:
+        requirements_list = parse_requirements(requirements)
+        return requirements_list, format_requirements_section(requirements_list)
+    if requirements:
+        raise HTTPException(
+            status_code=422, detail="Pass either requirements or requirement_set, not both"
+        )
+    if requirement_set_version is None:
+        requirement_set_version = await run_in_db_executor(
+            requirement_sets.latest_version, requirement_set
+        )
+        if requirement_set_version is None:
+            raise HTTPException(status_code=404, detail="Unknown requirement set")
+    requirements_list, requirements_text = await run_in_db_executor(
+        prepared_requirement_set, requirement_set, requirement_set_version
+    )
+    return list(requirements_list), requirements_text
+
+
+def extract_and_score(file_content: bytes) -> Tuple[str, Dict[str, str]]:
+    """Extract the CV text and run the rule-based skill assessment on it."""
+    cv_text, hits, _ = scan_pdf(file_content)
+    with span("skill_levels"):
+        return cv_text, skill_levels_from_hits(hits)
+
+
+def degraded_analysis(skill_levels: Dict[str, str], seniority_level: Optional[str]) -> dict:
+    """
+    Rule-only result for when the LLM is unavailable. It has the shape of an
+    LLM analysis, is marked as degraded and is never cached. The seniority
+    level is None if the analysis failed before it was determined.
+    """
+    return {
+        "requirement_matches": [],
+        "overall_score": 0,
+        "seniority_level": seniority_level,
+        "summary": "Die KI-Analyse ist derzeit nicht verfügbar. Die Einstufung beruht ausschließlich auf der regelbasierten Auswertung.",
+        "key_strengths": [],
+        "improvement_areas": [],
+        "skill_levels": skill_levels,
+        "degraded": True,
+    }
+
+
+def requirement_chunks(requirements: List[dict]) -> List[List[dict]]:
+    """
+    Split requirements into consecutive chunks of at most REQUIREMENT_CHUNK_SIZE,
+    with sizes differing by at most one. Short lists stay in one chunk.
+    """
+    if REQUIREMENT_CHUNK_SIZE <= 0 or len(requirements) <= REQUIREMENT_CHUNK_SIZE:
+        return [requirements]
+    count = -(-len(requirements) // REQUIREMENT_CHUNK_SIZE)
+    size, extra = divmod(len(requirements), count)
+    chunks = []
+    start = 0
+    for i in range(count):
+        stop = start + size + (1 if i < extra else 0)
+        chunks.append(requirements[start:stop])
+        start = stop
+    return chunks
+
+
+async def request_analysis(
+    cv_text: str,
+    requirements: List[dict],
+    requirements_text: str,
+    role: str,
+    seniority_level: str,
+    on_match=None,
+) -> str:
+    """
+    One LLM analysis of the CV against `requirements`; returns the raw
+    response text. With `on_match`, the completion is streamed and
+    `on_match(match)` is awaited with each requirement match (as parsed,
+    before the seniority adjustment) as soon as it is complete.
+    """
+    with span("prompt_build"):
+        # Only the CV excerpts relevant to the requirements go into the
+        # prompt; the selection is CPU work and runs on the PDF pool
+        cv_context = await run_in_pdf_executor(
+            select_context,
+            cv_text,
+            [req["text"] for req in requirements],
+            CONTEXT_TOKEN_BUDGET,
+            find_keywords,
+        )
+        messages = ANALYSIS_PROMPT.messages(
+            role=role,
+            seniority_level=seniority_level,
+            cv_text=cv_context,
+            requirements=requirements_text,
+        )
+
+    params = dict(
+        tag=f"analysis/v{ANALYSIS_PROMPT.version}",
+        model=LLM_MODEL,
+        messages=messages,
+        temperature=0.3,
+        max_tokens=1000,
+    )
+    # Call the GPT-3.5 Turbo API with strict JSON formatting
+    with span("llm_call"):
+        if on_match is None:
+            response = await llm_gateway.chat_completion(**params)
+            return response.choices[0].message.content.strip()
+
+        parser = MatchStreamParser()
+
+        async def on_delta(text: str):
+            for match in parser.feed(text):
+                await on_match(match)
+
+        content = await llm_gateway.stream_chat_completion(on_delta=on_delta, **params)
+    return content.strip()
+
+
+def adjust_match(match: dict, seniority_level: str) -> dict:
+    """Apply the seniority boost to a parsed requirement match and clip its fields."""
+    match_score = match["match_percentage"]
+    if seniority_level == "Junior":
+        match_score = min(100, match_score * 1.3)
+    elif seniority_level == "Professional":
+        match_score = min(100, match_score * 1.15)
+    elif seniority_level == "Senior":
+        match_score = min(100, match_score * 1.05)
+    return {
+        "requirement": str(match.get("requirement", ""))[:500],
+        "match_percentage": min(100, max(0, float(match_score))),
+        "explanation": str(match.get("explanation", ""))[:500],
+    }
+
+
+def pair_matches(matches: List[dict], chunk: List[dict]) -> Dict[str, dict]:
+    """
+    The match of each requirement of `chunk`, by requirement text. Matches
+    are paired with the requirements by their text, or by position if the
+    LLM returned one match per requirement. Requirements without a match
+    are left out.
+    """
+    by_text = {normalize_requirement(match["requirement"]): match for match in matches}
+    paired = {}
+    for position, req in enumerate(chunk):
+        match = by_text.get(normalize_requirement(req["text"]))
+        if match is None and len(matches) == len(chunk):
+            match = matches[position]
+        if match is not None:
+            paired[req["text"]] = match
+    return paired
+
+
+def merge_chunk_analyses(
+    analyses: List[dict], chunks: List[List[dict]], requirements: List[dict]
 ) -> dict:
+    """
+    Merge the LLM answers for the requirement chunks before the seniority
+    adjustments. Each chunk contributes at most one match per requirement,
+    listed in the order of `requirements`; the overall score is the mean
+    match percentage of the merged matches (without matches, the mean of the
+    chunk scores weighted by chunk size); summary and seniority level come
+    from the first chunk; strengths and improvement areas are de-duplicated
+    and capped at 5.
+    """
+    merged = dict(analyses[0])
+    position = {req["text"]: index for index, req in enumerate(requirements)}
+    placed = []
+    for analysis, chunk in zip(analyses, chunks):
+        matches = analysis.get("requirement_matches")
+        if not isinstance(matches, list):
+            continue
+        paired = pair_matches(matches, chunk)
+        for match in matches[: len(chunk)]:
+            text = next((text for text, other in paired.items() if other is match), None)
+            # Matches that belong to no requirement go last
+            placed.append((position.get(text, len(requirements)), match))
+    placed.sort(key=lambda item: item[0])
+    merged["requirement_matches"] = [match for _, match in placed]
+
+    percentages = [
+        match["match_percentage"]
+        for match in merged["requirement_matches"]
+        if isinstance(match.get("match_percentage"), (int, float))
+    ]
+    scored = [
+        (analysis["overall_score"], len(chunk))
+        for analysis, chunk in zip(analyses, chunks)
+        if isinstance(analysis.get("overall_score"), (int, float))
+    ]
+    if percentages:
+        merged["overall_score"] = sum(percentages) / len(percentages)
+    elif scored:
+        merged["overall_score"] = sum(score * n for score, n in scored) / sum(
+            n for _, n in scored
+        )
+    for field in ("key_strengths", "improvement_areas"):
+        items = [
+            str(item)
+            for analysis in analyses
+            if isinstance(analysis.get(field), list)
+            for item in analysis[field]
+        ]
+        merged[field] = list(dict.fromkeys(items))[:5]
+    return merged
+
+
+def split_by_requirement(analysis: dict, chunk: List[dict]) -> Dict[str, dict]:
+    """
+    Split an LLM answer for a chunk into one analysis per requirement, each
+    with that requirement's match (see pair_matches) and the chunk's other
+    fields.
+    """
+    paired = pair_matches(analysis.get("requirement_matches") or [], chunk)
+    return {
+        text: {**analysis, "requirement_matches": [match]} for text, match in paired.items()
+    }
+
+
+async def get_ai_analysis(
+    cv_text: str,
+    requirements: List[dict],
+    role: str = "consultant",
+    use_cache: bool = True,
+    requirements_text: Optional[str] = None,
+    skill_levels: Optional[Dict[str, str]] = None,
+    on_match=None,
+) -> dict:
+    """
+    Analyze a CV against the requirements with the LLM.
+
+    Batch callers pass the precomputed requirements prompt section and the
+    skill levels from extract_and_score, so they are not rebuilt per CV.
+    Requirement lists longer than REQUIREMENT_CHUNK_SIZE are analyzed in
+    concurrent calls per chunk and merged with merge_chunk_analyses.
+
+    If `on_match` is given, the LLM answers are streamed and
+    `on_match(match)` is awaited with every seniority-adjusted requirement
+    match as soon as it is complete, before the full analysis is returned.
+
+    With the candidate store, the answers are also kept per requirement, and
+    requirements this CV was already analyzed against (same role, model and
+    prompt) are taken from the store: only new or changed requirements go
+    to the LLM.
+    """
+    # Known to the error handlers below once computed
+    seniority_level = None
     try:
         # Determine skill levels from CV text
-        skill_levels = determine_skill_level(cv_text.lower())
+        cv_text = normalize_text(cv_text)
+        if skill_levels is None:
+            skill_levels = determine_skill_level(cv_text)
         logging.debug(f"Skill Levels: {skill_levels}")
 
         # CRITICAL: Early return with 0% match if language skills are below C1
@@ -937,125 +1267,119 @@ def get_ai_analysis(
                 ],
             }
 
-        seniority_level = determine_seniority_level(skill_levels, role)
-
-        # Format requirements text with proper escaping
-        requirements_text = "\n".join(
-            [f"- {req['text'].replace('"', '\\"')}" for req in requirements]
+        with span("seniority"):
+            seniority_level = determine_seniority_level(skill_levels, role)
+
+        # The seniority level and the CV excerpts in the prompt depend on the
+        # scoring config as well
+        config_version = active_scoring_config().version
+        analysis_version = f"{REQUIREMENT_ANALYSIS_VERSION}:{config_version}"
+        cache_key = make_cache_key(
+            cv_text,
+            [req["text"] for req in requirements],
+            role,
+            LLM_MODEL,
+            # The excerpts sent to the LLM depend on the budget and the chunking
+            f"{ANALYSIS_PROMPT.version}:{CONTEXT_TOKEN_BUDGET}:{REQUIREMENT_CHUNK_SIZE}:"
+            f"{config_version}",
         )
-
-        # Create a more structured prompt with explicit JSON formatting instructions and level-specific guidance
-        prompt = f"""Analysiere den folgenden Lebenslauf für die Position {role} anhand der Stellenanforderungen. 
-
-KRITISCHE ANFORDERUNG: Wenn ein Lebenslauf Deutschkenntnisse geringer als C1 hat (also A1, A2, B1, B2, "Gut", "Basic" oder "None"), MUSS die Gesamtbewertung 0% sein und der Kandidat als "Nicht geeignet" eingestuft werden. Dies ist eine absolute Voraussetzung, die unter keinen Umständen umgangen werden darf.
-
-Lebenslauf Text:
-{cv_text}
-
-Stellenanforderungen:
-{requirements_text}
-
-WICHTIG - Bewertungsrichtlinien:
-Wenn ein Kandidat ein deutsch Niveau unter C1 hat, ist er ungeeignet und sollte 0% Gesamtbewertung erhalten
-1. Berücksichtige das Erfahrungslevel "{seniority_level}" bei der Bewertung
-2. Für Junior-Level:
-   - Fokussiere auf Grundkenntnisse und Potenzial
-   - Bewerte fehlende Erfahrung nicht negativ
-   - Hebe Lernbereitschaft und grundlegende Fähigkeiten hervor
-3. Für Professional-Level:
-   - Erwarte solide Grundkenntnisse in allen Kernbereichen
-   - Bewerte praktische Erfahrung positiv
-   - Fokussiere auf wachsende Expertise
-4. Für Senior-Level:
-   - Erwarte vertiefte Fachkenntnisse
-   - Bewerte Führungserfahrung und Projektverantwortung
-   - Achte auf strategisches Verständnis
-5. Für Principal-Level:
-   - Erwarte umfassende Expertise
-   - Bewerte strategische Führungskompetenz
-   - Achte auf nachgewiesene Erfolge und Innovation
-
-WICHTIG - Formatierungsregeln für die JSON-Antwort:
-1. Antworte AUSSCHLIESSLICH mit einem validen JSON-Objekt
-2. Verwende KEINE Kommentare oder zusätzlichen Text
-3. Alle Textfelder MÜSSEN in doppelten Anführungszeichen stehen
-4. Zahlen dürfen KEINE Anführungszeichen haben
-5. Arrays müssen mit [ beginnen und mit ] enden
-6. Objekte müssen mit {{ beginnen und mit }} enden
-7. Alle Felder müssen mit Komma getrennt sein
-8. Das letzte Element in Arrays/Objekten darf KEIN Komma haben
-9. Keine Zeilenumbrüche in Textfeldern verwenden
-10. Maximale Länge für Textfelder: 500 Zeichen
-11. Maximale Anzahl von Elementen in Arrays: 5
-
-Erwartetes Format:
-{{
-    "overall_score": 75,
-    "seniority_level": "{seniority_level}",
-    "requirement_matches": [
-        {{
-            "requirement": "Beispielanforderung",
-            "match_percentage": 80,
-            "explanation": "Kurze Erklärung"
-        }}
-    ],
-    "summary": "Kurze Zusammenfassung der Analyse",
-    "key_strengths": [
-        "Stärke 1",
-        "Stärke 2"
-    ],
-    "improvement_areas": [
-        "Entwicklungspotenzial 1",
-        "Entwicklungspotenzial 2"
-    ]
-}}"""
-
-        # Call the GPT-3.5 Turbo API with strict JSON formatting
-        response = client.chat.completions.create(
-            model="openai/gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": """Du bist ein CV-Analyse-Assistent mit besonderem Fokus auf faire Bewertung verschiedener Erfahrungsstufen.
-
-KRITISCHE ANFORDERUNG: Wenn ein Lebenslauf Deutschkenntnisse geringer als C1 hat (also A1, A2, B1, B2, "Gut", "Basic" oder "None"), MUSS die Gesamtbewertung 0% sein und der Kandidat als "Nicht geeignet" eingestuft werden. Dies ist eine absolute Voraussetzung, die unter keinen Umständen umgangen werden darf.
-
-Für Junior-Kandidaten:
-- Bewerte Grundkenntnisse und Potenzial positiv
-- Fehlende Erfahrung ist normal und sollte nicht negativ bewertet werden
-- Fokussiere auf Lernbereitschaft und Entwicklungspotenzial
-
-Für Professional-Kandidaten:
-- Erwarte solide Grundkenntnisse
-- Bewerte erste Praxiserfahrung positiv
-- Fokussiere auf Entwicklung zur Expertise
-
-Für Senior-Kandidaten:
-- Erwarte vertiefte Fachkenntnisse
-- Bewerte Führungserfahrung positiv
-- Achte auf strategisches Denken
-
-Für Principal-Kandidaten:
-- Erwarte umfassende Expertise
-- Bewerte strategische Führung
-- Achte auf Innovation und Erfolge
-
-Antworte AUSSCHLIESSLICH mit einem validen JSON-Objekt. Keine zusätzlichen Erklärungen oder Formatierung.""",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,
-            max_tokens=1000,
-        )
-
-        # Extract and parse the AI response with improved error handling
-        response_content = response.choices[0].message.content.strip()
+        if use_cache:
+            cached = await run_in_db_executor(analysis_cache.get, cache_key)
+            if cached is not None:
+                return cached
+
+        candidate_id = make_candidate_id(cv_text)
+        known = {}
+        if candidate_store is not None and use_cache:
+            known = await run_in_db_executor(
+                candidate_store.requirement_analyses,
+                candidate_id,
+                role,
+                analysis_version,
+                [req["text"] for req in requirements],
+            )
+        reused = [known[req["text"]] for req in requirements if req["text"] in known]
+        pending = [req for req in requirements if req["text"] not in known]
+        chunks = requirement_chunks(pending) if pending or not reused else []
+
+        if on_match is not None:
+            for analysis in reused:
+                await on_match(adjust_match(analysis["requirement_matches"][0], seniority_level))
+
+        def match_listener(limit: int):
+            # Forwards at most `limit` matches, like the merge below keeps
+            if on_match is None:
+                return None
+            forwarded = 0
+
+            async def listener(match: dict):
+                nonlocal forwarded
+                if forwarded < limit:
+                    forwarded += 1
+                    await on_match(adjust_match(match, seniority_level))
+
+            return listener
+
+        if len(chunks) > 1:
+            # Long requirement lists: one concurrent call per chunk
+            responses = await asyncio.gather(
+                *(
+                    request_analysis(
+                        cv_text,
+                        chunk,
+                        format_requirements_section(chunk),
+                        role,
+                        seniority_level,
+                        on_match=match_listener(len(chunk)),
+                    )
+                    for chunk in chunks
+                )
+            )
+        elif chunks:
+            # Format requirements text with proper escaping
+            if requirements_text is None or reused:
+                requirements_text = format_requirements_section(chunks[0])
+            responses = [
+                await request_analysis(
+                    cv_text,
+                    chunks[0],
+                    requirements_text,
+                    role,
+                    seniority_level,
+                    on_match=match_listener(5),
+                )
+            ]
+        else:
+            responses = []
 
         try:
-            # Clean up the response content
-            json_start = response_content.find("{")
-            json_end = response_content.rfind("}") + 1
-            ai_response = json.loads(response_content[json_start:json_end])
+            with span("json_parse"):
+                # Repairs and validates the answers; see llm_response
+                analyses = [parse_analysis(response) for response in responses]
+
+            if candidate_store is not None:
+                fresh = {}
+                for analysis, chunk in zip(analyses, chunks):
+                    fresh.update(split_by_requirement(analysis, chunk))
+                if fresh:
+                    await run_in_db_executor(
+                        candidate_store.save_requirement_analyses,
+                        candidate_id,
+                        role,
+                        analysis_version,
+                        fresh,
+                    )
+
+            if len(analyses) == 1 and not reused:
+                ai_response = analyses[0]
+            else:
+                # Reused requirements count as chunks of one; their old
+                # chunk's overall score does not enter the merged score
+                ai_response = merge_chunk_analyses(
+                    analyses + reused,
+                    chunks + [[req] for req in requirements if req["text"] in known],
+                    requirements,
+                )
 
             # CRITICAL: Double-check language skills and enforce 0% if below C1
             if skill_levels["language_skills"] in ["None", "Basic"]:
@@ -1096,26 +1420,13 @@ Antworte AUSSCHLIESSLICH mit einem validen JSON-Objekt. Keine zusätzlichen Erkl
                 # Adjust requirement matches based on seniority level
                 if isinstance(ai_response.get("requirement_matches"), list):
                     cleaned_matches = []
-                    for match in ai_response["requirement_matches"][:5]:
+                    # Each call returns at most 5 matches, merged chunks one per requirement
+                    match_limit = 5 if len(chunks) == 1 and not reused else len(requirements)
+                    for match in ai_response["requirement_matches"][:match_limit]:
                         if isinstance(match, dict) and isinstance(
                             match.get("match_percentage"), (int, float)
                         ):
-                            match_score = match["match_percentage"]
-                            if seniority_level == "Junior":
-                                match_score = min(100, match_score * 1.3)
-                            elif seniority_level == "Professional":
-                                match_score = min(100, match_score * 1.15)
-                            elif seniority_level == "Senior":
-                                match_score = min(100, match_score * 1.05)
-                            match["match_percentage"] = round(match_score)
-                            cleaned_match = {
-                                "requirement": str(match.get("requirement", ""))[:500],
-                                "match_percentage": min(
-                                    100, max(0, float(match_score))
-                                ),
-                                "explanation": str(match.get("explanation", ""))[:500],
-                            }
-                            cleaned_matches.append(cleaned_match)
+                            cleaned_matches.append(adjust_match(match, seniority_level))
                     ai_response["requirement_matches"] = cleaned_matches
 
             # Final check to ensure overall_score is 0 if language skills are below C1
@@ -1137,27 +1448,25 @@ Antworte AUSSCHLIESSLICH mit einem validen JSON-Objekt. Keine zusätzlichen Erkl
                 # Clear key strengths as they are not relevant for ineligible candidates
                 ai_response["key_strengths"] = []
 
+            await run_in_db_executor(analysis_cache.set, cache_key, ai_response)
             return ai_response
-        except json.JSONDecodeError as json_err:
-            print(f"JSON parsing error: {str(json_err)}")
-            print(f"Response content: {response_content}")
-            return {
-                "requirement_matches": [],
-                "overall_score": 0,
-                "seniority_level": "Junior",
-            }
         except (ValueError, TypeError) as err:
-            print(f"Validation error: {str(err)}")
-            return {
-                "requirement_matches": [],
-                "overall_score": 0,
-                "seniority_level": "Junior",
-            }
-
+            # Not even the repaired answer is usable (e.g. it has no overall
+            # score): fall back to the rules instead of reporting a 0% match,
+            # and cache nothing
+            logging.warning(
+                f"Unusable LLM response: {err}",
+                extra={"response_content": responses},
+            )
+            return degraded_analysis(skill_levels, seniority_level)
+
+    except LLMUnavailableError as e:
+        logging.warning(f"LLM unavailable, returning rule-based result: {e}")
+        return degraded_analysis(skill_levels or {}, seniority_level)
     except Exception as e:
-        print(f"AI analysis error: {str(e)}")
+        logging.exception(f"AI analysis error: {e}")
         # If there's an error, still enforce the language skills rule
-        if skill_levels.get("language_skills") in ["None", "Basic"]:
+        if skill_levels and skill_levels.get("language_skills") in ["None", "Basic"]:
             return {
                 "requirement_matches": [],
                 "overall_score": 0,
@@ -1168,58 +1477,1055 @@ Antworte AUSSCHLIESSLICH mit einem validen JSON-Objekt. Keine zusätzlichen Erkl
                     "Deutschkenntnisse verbessern (mindestens C1 erforderlich)"
                 ],
             }
+        # Like an unavailable LLM: the rule-based result, marked as degraded
+        return degraded_analysis(skill_levels or {}, seniority_level)
+
+
+async def compute_semantic_matches(cv_text: str, requirements_list: List[dict]) -> List[dict]:
+    """Run the local semantic requirement matching on the PDF worker pool."""
+    try:
+        return await run_in_pdf_executor(
+            semantic_requirement_matches,
+            cv_text,
+            [req["text"] for req in requirements_list],
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=503, detail=f"Semantic matching unavailable: {str(e)}"
+        )
+
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def format_stream_event(event: str, data: dict, stream_format: str) -> str:
+    """Serialize one event as a Server-Sent Event or an NDJSON line."""
+    payload = json.dumps(data, ensure_ascii=False)
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return json.dumps({"event": event, **data}, ensure_ascii=False) + "\n"
+
+
+def rule_based_summary(skill_levels: Dict[str, str], role: str) -> dict:
+    """The rule-based part of the analysis, available before the LLM answers."""
+    if skill_levels["language_skills"] in ["None", "Basic"]:
+        seniority_level = "Nicht geeignet"
+    else:
+        with span("seniority"):
+            seniority_level = determine_seniority_level(skill_levels, role)
+    return {
+        "skill_levels": skill_levels,
+        "seniority_level": seniority_level,
+        "config_version": active_scoring_config().version,
+    }
+
+
+@functools.lru_cache(maxsize=256)
+def _requirement_profiles(
+    requirements: Tuple[str, ...], config: ScoringConfig
+) -> Tuple[List[Tuple[set, set]], Optional[ahocorasick.Automaton]]:
+    """
+    Terms and skill keywords of each requirement, plus an automaton over all
+    terms, computed once per requirement set and scoring config.
+    """
+    profiles = []
+    for req in requirements:
+        req_terms = terms(req)
+        # A keyword that is also a term is only counted once
+        profiles.append((req_terms, find_keywords(normalize_text(req)) - req_terms))
+    all_terms = sorted(set().union(*(req_terms for req_terms, _ in profiles)))
+    return profiles, _build_automaton(all_terms) if all_terms else None
+
+
+def rule_requirement_matches(
+    cv_text: str, hits: set, requirements: List[dict]
+) -> List[dict]:
+    """
+    Deterministic requirement matches: the share of a requirement's terms
+    and skill keywords that occur in the CV. Terms are matched as substrings,
+    like the keywords, so they also match inside compound words.
+    """
+    profiles, term_automaton = _requirement_profiles(
+        tuple(req["text"] for req in requirements), active_scoring_config()
+    )
+    cv_terms = (
+        {term for _, term in term_automaton.iter(cv_text)} if term_automaton else set()
+    )
+    matches = []
+    for req, (req_terms, req_keywords) in zip(requirements, profiles):
+        found = len(req_terms & cv_terms) + len(req_keywords & hits)
+        total = len(req_terms) + len(req_keywords)
+        matches.append(
+            {
+                "requirement": req["text"][:500],
+                "match_percentage": round(100 * found / total) if total else 0,
+                "explanation": f"Regelbasiert: {found} von {total} Begriffen im Lebenslauf gefunden",
+            }
+        )
+    return matches
+
+
+def rule_based_analysis(
+    cv_text: str, hits: set, requirements: List[dict], role: str
+) -> dict:
+    """
+    Analysis from the rules alone, in the response schema of get_ai_analysis.
+    The overall score is the mean requirement match.
+    """
+    with span("skill_levels"):
+        skill_levels = skill_levels_from_hits(hits)
+    seniority_level = rule_based_summary(skill_levels, role)["seniority_level"]
+    if seniority_level == "Nicht geeignet":
         return {
             "requirement_matches": [],
             "overall_score": 0,
-            "seniority_level": "Junior",
+            "seniority_level": seniority_level,
+            "summary": "Der Kandidat verfügt nicht über die erforderlichen Deutschkenntnisse (mindestens C1) und ist daher nicht für die Position geeignet.",
+            "key_strengths": [],
+            "improvement_areas": [
+                "Deutschkenntnisse verbessern (mindestens C1 erforderlich)"
+            ],
+            "skill_levels": skill_levels,
+            "mode": "rules",
         }
 
+    matches = rule_requirement_matches(cv_text, hits, requirements)
+    scores = [match["match_percentage"] for match in matches]
+    return {
+        "requirement_matches": matches,
+        "overall_score": round(sum(scores) / len(scores)) if scores else 0,
+        "seniority_level": seniority_level,
+        "summary": f"Regelbasierte Vorauswahl ohne KI-Analyse: {sum(score >= 50 for score in scores)} von {len(scores)} Anforderungen überwiegend erfüllt.",
+        "key_strengths": [m["requirement"] for m in matches if m["match_percentage"] >= 80][:5],
+        "improvement_areas": [m["requirement"] for m in matches if m["match_percentage"] < 50][:5],
+        "skill_levels": skill_levels,
+        "mode": "rules",
+    }
+
+
+def score_rules_only(
+    file_content: bytes, requirements: List[dict], role: str, need_full_text: bool = False
+) -> Tuple[str, dict]:
+    """
+    Extract and score a CV without the LLM. Without requirements (and unless
+    `need_full_text`), extraction stops as soon as the skill levels are decided.
+    """
+    cv_text, hits, _ = scan_pdf(
+        file_content, need_full_text=need_full_text or bool(requirements)
+    )
+    return cv_text, rule_based_analysis(cv_text, hits, requirements, role)
+
+
+def remember_analysis(
+    filename: Optional[str],
+    cv_text: str,
+    skill_levels: Dict[str, str],
+    requirements_list: List[dict],
+    role: str,
+    mode: str,
+    result: dict,
+    document_hash: Optional[str] = None,
+) -> dict:
+    """
+    Record the scoring config version in the result, keep the candidate and
+    the analysis in the candidate store and add the candidate ID to the
+    result. Degraded results are not stored. Blocks on the database; async
+    callers run it with run_in_db_executor.
+    """
+    config_version = active_scoring_config().version
+    result["config_version"] = config_version
+    if candidate_store is None:
+        return result
+    candidate_id = candidate_store.save_candidate(
+        cv_text, skill_levels, filename, document_hash, config_version
+    )
+    if not result.get("degraded"):
+        candidate_store.save_analysis(
+            candidate_id, role, [req["text"] for req in requirements_list], mode, result
+        )
+    result["candidate_id"] = candidate_id
+    return result
+
+
+async def score_upload(
+    contents: bytes, use_cache: bool = True
+) -> Tuple[str, Dict[str, str], str]:
+    """
+    extract_and_score for an uploaded PDF, reusing the stored text and skill
+    levels if the same file was analyzed before and `use_cache` is set. Also
+    returns the file hash.
+    """
+    document_hash = hashlib.sha256(contents).hexdigest()
+    if candidate_store is not None and use_cache:
+        stored = await run_in_db_executor(
+            candidate_store.find_document, document_hash, active_scoring_config().version
+        )
+        if stored is not None:
+            cv_text, skill_levels = stored
+            if skill_levels is None:
+                # Scored with another config: only the text is reused
+                skill_levels = await run_in_pdf_executor(determine_skill_level, cv_text)
+            return cv_text, skill_levels, document_hash
+    cv_text, skill_levels = await run_in_pdf_executor(extract_and_score, contents)
+    return cv_text, skill_levels, document_hash
+
+
+async def score_upload_rules_only(
+    contents: bytes,
+    requirements: List[dict],
+    role: str,
+    need_full_text: bool = False,
+    use_cache: bool = True,
+) -> Tuple[str, dict, str]:
+    """
+    score_rules_only for an uploaded PDF, reusing the stored text of a known
+    file if `use_cache` is set.
+    """
+    document_hash = hashlib.sha256(contents).hexdigest()
+    if candidate_store is not None and use_cache:
+        stored = await run_in_db_executor(candidate_store.find_document, document_hash)
+        if stored is not None:
+            cv_text = stored[0]
+            return (
+                cv_text,
+                rule_based_analysis(cv_text, find_keywords(cv_text), requirements, role),
+                document_hash,
+            )
+    # The stored candidate text must be complete
+    cv_text, result = await run_in_pdf_executor(
+        score_rules_only,
+        contents,
+        requirements,
+        role,
+        need_full_text or candidate_store is not None,
+    )
+    return cv_text, result, document_hash
+
+
+async def analyze_profile(
+    cv_text: str,
+    skill_levels: Dict[str, str],
+    filename: Optional[str],
+    requirements_list: List[dict],
+    role: str,
+    mode: str,
+    use_cache: bool,
+    requirements_text: Optional[str] = None,
+    semantic: bool = False,
+) -> dict:
+    """
+    Analyze a stored candidate from its text and skill levels, and store the
+    result. Without skill levels (stored with another scoring config), they
+    are recomputed from the text.
+    """
+    if skill_levels is None:
+        skill_levels = determine_skill_level(cv_text)
+    if mode == "rules":
+        result = rule_based_analysis(cv_text, find_keywords(cv_text), requirements_list, role)
+    else:
+        result = await get_ai_analysis(
+            cv_text,
+            requirements_list,
+            role,
+            use_cache=use_cache,
+            requirements_text=requirements_text,
+            skill_levels=skill_levels,
+        )
+    await run_in_db_executor(
+        remember_analysis, filename, cv_text, skill_levels, requirements_list, role, mode, result
+    )
+    if semantic:
+        result["semantic_matches"] = await compute_semantic_matches(cv_text, requirements_list)
+    return result
+
+
+def rank_results(results: List[dict]) -> List[dict]:
+    """Sort by overall score, highest first and failed analyses last, and number them."""
+    ranked = sorted(
+        results,
+        key=lambda result: ("error" in result, -(result.get("overall_score") or 0)),
+    )
+    for rank, result in enumerate(ranked, start=1):
+        result["rank"] = rank
+    return ranked
+
+
+async def analyze_document(
+    filename: str,
+    contents: Union[bytes, mmap.mmap],
+    requirements_list: List[dict],
+    requirements_text: str,
+    role: str,
+    use_cache: bool,
+    semantic: bool = False,
+    emit=None,
+    mode: str = "llm",
+) -> dict:
+    """
+    Run extraction, rule scoring and the LLM analysis for one uploaded CV,
+    plus the semantic requirement matching if `semantic` is set. If given,
+    `emit(event, data)` is awaited with the local results as soon as they
+    are known, before the LLM call starts, and with each requirement match
+    of the streamed LLM answer. In "rules" mode the LLM is skipped and the
+    rule-based analysis is returned. Files that are not PDFs fail at once.
+    """
+    if not is_pdf(contents):
+        return {"filename": filename, "error": "Not a PDF file"}
+    if mode == "rules":
+        try:
+            cv_text, result, document_hash = await score_upload_rules_only(
+                contents, requirements_list, role, semantic, use_cache
+            )
+            if semantic:
+                result["semantic_matches"] = await compute_semantic_matches(
+                    cv_text, requirements_list
+                )
+        except HTTPException as e:
+            return {"filename": filename, "error": e.detail}
+        await run_in_db_executor(
+            remember_analysis,
+            filename,
+            cv_text,
+            result["skill_levels"],
+            requirements_list,
+            role,
+            mode,
+            result,
+            document_hash,
+        )
+        return {"filename": filename, **result}
 
-def calculate_semantic_similarity(cv_text: str, requirement: str) -> float:
     try:
-        # Verarbeitung der Texte mit spaCy:
-        # Der Text wird in ein Doc-Objekt umgewandelt, das eine Vektorrepräsentation (Embedding) enthält.
-        cv_doc = nlp(cv_text)
-        req_doc = nlp(requirement)
+        cv_text, skill_levels, document_hash = await score_upload(contents, use_cache)
+        local_results = rule_based_summary(skill_levels, role)
+        if semantic:
+            local_results["semantic_matches"] = await compute_semantic_matches(
+                cv_text, requirements_list
+            )
+    except HTTPException as e:
+        return {"filename": filename, "error": e.detail}
+
+    on_match = None
+    if emit is not None:
+        await emit("rules", {"filename": filename, **local_results})
+
+        async def on_match(match: dict):
+            await emit("requirement_match", {"filename": filename, **match})
+
+    result = await get_ai_analysis(
+        cv_text,
+        requirements_list,
+        role,
+        use_cache=use_cache,
+        requirements_text=requirements_text,
+        skill_levels=skill_levels,
+        on_match=on_match,
+    )
+    await run_in_db_executor(
+        remember_analysis,
+        filename,
+        cv_text,
+        skill_levels,
+        requirements_list,
+        role,
+        mode,
+        result,
+        document_hash,
+    )
+    if semantic:
+        result["semantic_matches"] = local_results["semantic_matches"]
+    return {"filename": filename, **result}
+
+
+async def stream_analysis(
+    documents: List[Tuple[str, bytes]],
+    requirements_list: List[dict],
+    requirements_text: str,
+    role: str,
+    use_cache: bool,
+    semantic: bool,
+    stream_format: str,
+    mode: str = "llm",
+):
+    """
+    Yield a "rules" event per CV as soon as its rule scoring is done, a
+    "requirement_match" event for each requirement match as soon as the
+    streamed LLM answer contains it, and an "analysis" (or "error") event
+    as soon as its LLM result is complete, in completion order, followed by
+    a final "done" event.
+    """
+    batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    queue = asyncio.Queue()
 
-        # Berechnung der Ähnlichkeit als Kosinusähnlichkeit zwischen den Vektoren
-        similarity = cv_doc.similarity(req_doc)
+    async def emit(event: str, data: dict):
+        await queue.put(format_stream_event(event, data, stream_format))
 
-        # Normalisierung des Ähnlichkeitswerts auf einen Prozentbereich (0 bis 100)
-        score = max(min(similarity * 100, 100), 0)
+    async def run(filename: str, contents: bytes):
+        try:
+            async with batch_semaphore:
+                result = await analyze_document(
+                    filename,
+                    contents,
+                    requirements_list,
+                    requirements_text,
+                    role,
+                    use_cache,
+                    semantic=semantic,
+                    emit=emit,
+                    mode=mode,
+                )
+            await emit("error" if "error" in result else "analysis", result)
+        finally:
+            # Sentinel: this document is finished
+            await queue.put(None)
 
-        return score
-    except Exception as e:
-        print(f"Error calculating similarity: {str(e)}")
-        return 0.0
+    tasks = [asyncio.create_task(run(filename, contents)) for filename, contents in documents]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await queue.get()
+            if item is None:
+                remaining -= 1
+            else:
+                yield item
+        yield format_stream_event("done", {"count": len(documents)}, stream_format)
+    finally:
+        # The client may disconnect mid-stream
+        for task in tasks:
+            task.cancel()
 
 
 @app.post("/analyze")
 async def analyze_cv(
     file: UploadFile = File(...),
     requirements: str = Query(None),
+    requirement_set: Optional[str] = Query(None),
+    requirement_set_version: Optional[int] = Query(None, ge=1),
     role: str = Query("consultant"),
+    no_cache: bool = Query(False),
+    stream: Optional[str] = Query(None, pattern="^(ndjson|sse)$"),
+    semantic: bool = Query(False),
+    mode: str = Query("llm", pattern="^(llm|rules)$"),
 ):
+    """
+    Analyze one CV against the requirements, given either as a stored
+    `requirement_set` ID or as newline-separated `requirements` text.
+    """
+    # Size and type are checked before any parsing
+    with span("file_read"):
+        contents = open_pdf_upload(file)
+    requirements_list, requirements_text = await resolve_requirements(
+        requirements, requirement_set, requirement_set_version
+    )
+
     try:
-        # Read and extract text from PDF
-        contents = await file.read()
-        cv_text = extract_text_from_pdf(contents)
-
-        # Parse requirements from query string
-        requirements_list = []
-        if requirements:
-            requirements_lines = requirements.split("\n")
-            requirements_list = [
-                {"text": line.strip()} for line in requirements_lines if line.strip()
-            ]
+        if stream:
+            return StreamingResponse(
+                stream_analysis(
+                    [(file.filename, contents)],
+                    requirements_list,
+                    requirements_text,
+                    role,
+                    not no_cache,
+                    semantic,
+                    stream,
+                    mode,
+                ),
+                media_type=STREAM_MEDIA_TYPES[stream],
+            )
+
+        if mode == "rules":
+            # Fast path: rule-based analysis only, no LLM call
+            cv_text, results, document_hash = await score_upload_rules_only(
+                contents, requirements_list, role, semantic, not no_cache
+            )
+            await run_in_db_executor(
+                remember_analysis,
+                file.filename,
+                cv_text,
+                results["skill_levels"],
+                requirements_list,
+                role,
+                mode,
+                results,
+                document_hash,
+            )
+            if semantic:
+                results["semantic_matches"] = await compute_semantic_matches(
+                    cv_text, requirements_list
+                )
+            return results
+
+        cv_text, skill_levels, document_hash = await score_upload(contents, not no_cache)
 
         # Get AI analysis with role parameter
-        results = get_ai_analysis(cv_text, requirements_list, role)
+        results = await get_ai_analysis(
+            cv_text,
+            requirements_list,
+            role,
+            use_cache=not no_cache,
+            requirements_text=requirements_text,
+            skill_levels=skill_levels,
+        )
+        await run_in_db_executor(
+            remember_analysis,
+            file.filename,
+            cv_text,
+            skill_levels,
+            requirements_list,
+            role,
+            mode,
+            results,
+            document_hash,
+        )
+        if semantic:
+            results["semantic_matches"] = await compute_semantic_matches(
+                cv_text, requirements_list
+            )
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def open_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> Union[bytes, mmap.mmap]:
+    """
+    The content of an upload, without a second copy in memory: small
+    uploads as bytes, spooled ones as a read-only memory map of their
+    temporary file. Uploads over `max_bytes` are rejected with 413.
+    """
+    file = upload.file
+    size = file.seek(0, os.SEEK_END)
+    if size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{upload.filename} is larger than {max_bytes // 2**20} MB",
+        )
+    file.seek(0)
+    if size < UPLOAD_MAP_MIN_BYTES:
+        return file.read()
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def is_pdf(contents: Union[bytes, mmap.mmap]) -> bool:
+    # PDF readers accept up to 1 KB of junk before the header
+    return PDF_MAGIC in contents[:1024]
+
+
+def open_pdf_upload(upload: UploadFile) -> Union[bytes, mmap.mmap]:
+    """open_upload for a single CV; anything but a PDF is rejected with 415."""
+    contents = open_upload(upload)
+    if not is_pdf(contents):
+        raise HTTPException(status_code=415, detail=f"{upload.filename} is not a PDF file")
+    return contents
+
+
+def _read_batch_documents(
+    filename: str, contents: Union[bytes, mmap.mmap], max_files: int, max_bytes: int
+) -> List[Tuple[str, bytes]]:
+    """
+    Return the PDFs of an upload, unpacking zip archives. An archive with
+    more than `max_files` PDFs or more than `max_bytes` of them unpacked is
+    rejected before anything is decompressed.
+    """
+    stream = contents if isinstance(contents, mmap.mmap) else io.BytesIO(contents)
+    if not zipfile.is_zipfile(stream):
+        if len(contents) > MAX_UPLOAD_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"{filename} is larger than {MAX_UPLOAD_BYTES // 2**20} MB",
+            )
+        return [(filename, contents)]
+    try:
+        with zipfile.ZipFile(stream) as archive:
+            members = [
+                info
+                for info in archive.infolist()
+                if not info.is_dir()
+                and info.filename.lower().endswith(".pdf")
+                and not info.filename.startswith("__MACOSX/")
+            ]
+            if len(members) > max_files:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"{filename} contains {len(members)} CVs, "
+                    f"the batch has room for {max_files}",
+                )
+            unpacked_size = sum(info.file_size for info in members)
+            if unpacked_size > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"{filename} unpacks to {unpacked_size / 2**20:.1f} MB, "
+                    f"the batch has room for {max_bytes / 2**20:.1f} MB",
+                )
+            for info in members:
+                if info.file_size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"{info.filename} in {filename} is larger than "
+                        f"{MAX_UPLOAD_BYTES // 2**20} MB",
+                    )
+            return [(info.filename, archive.read(info)) for info in members]
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"Invalid zip archive {filename}: {e}")
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    files: List[UploadFile] = File(...),
+    requirements: str = Query(None),
+    requirement_set: Optional[str] = Query(None),
+    requirement_set_version: Optional[int] = Query(None, ge=1),
+    role: str = Query("consultant"),
+    no_cache: bool = Query(False),
+    stream: Optional[str] = Query(None, pattern="^(ndjson|sse)$"),
+    semantic: bool = Query(False),
+    mode: str = Query("llm", pattern="^(llm|rules)$"),
+):
+    """
+    Analyze many CVs (PDFs or zip archives of PDFs) against one requirement
+    set and return them ranked by overall score, or stream per-CV events as
+    they complete when `stream` is "ndjson" or "sse".
+    """
+    documents = []
+    # CVs and bytes left in the batch; zip archives are checked against
+    # them before they are unpacked
+    unpacked_size = 0
+    for upload in files:
+        with span("file_read"):
+            contents = open_upload(upload, MAX_BATCH_UPLOAD_BYTES)
+        unpacked = _read_batch_documents(
+            upload.filename,
+            contents,
+            BATCH_MAX_FILES - len(documents),
+            MAX_BATCH_UPLOAD_BYTES - unpacked_size,
+        )
+        documents.extend(unpacked)
+        unpacked_size += sum(len(document) for _, document in unpacked)
+        if len(documents) > BATCH_MAX_FILES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch contains more than {BATCH_MAX_FILES} CVs",
+            )
+
+    # Requirement-dependent prompt parts are shared by every CV in the batch
+    requirements_list, requirements_text = await resolve_requirements(
+        requirements, requirement_set, requirement_set_version
+    )
+    if stream:
+        return StreamingResponse(
+            stream_analysis(
+                documents,
+                requirements_list,
+                requirements_text,
+                role,
+                not no_cache,
+                semantic,
+                stream,
+                mode,
+            ),
+            media_type=STREAM_MEDIA_TYPES[stream],
+        )
+
+    batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(filename: str, contents: bytes) -> dict:
+        async with batch_semaphore:
+            return await analyze_document(
+                filename,
+                contents,
+                requirements_list,
+                requirements_text,
+                role,
+                not no_cache,
+                semantic=semantic,
+                mode=mode,
+            )
+
+    results = await asyncio.gather(
+        *(run(filename, contents) for filename, contents in documents)
+    )
+
+    ranked = rank_results(results)
+    return {"count": len(ranked), "results": ranked}
+
+
+def parse_skill_filters(skills: Optional[List[str]]) -> Dict[str, str]:
+    """Parse "category:Level" filters, e.g. "ecc_systems:Advanced"."""
+    filters = {}
+    for item in skills or []:
+        category, _, level = item.partition(":")
+        if not category or level not in SKILL_LEVELS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Invalid skill filter {item!r}, expected category:level with a level "
+                f"out of {', '.join(SKILL_LEVELS)}",
+            )
+        filters[category] = level
+    return filters
+
+
+def require_candidate_store() -> CandidateStore:
+    if candidate_store is None:
+        raise HTTPException(
+            status_code=503, detail="The candidate store is disabled (CANDIDATE_DB_PATH)"
+        )
+    return candidate_store
+
+
+@app.get("/candidates")
+async def search_candidates(
+    role: Optional[str] = Query(None),
+    seniority: Optional[str] = Query(None),
+    skill: Optional[List[str]] = Query(None),
+    min_score: Optional[float] = Query(None),
+    requirements: Optional[str] = Query(None),
+    requirement_set: Optional[str] = Query(None),
+    requirement_set_version: Optional[int] = Query(None, ge=1),
+    mode: Optional[str] = Query(None, pattern="^(llm|rules)$"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Stored candidates ranked by overall score, each with its latest analysis
+    matching the filters. `skill` takes minimum levels as "category:Level"
+    and can be repeated; `requirements` or `requirement_set` restricts the
+    results to analyses against that requirement list.
+    """
+    store = require_candidate_store()
+    analyzed_against = None
+    if requirements is not None or requirement_set is not None:
+        requirements_list, _ = await resolve_requirements(
+            requirements, requirement_set, requirement_set_version
+        )
+        analyzed_against = [req["text"] for req in requirements_list]
+    results = await run_in_db_executor(
+        store.search,
+        role=role,
+        seniority_level=seniority,
+        skills=parse_skill_filters(skill),
+        min_score=min_score,
+        requirements=analyzed_against,
+        mode=mode,
+        limit=limit,
+        offset=offset,
+    )
+    return {"count": len(results), "results": results}
+
+
+@app.get("/candidates/stats")
+async def candidate_stats():
+    return await run_in_db_executor(require_candidate_store().stats)
+
+
+@app.get("/candidates/{candidate_id}")
+async def get_candidate(candidate_id: str, include_text: bool = Query(False)):
+    candidate = await run_in_db_executor(
+        require_candidate_store().get_candidate, candidate_id, include_text
+    )
+    if candidate is None:
+        raise HTTPException(status_code=404, detail="Unknown candidate")
+    return candidate
+
+
+@app.post("/candidates/{candidate_id}/analyze")
+async def analyze_stored_candidate(
+    candidate_id: str,
+    requirements: str = Query(None),
+    requirement_set: Optional[str] = Query(None),
+    requirement_set_version: Optional[int] = Query(None, ge=1),
+    role: str = Query("consultant"),
+    no_cache: bool = Query(False),
+    mode: str = Query("llm", pattern="^(llm|rules)$"),
+):
+    """
+    Analyze a stored candidate against new requirements, reusing the stored
+    text and skill levels instead of a PDF upload.
+    """
+    profile = await run_in_db_executor(
+        require_candidate_store().get_profile, candidate_id, active_scoring_config().version
+    )
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Unknown candidate")
+    cv_text, skill_levels, filename = profile
+    requirements_list, requirements_text = await resolve_requirements(
+        requirements, requirement_set, requirement_set_version
+    )
+    return await analyze_profile(
+        cv_text,
+        skill_levels,
+        filename,
+        requirements_list,
+        role,
+        mode,
+        use_cache=not no_cache,
+        requirements_text=requirements_text,
+    )
+
+
+@app.post("/candidates/rescore")
+async def rescore_candidates(
+    requirements: str = Query(None),
+    requirement_set: Optional[str] = Query(None),
+    requirement_set_version: Optional[int] = Query(None, ge=1),
+    role: str = Query("consultant"),
+    no_cache: bool = Query(False),
+    semantic: bool = Query(False),
+    mode: str = Query("llm", pattern="^(llm|rules)$"),
+    limit: Optional[int] = Query(None, ge=1),
+):
+    """
+    Re-rank the stored candidates (the `limit` most recently updated, or
+    all) against new requirements. Text and skill levels come from the
+    store, and the LLM is only asked about requirements a candidate was not
+    analyzed against before.
+    """
+    store = require_candidate_store()
+    requirements_list, requirements_text = await resolve_requirements(
+        requirements, requirement_set, requirement_set_version
+    )
+    batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(candidate_id: str, cv_text: str, skill_levels: dict, filename: str) -> dict:
+        async with batch_semaphore:
+            result = await analyze_profile(
+                cv_text,
+                skill_levels,
+                filename,
+                requirements_list,
+                role,
+                mode,
+                use_cache=not no_cache,
+                requirements_text=requirements_text,
+                semantic=semantic,
+            )
+        return {"filename": filename, **result}
+
+    profiles = await run_in_db_executor(store.profiles, limit, active_scoring_config().version)
+    results = await asyncio.gather(*(run(*profile) for profile in profiles))
+    ranked = rank_results(results)
+    return {"count": len(ranked), "results": ranked}
+
+
+async def run_job(job: dict) -> dict:
+    """Run a queued /jobs analysis; failed extractions fail the job."""
+    params = job["params"]
+    with scoring_configs.pinned():
+        requirements_list, requirements_text = await resolve_requirements(
+            params["requirements"],
+            params.get("requirement_set"),
+            params.get("requirement_set_version"),
+        )
+        result = await analyze_document(
+            job["filename"],
+            job["document"],
+            requirements_list,
+            requirements_text,
+            params["role"],
+            params["use_cache"],
+            semantic=params["semantic"],
+            mode=params["mode"],
+        )
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result
+
+
+job_queue = JobQueue(
+    JOB_DB_PATH,
+    run_job,
+    workers=JOB_WORKERS,
+    max_queued=JOB_MAX_QUEUED,
+    lease_seconds=JOB_LEASE_SECONDS,
+    callback_schemes=JOB_CALLBACK_SCHEMES,
+    callback_hosts=JOB_CALLBACK_HOSTS,
+)
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    requirements: str = Query(None),
+    requirement_set: Optional[str] = Query(None),
+    requirement_set_version: Optional[int] = Query(None, ge=1),
+    role: str = Query("consultant"),
+    no_cache: bool = Query(False),
+    semantic: bool = Query(False),
+    mode: str = Query("llm", pattern="^(llm|rules)$"),
+    callback_url: Optional[str] = Query(None, pattern="^https?://"),
+):
+    """
+    Queue the analysis of a CV and return its job ID at once. Poll
+    GET /jobs/{id} for the result, or pass `callback_url` to have the
+    finished job POSTed there (see JOB_CALLBACK_HOSTS). Answers 429 while
+    the queue is full.
+    """
+    if callback_url is not None:
+        try:
+            job_queue.check_callback_url(callback_url)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid callback_url: {e}")
+    with span("file_read"):
+        contents = open_pdf_upload(file)
+    if requirement_set is not None:
+        # The job runs against the set as it is now, even if it is updated later
+        if requirement_set_version is None:
+            requirement_set_version = await run_in_db_executor(
+                requirement_sets.latest_version, requirement_set
+            )
+        await resolve_requirements(requirements, requirement_set, requirement_set_version)
+    params = {
+        "requirements": requirements,
+        "requirement_set": requirement_set,
+        "requirement_set_version": requirement_set_version,
+        "role": role,
+        "use_cache": not no_cache,
+        "semantic": semantic,
+        "mode": mode,
+    }
+    try:
+        job_id = await run_in_db_executor(
+            job_queue.submit, file.filename, contents, params, callback_url
+        )
+    except QueueFullError as e:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": f"The job queue is full: {e}"},
+            headers={"Retry-After": "30"},
+        )
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued"},
+        headers={"Location": f"/jobs/{job_id}"},
+    )
+
+
+@app.get("/jobs/stats")
+async def job_stats():
+    return await run_in_db_executor(job_queue.stats)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_in_db_executor(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+class RequirementSetIn(BaseModel):
+    requirements: List[str]
+    name: Optional[str] = None
+
+
+def _check_requirement_set(body: RequirementSetIn) -> None:
+    if not normalize_requirement_list(body.requirements):
+        raise HTTPException(status_code=422, detail="The requirement set is empty")
+
+
+@app.post("/requirement-sets", status_code=201)
+async def create_requirement_set(body: RequirementSetIn):
+    """
+    Store a requirement list under a new ID, for use as `requirement_set`
+    in the analysis endpoints.
+    """
+    _check_requirement_set(body)
+    record = await run_in_db_executor(requirement_sets.create, body.requirements, body.name)
+    return JSONResponse(
+        status_code=201,
+        content=record,
+        headers={"Location": f"/requirement-sets/{record['id']}"},
+    )
+
+
+@app.get("/requirement-sets")
+async def list_requirement_sets(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    results = await run_in_db_executor(requirement_sets.list, limit, offset)
+    return {"count": len(results), "results": results}
+
+
+@app.get("/requirement-sets/{set_id}")
+async def get_requirement_set(set_id: str, version: Optional[int] = Query(None, ge=1)):
+    record = await run_in_db_executor(requirement_sets.get, set_id, version)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Unknown requirement set")
+    return record
+
+
+@app.put("/requirement-sets/{set_id}")
+async def update_requirement_set(set_id: str, body: RequirementSetIn):
+    """Store a new version of a set; earlier versions stay available."""
+    _check_requirement_set(body)
+    record = await run_in_db_executor(
+        requirement_sets.update, set_id, body.requirements, body.name
+    )
+    if record is None:
+        raise HTTPException(status_code=404, detail="Unknown requirement set")
+    return record
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+async def metrics():
+    # Collecting reads the job queue from SQLite
+    return Response(await run_in_db_executor(latest_metrics), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return await run_in_db_executor(analysis_cache.stats)
+
+
+@app.get("/llm/stats")
+async def llm_stats():
+    return llm_gateway.stats()
+
+
+@app.get("/config/stats")
+async def scoring_config_stats():
+    return scoring_configs.stats()
+
+
+@app.post("/config/reload")
+async def reload_scoring_config(authorization: Optional[str] = Header(None)):
+    """
+    Load the scoring config file now instead of at the next check. Other
+    server processes pick the change up at their next check. Needs the
+    CONFIG_ADMIN_TOKEN as a Bearer token.
+    """
+    if not CONFIG_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Config reload is disabled")
+    if not hmac.compare_digest(
+        (authorization or "").encode(), f"Bearer {CONFIG_ADMIN_TOKEN}".encode()
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid admin token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        # Reading, compiling and the dry run take a while: not on the event loop
+        await asyncio.to_thread(scoring_configs.reload)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Scoring config not reloaded: {e}")
+    return scoring_configs.stats()
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    await job_queue.stop()
+    pdf_executor.shutdown(wait=False)
+    db_executor.shutdown(wait=False)
+    shutdown_page_pool()
+    await llm_gateway.aclose()
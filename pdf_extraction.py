@@ -0,0 +1,109 @@
+"""
+PDF text extraction.
+
+PDFs with many pages are split into page ranges that are extracted in
+parallel on a process pool; every worker re-opens the document from the raw
+bytes and returns the text of its range. Short PDFs are extracted inline,
+where the pool round-trip would cost more than it saves.
+
+The document can be given as bytes or, for large uploads, as a read-only
+memory map of the spooled upload file. A memory map is parsed in place in
+the calling process, one page at a time: the workers could only get it as a
+copy of the whole file per task.
+"""
+
+import io
+import math
+import mmap
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Iterator, List, Union
+
+import PyPDF2
+
+PDF_PROCESS_WORKERS = int(os.getenv("PDF_PROCESS_WORKERS", str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+
+class NormalizedText(str):
+    """
+    CV text that is already lowercased. Pipeline stages call normalize_text()
+    on their input, which is a no-op for this type, so the text is lowercased
+    exactly once after extraction.
+    """
+
+
+def normalize_text(text: str) -> NormalizedText:
+    if isinstance(text, NormalizedText):
+        return text
+    return NormalizedText(text.lower())
+
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            # Workers are spawned rather than forked: the server process runs
+            # threads, and spawned workers only need to import this module
+            _page_pool = ProcessPoolExecutor(
+                max_workers=PDF_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _page_pool
+
+
+def shutdown_page_pool() -> None:
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is not None:
+            _page_pool.shutdown(wait=False, cancel_futures=True)
+            _page_pool = None
+
+
+def _open_stream(file_content: Union[bytes, mmap.mmap]) -> BinaryIO:
+    if isinstance(file_content, mmap.mmap):
+        file_content.seek(0)
+        return file_content
+    return io.BytesIO(file_content)
+
+
+def _extract_page_range(file_content: bytes, start: int, stop: int) -> List[str]:
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+    return [pdf_reader.pages[i].extract_text() for i in range(start, stop)]
+
+
+def extract_pages(file_content: Union[bytes, mmap.mmap]) -> List[str]:
+    """Return the raw text of every page, in page order."""
+    pdf_reader = PyPDF2.PdfReader(_open_stream(file_content))
+    page_count = len(pdf_reader.pages)
+    if (
+        page_count < PDF_PARALLEL_MIN_PAGES
+        or PDF_PROCESS_WORKERS <= 1
+        or isinstance(file_content, mmap.mmap)
+    ):
+        return [page.extract_text() for page in pdf_reader.pages]
+
+    pool = _get_page_pool()
+    chunk_size = math.ceil(page_count / PDF_PROCESS_WORKERS)
+    futures = [
+        pool.submit(
+            _extract_page_range,
+            file_content,
+            start,
+            min(start + chunk_size, page_count),
+        )
+        for start in range(0, page_count, chunk_size)
+    ]
+    return [text for future in futures for text in future.result()]
+
+
+def iter_pdf_pages(file_content: Union[bytes, mmap.mmap]) -> Iterator[str]:
+    """Yield the lowercased text of each page, parsing pages only on demand."""
+    pdf_reader = PyPDF2.PdfReader(_open_stream(file_content))
+    for page in pdf_reader.pages:
+        yield page.extract_text().lower()
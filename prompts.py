@@ -0,0 +1,224 @@
+"""
+Prompt templates for the LLM analysis, versioned in a registry.
+
+Templates are parsed once at import time. A template consists of the system
+prompt, a static user-prompt prefix and a body with $placeholders for the
+per-call values. Providers cache prompt prefixes that are byte-identical
+across calls, so the current version keeps everything static (instructions,
+rating guidelines, the response format) in front of the role, seniority, CV
+and requirements.
+
+The version of the active template is part of the result cache key and is
+reported in the LLM statistics; bump it (register a new version) whenever a
+template changes.
+"""
+
+import os
+from string import Template
+from typing import Dict, List
+
+
+class PromptTemplate:
+    def __init__(self, version: str, system: str, user_prefix: str, user_body: str):
+        self.version = version
+        self.system = system
+        self.user_prefix = user_prefix
+        self.user_body = Template(user_body)
+
+    def messages(self, **fields: str) -> List[dict]:
+        """Chat messages with the placeholders of the body filled in."""
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user_prefix + self.user_body.substitute(fields)},
+        ]
+
+
+ANALYSIS_SYSTEM_PROMPT = """Du bist ein CV-Analyse-Assistent mit besonderem Fokus auf faire Bewertung verschiedener Erfahrungsstufen.
+
+KRITISCHE ANFORDERUNG: Wenn ein Lebenslauf Deutschkenntnisse geringer als C1 hat (also A1, A2, B1, B2, "Gut", "Basic" oder "None"), MUSS die Gesamtbewertung 0% sein und der Kandidat als "Nicht geeignet" eingestuft werden. Dies ist eine absolute Voraussetzung, die unter keinen Umständen umgangen werden darf.
+
+Für Junior-Kandidaten:
+- Bewerte Grundkenntnisse und Potenzial positiv
+- Fehlende Erfahrung ist normal und sollte nicht negativ bewertet werden
+- Fokussiere auf Lernbereitschaft und Entwicklungspotenzial
+
+Für Professional-Kandidaten:
+- Erwarte solide Grundkenntnisse
+- Bewerte erste Praxiserfahrung positiv
+- Fokussiere auf Entwicklung zur Expertise
+
+Für Senior-Kandidaten:
+- Erwarte vertiefte Fachkenntnisse
+- Bewerte Führungserfahrung positiv
+- Achte auf strategisches Denken
+
+Für Principal-Kandidaten:
+- Erwarte umfassende Expertise
+- Bewerte strategische Führung
+- Achte auf Innovation und Erfolge
+
+Antworte AUSSCHLIESSLICH mit einem validen JSON-Objekt. Keine zusätzlichen Erklärungen oder Formatierung."""
+
+# Version 2: CV and requirements in the middle of the instructions
+ANALYSIS_PROMPT_V2 = PromptTemplate(
+    version="2",
+    system=ANALYSIS_SYSTEM_PROMPT,
+    user_prefix="",
+    user_body="""Analysiere den folgenden Lebenslauf für die Position $role anhand der Stellenanforderungen. 
+
+KRITISCHE ANFORDERUNG: Wenn ein Lebenslauf Deutschkenntnisse geringer als C1 hat (also A1, A2, B1, B2, "Gut", "Basic" oder "None"), MUSS die Gesamtbewertung 0% sein und der Kandidat als "Nicht geeignet" eingestuft werden. Dies ist eine absolute Voraussetzung, die unter keinen Umständen umgangen werden darf.
+
+Lebenslauf Text:
+$cv_text
+
+Stellenanforderungen:
+$requirements
+
+WICHTIG - Bewertungsrichtlinien:
+Wenn ein Kandidat ein deutsch Niveau unter C1 hat, ist er ungeeignet und sollte 0% Gesamtbewertung erhalten
+1. Berücksichtige das Erfahrungslevel "$seniority_level" bei der Bewertung
+2. Für Junior-Level:
+   - Fokussiere auf Grundkenntnisse und Potenzial
+   - Bewerte fehlende Erfahrung nicht negativ
+   - Hebe Lernbereitschaft und grundlegende Fähigkeiten hervor
+3. Für Professional-Level:
+   - Erwarte solide Grundkenntnisse in allen Kernbereichen
+   - Bewerte praktische Erfahrung positiv
+   - Fokussiere auf wachsende Expertise
+4. Für Senior-Level:
+   - Erwarte vertiefte Fachkenntnisse
+   - Bewerte Führungserfahrung und Projektverantwortung
+   - Achte auf strategisches Verständnis
+5. Für Principal-Level:
+   - Erwarte umfassende Expertise
+   - Bewerte strategische Führungskompetenz
+   - Achte auf nachgewiesene Erfolge und Innovation
+
+WICHTIG - Formatierungsregeln für die JSON-Antwort:
+1. Antworte AUSSCHLIESSLICH mit einem validen JSON-Objekt
+2. Verwende KEINE Kommentare oder zusätzlichen Text
+3. Alle Textfelder MÜSSEN in doppelten Anführungszeichen stehen
+4. Zahlen dürfen KEINE Anführungszeichen haben
+5. Arrays müssen mit [ beginnen und mit ] enden
+6. Objekte müssen mit { beginnen und mit } enden
+7. Alle Felder müssen mit Komma getrennt sein
+8. Das letzte Element in Arrays/Objekten darf KEIN Komma haben
+9. Keine Zeilenumbrüche in Textfeldern verwenden
+10. Maximale Länge für Textfelder: 500 Zeichen
+11. Maximale Anzahl von Elementen in Arrays: 5
+
+Erwartetes Format:
+{
+    "overall_score": 75,
+    "seniority_level": "$seniority_level",
+    "requirement_matches": [
+        {
+            "requirement": "Beispielanforderung",
+            "match_percentage": 80,
+            "explanation": "Kurze Erklärung"
+        }
+    ],
+    "summary": "Kurze Zusammenfassung der Analyse",
+    "key_strengths": [
+        "Stärke 1",
+        "Stärke 2"
+    ],
+    "improvement_areas": [
+        "Entwicklungspotenzial 1",
+        "Entwicklungspotenzial 2"
+    ]
+}""",
+)
+
+# Version 3: static instructions first, per-call values last
+ANALYSIS_PROMPT_V3 = PromptTemplate(
+    version="3",
+    system=ANALYSIS_SYSTEM_PROMPT,
+    user_prefix="""KRITISCHE ANFORDERUNG: Wenn ein Lebenslauf Deutschkenntnisse geringer als C1 hat (also A1, A2, B1, B2, "Gut", "Basic" oder "None"), MUSS die Gesamtbewertung 0% sein und der Kandidat als "Nicht geeignet" eingestuft werden. Dies ist eine absolute Voraussetzung, die unter keinen Umständen umgangen werden darf.
+
+WICHTIG - Bewertungsrichtlinien:
+Wenn ein Kandidat ein deutsch Niveau unter C1 hat, ist er ungeeignet und sollte 0% Gesamtbewertung erhalten
+1. Berücksichtige das unten angegebene Erfahrungslevel des Kandidaten bei der Bewertung
+2. Für Junior-Level:
+   - Fokussiere auf Grundkenntnisse und Potenzial
+   - Bewerte fehlende Erfahrung nicht negativ
+   - Hebe Lernbereitschaft und grundlegende Fähigkeiten hervor
+3. Für Professional-Level:
+   - Erwarte solide Grundkenntnisse in allen Kernbereichen
+   - Bewerte praktische Erfahrung positiv
+   - Fokussiere auf wachsende Expertise
+4. Für Senior-Level:
+   - Erwarte vertiefte Fachkenntnisse
+   - Bewerte Führungserfahrung und Projektverantwortung
+   - Achte auf strategisches Verständnis
+5. Für Principal-Level:
+   - Erwarte umfassende Expertise
+   - Bewerte strategische Führungskompetenz
+   - Achte auf nachgewiesene Erfolge und Innovation
+
+WICHTIG - Formatierungsregeln für die JSON-Antwort:
+1. Antworte AUSSCHLIESSLICH mit einem validen JSON-Objekt
+2. Verwende KEINE Kommentare oder zusätzlichen Text
+3. Alle Textfelder MÜSSEN in doppelten Anführungszeichen stehen
+4. Zahlen dürfen KEINE Anführungszeichen haben
+5. Arrays müssen mit [ beginnen und mit ] enden
+6. Objekte müssen mit { beginnen und mit } enden
+7. Alle Felder müssen mit Komma getrennt sein
+8. Das letzte Element in Arrays/Objekten darf KEIN Komma haben
+9. Keine Zeilenumbrüche in Textfeldern verwenden
+10. Maximale Länge für Textfelder: 500 Zeichen
+11. Maximale Anzahl von Elementen in Arrays: 5
+
+Erwartetes Format:
+{
+    "overall_score": 75,
+    "seniority_level": "Erfahrungslevel des Kandidaten",
+    "requirement_matches": [
+        {
+            "requirement": "Beispielanforderung",
+            "match_percentage": 80,
+            "explanation": "Kurze Erklärung"
+        }
+    ],
+    "summary": "Kurze Zusammenfassung der Analyse",
+    "key_strengths": [
+        "Stärke 1",
+        "Stärke 2"
+    ],
+    "improvement_areas": [
+        "Entwicklungspotenzial 1",
+        "Entwicklungspotenzial 2"
+    ]
+}
+
+""",
+    user_body="""Analysiere den folgenden Lebenslauf für die Position $role anhand der Stellenanforderungen.
+
+Erfahrungslevel des Kandidaten: $seniority_level
+
+Lebenslauf Text:
+$cv_text
+
+Stellenanforderungen:
+$requirements""",
+)
+
+PROMPT_REGISTRY: Dict[str, PromptTemplate] = {
+    template.version: template for template in (ANALYSIS_PROMPT_V2, ANALYSIS_PROMPT_V3)
+}
+
+DEFAULT_PROMPT_VERSION = "3"
+
+
+def get_prompt(version: str) -> PromptTemplate:
+    try:
+        return PROMPT_REGISTRY[version]
+    except KeyError:
+        raise ValueError(
+            f"Unknown prompt version {version!r}, available: {sorted(PROMPT_REGISTRY)}"
+        ) from None
+
+
+def active_prompt() -> PromptTemplate:
+    """The template selected with PROMPT_VERSION, by default the latest."""
+    return get_prompt(os.getenv("PROMPT_VERSION", DEFAULT_PROMPT_VERSION))
@@ -0,0 +1,165 @@
+"""
+Stored requirement lists.
+
+A requirement set keeps a list of requirements under an ID, so clients pass
+the ID to the analysis endpoints instead of sending the full text with
+every request. Requirements are normalized when saved: whitespace is
+collapsed, empty lines and duplicates are dropped, and the order is kept.
+
+Updating a set adds a new version and keeps the earlier ones readable, so
+a version always stands for the same list. An update that leaves the
+normalized list and name unchanged does not add a version.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from candidate_store import normalize_requirement
+from sqlite_connection import ProcessConnection
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requirement_sets (
+    id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    name TEXT,
+    requirements TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (id, version)
+);
+"""
+
+
+def normalize_requirement_list(requirements: List[str]) -> List[str]:
+    """Collapse whitespace and drop empty lines and duplicates, keeping the order."""
+    normalized = (normalize_requirement(req) for req in requirements)
+    return list(dict.fromkeys(req for req in normalized if req))
+
+
+class RequirementSetStore:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = ProcessConnection(db_path, SCHEMA, timeout=30, isolation_level=None)
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        return self._connection.get()
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> dict:
+        return {
+            "id": row["id"],
+            "version": row["version"],
+            "name": row["name"],
+            "requirements": json.loads(row["requirements"]),
+            "created_at": row["created_at"],
+        }
+
+    def _latest(self, set_id: str) -> Optional[sqlite3.Row]:
+        return self._db.execute(
+            "SELECT * FROM requirement_sets WHERE id = ? ORDER BY version DESC LIMIT 1",
+            (set_id,),
+        ).fetchone()
+
+    def create(self, requirements: List[str], name: Optional[str] = None) -> dict:
+        """Store a new set as version 1."""
+        record = {
+            "id": uuid.uuid4().hex,
+            "version": 1,
+            "name": name,
+            "requirements": normalize_requirement_list(requirements),
+            "created_at": time.time(),
+        }
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO requirement_sets (id, version, name, requirements, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    record["id"],
+                    record["version"],
+                    name,
+                    json.dumps(record["requirements"], ensure_ascii=False),
+                    record["created_at"],
+                ),
+            )
+        return record
+
+    def update(
+        self, set_id: str, requirements: List[str], name: Optional[str] = None
+    ) -> Optional[dict]:
+        """
+        Store a new version of a set and return it, or the current version
+        if nothing changed. Returns None for unknown sets.
+        """
+        normalized = normalize_requirement_list(requirements)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                latest = self._latest(set_id)
+                if latest is None:
+                    self._db.execute("COMMIT")
+                    return None
+                if json.loads(latest["requirements"]) == normalized and latest["name"] == name:
+                    self._db.execute("COMMIT")
+                    return self._record(latest)
+                record = {
+                    "id": set_id,
+                    "version": latest["version"] + 1,
+                    "name": name,
+                    "requirements": normalized,
+                    "created_at": time.time(),
+                }
+                self._db.execute(
+                    "INSERT INTO requirement_sets (id, version, name, requirements, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        set_id,
+                        record["version"],
+                        name,
+                        json.dumps(normalized, ensure_ascii=False),
+                        record["created_at"],
+                    ),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return record
+
+    def get(self, set_id: str, version: Optional[int] = None) -> Optional[dict]:
+        """A version of a set, by default the latest one."""
+        with self._lock:
+            if version is None:
+                row = self._latest(set_id)
+            else:
+                row = self._db.execute(
+                    "SELECT * FROM requirement_sets WHERE id = ? AND version = ?",
+                    (set_id, version),
+                ).fetchone()
+        return self._record(row) if row else None
+
+    def latest_version(self, set_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MAX(version) FROM requirement_sets WHERE id = ?", (set_id,)
+            ).fetchone()
+        return row[0]
+
+    def list(self, limit: int = 50, offset: int = 0) -> List[dict]:
+        """The latest version of each set, most recently changed first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM requirement_sets AS s WHERE version = "
+                "(SELECT MAX(version) FROM requirement_sets WHERE id = s.id) "
+                "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [self._record(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,214 @@
+"""
+Hot-reloadable scoring configuration.
+
+The seniority criteria, the level requirements of each role and the keyword
+tables of the rule-based skill assessment are read from a JSON file
+(scoring_config.json by default) instead of being part of the code. Every
+loaded file is compiled once into the structures the scoring works with,
+such as the keyword automaton and the seniority weight matrices (see
+main.ScoringConfig).
+
+ScoringConfigStore looks at the modification time of the file at most
+every `check_interval` seconds. A changed file is loaded, compiled and
+scored once on a sample (`dry_run`) first and then swapped in as a whole;
+a file that fails any of these steps is logged and the active config stays in place. Requests pin the config that
+is current when they start (`pinned()`), so a reload never mixes two
+configs within one result, and requests already running finish with the
+config they started with.
+
+The config version is the "version" field of the file plus a hash of its
+content, so an edit that does not bump "version" still changes it.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+REQUIRED_SECTIONS = ("criteria", "level_requirements", "keywords")
+ROLES = ("consultant", "developer")
+
+# The keyword tables the skill assessment reads: a list of keywords, an
+# object of keyword groups with free names (None), or one with these groups
+LEVELS = ("expert", "advanced", "basic")
+KEYWORD_TABLES = {
+    "language": ("expert", "advanced"),
+    "expert_indicators": list,
+    "similar_companies": list,
+    "location": None,
+    "education": LEVELS,
+    "soft_skills": LEVELS,
+    "ms_office": list,
+    "process_modeling_tools": list,
+    "ecc": list,
+    "s4": list,
+    "process": list,
+    "tech": None,
+    "nonsap": None,
+    "modeling": list,
+    "process_mgmt": LEVELS,
+    "req_eng": LEVELS,
+    "pm": LEVELS,
+    "energy": LEVELS,
+    "network": list,
+    "supply": list,
+    "msb": LEVELS,
+    # Single keywords the assessment checks by name
+    "markers": (
+        "expert_level",
+        "advanced_level",
+        "process_optimization",
+        "sap",
+        "ecc",
+        "modeling",
+    ),
+}
+
+pinned_config_var = contextvars.ContextVar("scoring_config", default=None)
+
+
+def load_config_file(path: str) -> Tuple[str, dict]:
+    """Read and check a config file. Returns its version and content; raises ValueError."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{path} is not valid JSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} does not contain a JSON object")
+    for section in REQUIRED_SECTIONS:
+        if not isinstance(data.get(section), dict):
+            raise ValueError(f"{path} has no {section!r} object")
+    for section in ("criteria", "level_requirements"):
+        missing = [role for role in ROLES if not isinstance(data[section].get(role), dict)]
+        if missing:
+            raise ValueError(f"{path}: {section} lacks the roles {', '.join(missing)}")
+    for name, table in data["keywords"].items():
+        groups = table.values() if isinstance(table, dict) else [table]
+        if not all(
+            isinstance(group, list) and all(isinstance(kw, str) and kw for kw in group)
+            for group in groups
+        ):
+            raise ValueError(
+                f"{path}: keywords.{name} must be a list of keywords or an object of such lists"
+            )
+    for name, shape in KEYWORD_TABLES.items():
+        table = data["keywords"].get(name)
+        if table is None:
+            raise ValueError(f"{path}: keywords.{name} is missing")
+        if shape is list:
+            if not isinstance(table, list):
+                raise ValueError(f"{path}: keywords.{name} must be a list of keywords")
+            continue
+        if not isinstance(table, dict):
+            raise ValueError(f"{path}: keywords.{name} must be an object of keyword lists")
+        missing = [group for group in shape or () if not table.get(group)]
+        if missing:
+            raise ValueError(
+                f"{path}: keywords.{name} lacks keywords for {', '.join(missing)}"
+            )
+    digest = hashlib.sha256(raw).hexdigest()[:12]
+    return f"{data.get('version', '0')}+{digest}", data
+
+
+class ScoringConfigStore:
+    def __init__(
+        self,
+        path: str,
+        compile: Callable[[dict, str], Any],
+        check_interval: float = 5.0,
+        dry_run: Optional[Callable[[Any], None]] = None,
+    ):
+        self.path = path
+        self.compile = compile
+        self.dry_run = dry_run
+        self.check_interval = check_interval
+        self.reloads = 0
+        self.loaded_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._current = None
+        self._mtime = None
+        self._checked_at = time.monotonic()
+        # A broken file at startup is an error, not something to run without
+        self.reload()
+
+    def reload(self) -> bool:
+        """
+        Load, compile and activate the file. Returns False if its version is
+        already active. Raises OSError or ValueError, keeping the active config.
+        """
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime_ns
+            # A broken file is reported once, not at every check
+            self._mtime = mtime
+            try:
+                version, data = load_config_file(self.path)
+                if self._current is not None and version == self._current.version:
+                    return False
+                try:
+                    compiled = self.compile(data, version)
+                    self._try(compiled)
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    raise ValueError(f"{self.path} cannot be compiled: {e!r}")
+            except ValueError as e:
+                self.last_error = str(e)
+                raise
+            self._current = compiled
+            self.loaded_at = time.time()
+            self.last_error = None
+            self.reloads += 1
+        logging.info("scoring config loaded", extra={"config_version": version})
+        return True
+
+    def _try(self, compiled) -> None:
+        """Run `dry_run` with the compiled config pinned, before it is swapped in."""
+        if self.dry_run is None:
+            return
+        token = pinned_config_var.set(compiled)
+        try:
+            self.dry_run(compiled)
+        finally:
+            pinned_config_var.reset(token)
+
+    def check(self) -> None:
+        """Reload the file if it changed, at most every `check_interval` seconds."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            if os.stat(self.path).st_mtime_ns != self._mtime:
+                self.reload()
+        except (OSError, ValueError) as e:
+            logging.error(
+                f"Scoring config not reloaded, keeping {self._current.version}: {e}"
+            )
+
+    def current(self):
+        self.check()
+        return self._current
+
+    @contextlib.contextmanager
+    def pinned(self):
+        """Use the current config for everything within the block, even after a reload."""
+        token = pinned_config_var.set(self.current())
+        try:
+            yield
+        finally:
+            pinned_config_var.reset(token)
+
+    def stats(self) -> dict:
+        return {
+            "version": self._current.version,
+            "path": self.path,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,152 @@
+"""
+spaCy-based semantic similarity and requirement matching.
+
+The spaCy pipeline is loaded lazily on first use, so workers that never
+compute similarities do not pay for the model at start-up. Only the tok2vec
+component is loaded; the document vectors used for similarity are built from
+its output, and the remaining components are excluded.
+
+Requirement matching embeds each CV sentence once (batched through
+nlp.pipe), scores all requirement/sentence pairs with one matrix product and
+keeps the best sentence per requirement. Requirement embeddings are cached
+per requirement set.
+"""
+
+import functools
+import logging
+import os
+import re
+import threading
+from typing import List, Tuple
+
+import numpy as np
+
+SPACY_MODEL = os.getenv("SPACY_MODEL", "de_core_news_sm")
+SPACY_ENABLED = os.getenv("SPACY_ENABLED", "true").lower() in ("1", "true", "yes")
+SEMANTIC_BATCH_SIZE = int(os.getenv("SEMANTIC_BATCH_SIZE", "64"))
+
+# Sentence boundaries: end punctuation followed by whitespace, or line breaks
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;])\s+|\n+")
+
+# Components not needed for document vectors
+SPACY_EXCLUDED_COMPONENTS = [
+    "tagger",
+    "morphologizer",
+    "parser",
+    "lemmatizer",
+    "attribute_ruler",
+    "ner",
+    "senter",
+]
+
+_nlp = None
+_nlp_error = None
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
+    """
+    Return the spaCy pipeline, loading it on the first call. Raises
+    RuntimeError if spaCy is disabled or the model is not installed; the
+    failure is remembered so the model is not looked up again on every call.
+    """
+    global _nlp, _nlp_error
+    if _nlp is not None:
+        return _nlp
+    with _nlp_lock:
+        if _nlp is None and _nlp_error is None:
+            if not SPACY_ENABLED:
+                _nlp_error = "spaCy is disabled (SPACY_ENABLED=false)"
+            else:
+                # Imported here so spaCy itself is not loaded at start-up either
+                import spacy
+
+                try:
+                    _nlp = spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDED_COMPONENTS)
+                except OSError:
+                    _nlp_error = (
+                        f"The language model {SPACY_MODEL} is not installed. "
+                        f"Please run: python -m spacy download {SPACY_MODEL}"
+                    )
+                    logging.warning(_nlp_error)
+        if _nlp is None:
+            raise RuntimeError(_nlp_error)
+        return _nlp
+
+
+def calculate_semantic_similarity(cv_text: str, requirement: str) -> float:
+    try:
+        nlp = get_nlp()
+
+        # Verarbeitung der Texte mit spaCy:
+        # Der Text wird in ein Doc-Objekt umgewandelt, das eine Vektorrepräsentation (Embedding) enthält.
+        cv_doc = nlp(cv_text)
+        req_doc = nlp(requirement)
+
+        # Berechnung der Ähnlichkeit als Kosinusähnlichkeit zwischen den Vektoren
+        similarity = cv_doc.similarity(req_doc)
+
+        # Normalisierung des Ähnlichkeitswerts auf einen Prozentbereich (0 bis 100)
+        score = max(min(similarity * 100, 100), 0)
+
+        return score
+    except Exception as e:
+        logging.warning(f"Error calculating similarity: {e}")
+        return 0.0
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split CV text into sentences and lines, dropping fragments without letters."""
+    return [
+        sentence.strip()
+        for sentence in SENTENCE_BOUNDARY.split(text)
+        if any(char.isalpha() for char in sentence)
+    ]
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """
+    Return one L2-normalized document vector per text, as rows of a matrix.
+    Texts without a vector stay all-zero and therefore score 0.
+    """
+    nlp = get_nlp()
+    vectors = np.array(
+        [doc.vector for doc in nlp.pipe(texts, batch_size=SEMANTIC_BATCH_SIZE)],
+        dtype=np.float32,
+    ).reshape(len(texts), -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+@functools.lru_cache(maxsize=256)
+def requirement_embeddings(requirements: Tuple[str, ...]) -> np.ndarray:
+    """Embeddings for a requirement set, computed once per distinct set."""
+    matrix = embed_texts(list(requirements))
+    matrix.setflags(write=False)
+    return matrix
+
+
+def semantic_requirement_scores(cv_text: str, requirements: List[str]) -> List[float]:
+    """
+    Score each requirement from 0 to 100 by its cosine similarity to the
+    best-matching CV sentence.
+    """
+    if not requirements:
+        return []
+    # Repeated lines (headers, footers) only need to be embedded once
+    sentences = list(dict.fromkeys(split_sentences(cv_text)))
+    if not sentences:
+        return [0.0] * len(requirements)
+
+    similarities = requirement_embeddings(tuple(requirements)) @ embed_texts(sentences).T
+    best = np.clip(similarities.max(axis=1) * 100, 0, 100)
+    return [round(float(score), 1) for score in best]
+
+
+def semantic_requirement_matches(cv_text: str, requirements: List[str]) -> List[dict]:
+    """Semantic pre-scores in the shape of the LLM requirement matches."""
+    scores = semantic_requirement_scores(cv_text, requirements)
+    return [
+        {"requirement": requirement, "match_percentage": score}
+        for requirement, score in zip(requirements, scores)
+    ]
@@ -0,0 +1,257 @@
+"""
+Production launcher: pre-forked workers that share the warm read-only state.
+
+    python serve.py --workers 4 --port 8000
+
+The parent process imports main (keyword automata, seniority matrices,
+criteria tables, prompt templates), loads the spaCy pipeline and runs one
+scoring pass, then freezes the garbage collector and forks the workers. The
+workers share those pages copy-on-write instead of each building its own
+copy, as separate `uvicorn --workers` processes do. Everything that must
+not be shared is opened per worker on first use: the LLM connection pool,
+the SQLite connections and the PDF worker threads.
+
+The parent replaces workers that die and logs the memory of every worker
+(RSS, PSS and the shared part) every --stats-interval seconds. Workers that
+die within --min-uptime seconds of their start are replaced with an
+exponential backoff; after --max-fast-failures of them in a row (a worker
+that cannot start, e.g. because of a bad config or database) the launcher
+stops and exits with status 1.
+
+Prometheus metrics run in multiprocess mode: the workers write them to
+files in PROMETHEUS_MULTIPROC_DIR (a fresh temporary directory unless set)
+and /metrics on any worker reports the values of all of them.
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+# Delay before replacing a worker after the first fast failure, doubled for
+# every further one in a row
+RESPAWN_BACKOFF_BASE = 1.0
+RESPAWN_BACKOFF_MAX = 30.0
+
+WARMUP_TEXT = (
+    "Sprachen: Deutsch C2, Englisch fließend. 8 Jahre Beratung SAP IS-U, "
+    "ABAP, S/4HANA Utilities, Marktkommunikation, BPMN, Scrum, Projektleitung."
+)
+
+
+def warm_up() -> None:
+    """Build all lazily created read-only state before forking."""
+    import main
+    import semantic
+
+    skill_levels = main.determine_skill_level(WARMUP_TEXT)
+    main.determine_seniority_level(skill_levels, "consultant")
+    try:
+        semantic.embed_texts([WARMUP_TEXT])
+    except RuntimeError as e:
+        logging.warning(f"Semantic matching not warmed up: {e}")
+    # Objects that survive the warm-up are never scanned by the collector
+    # again, so the workers do not touch (and copy) their pages
+    gc.collect()
+    gc.freeze()
+
+
+def memory_usage(pid: int) -> Dict[str, int]:
+    """RSS, PSS, shared and private memory of a process in bytes (Linux only)."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if value.strip().endswith("kB"):
+                    fields[key] = int(value.split()[0]) * 1024
+    except OSError:
+        return {}
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def prepare_metrics_dir() -> Optional[str]:
+    """
+    Point prometheus_client at an empty multiprocess directory. Must run
+    before main (and so prometheus_client) is imported. Returns the
+    directory if it was created here, to be removed on exit.
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        path = tempfile.mkdtemp(prefix="cv-parser-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+        return path
+    # Files of an earlier run would be added to this one's values
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    return None
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, args) -> None:
+    import uvicorn
+
+    import main
+
+    config = uvicorn.Config(
+        main.app,
+        log_level=args.log_level,
+        access_log=False,
+        timeout_keep_alive=args.keep_alive,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn(sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        # The worker installs its own handlers in uvicorn
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        status = 0
+        try:
+            run_worker(sock, args)
+        except BaseException:
+            logging.exception("Worker crashed")
+            status = 1
+        finally:
+            os._exit(status)
+    return pid
+
+
+def report_memory(workers: Dict[int, float]) -> None:
+    for pid in workers:
+        logging.info("worker memory", extra={"pid": pid, **memory_usage(pid)})
+    logging.info("parent memory", extra={"pid": os.getpid(), **memory_usage(os.getpid())})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WORKERS", str(os.cpu_count() or 1)))
+    )
+    parser.add_argument("--log-level", default="warning", help="uvicorn log level")
+    parser.add_argument("--keep-alive", type=int, default=5)
+    parser.add_argument("--stats-interval", type=float, default=60.0)
+    parser.add_argument(
+        "--min-uptime",
+        type=float,
+        default=10.0,
+        help="seconds a worker must run for its exit not to count as a fast failure",
+    )
+    parser.add_argument(
+        "--max-fast-failures",
+        type=int,
+        default=5,
+        help="fast worker failures in a row after which the launcher gives up",
+    )
+    args = parser.parse_args()
+
+    # Bind before importing main, so a busy port fails fast
+    sock = bind_socket(args.host, args.port)
+    created_metrics_dir = prepare_metrics_dir()
+    # Only importable now, with PROMETHEUS_MULTIPROC_DIR set
+    from prometheus_client import multiprocess
+
+    started = time.perf_counter()
+    warm_up()
+    logging.info(
+        "warmed up", extra={"seconds": round(time.perf_counter() - started, 2), **memory_usage(os.getpid())}
+    )
+
+    # pid -> start time
+    workers = {spawn(sock, args): time.monotonic() for _ in range(args.workers)}
+    # When to start the replacements of dead workers
+    respawn_at = []
+    fast_failures = 0
+    stopping = False
+    failed = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        respawn_at.clear()
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # First report once the workers are up
+    next_report = time.monotonic() + min(args.stats_interval, 10)
+    while workers or respawn_at:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid:
+            started_at = workers.pop(pid, None)
+            # Drops the live gauges of the worker; its counters stay counted
+            multiprocess.mark_process_dead(pid)
+            if stopping:
+                continue
+            if started_at is not None and time.monotonic() - started_at < args.min_uptime:
+                fast_failures += 1
+            else:
+                fast_failures = 0
+            if fast_failures >= args.max_fast_failures:
+                logging.error(
+                    f"{fast_failures} workers in a row exited within {args.min_uptime}s "
+                    "of their start, stopping"
+                )
+                failed = True
+                stop(None, None)
+                continue
+            delay = (
+                min(RESPAWN_BACKOFF_MAX, RESPAWN_BACKOFF_BASE * 2 ** (fast_failures - 1))
+                if fast_failures
+                else 0.0
+            )
+            logging.warning(
+                f"Worker {pid} exited with status {status}, starting a new one in {delay:.1f}s"
+            )
+            respawn_at.append(time.monotonic() + delay)
+            continue
+        now = time.monotonic()
+        for due in [due for due in respawn_at if due <= now]:
+            respawn_at.remove(due)
+            workers[spawn(sock, args)] = now
+        if not stopping and now >= next_report:
+            report_memory(workers)
+            next_report = time.monotonic() + args.stats_interval
+        time.sleep(0.5)
+    sock.close()
+    if created_metrics_dir:
+        shutil.rmtree(created_metrics_dir, ignore_errors=True)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
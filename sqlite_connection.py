@@ -0,0 +1,54 @@
+"""
+Per-process SQLite connections for the stores.
+
+The stores are created when main is imported, which serve.py does before it
+forks its workers, and a SQLite connection must not be used on both sides
+of fork(). ProcessConnection therefore opens a connection for each process
+on its first use there. Every connection is set up the same way: rows as
+sqlite3.Row, WAL journaling (several processes share the files) and the
+store's schema.
+"""
+
+import os
+import sqlite3
+from typing import Callable, Optional
+
+
+class ProcessConnection:
+    def __init__(
+        self,
+        db_path: str,
+        schema: str,
+        setup: Optional[Callable[[sqlite3.Connection], None]] = None,
+        **connect_args,
+    ):
+        self.db_path = db_path
+        self.schema = schema
+        self.setup = setup
+        self.connect_args = connect_args
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        # Opened at once, so a broken database fails at startup
+        self.get()
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, check_same_thread=False, **self.connect_args)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(self.schema)
+        if self.setup is not None:
+            # Pragmas and migrations of the store
+            self.setup(connection)
+        connection.commit()
+        return connection
+
+    def get(self) -> sqlite3.Connection:
+        """The connection of this process, opened on first use."""
+        if self._pid != os.getpid():
+            self._connection = self._open()
+            self._pid = os.getpid()
+        return self._connection
+
+    def close(self) -> None:
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
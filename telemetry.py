@@ -0,0 +1,216 @@
+"""
+Request telemetry: timing spans, Prometheus metrics and structured logs.
+
+Every pipeline stage is timed with `span(stage)` into one histogram labelled
+by stage. Counters and gauges that other components already keep (cache hits,
+LLM tokens, queue depths) are read from their stats() at scrape time by
+StatsCollector, so they are never updated twice.
+
+With PROMETHEUS_MULTIPROC_DIR set (serve.py sets it for its pre-forked
+workers), every process writes its metrics to files in that directory and
+/metrics adds up the values of all workers. The stats of a process are then
+published to those files after each of its requests and before a scrape,
+except for `shared` stats, which every process reads from the same database
+and which are collected at scrape time as before.
+
+Logs are written as one JSON object per line and carry the ID of the request
+they belong to. Debug and info records are sampled per request: with a
+LOG_SAMPLE_RATE of 0.1, all of the records of one request in ten are kept.
+Warnings and errors are always logged.
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import time
+import uuid
+import zlib
+from typing import Callable, Dict, List, Tuple
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+STAGE_SECONDS = Histogram(
+    "cv_parser_stage_duration_seconds",
+    "Duration of the analysis pipeline stages",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+REQUEST_SECONDS = Histogram(
+    "cv_parser_request_duration_seconds",
+    "Duration of HTTP requests",
+    ["method", "path", "status"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+
+@contextlib.contextmanager
+def span(stage: str):
+    """Time the enclosed block as one observation of `stage`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - started)
+
+
+def new_request_id(incoming: str = None) -> str:
+    """Use the caller's request ID if it is sane, else generate one."""
+    if incoming and len(incoming) <= 128 and incoming.isprintable():
+        return incoming
+    return uuid.uuid4().hex
+
+
+class StatsCollector:
+    """
+    Exports values of a component's stats() dict. `counters` and `gauges`
+    map a stats key to (metric name, help text), gauges optionally with the
+    multiprocess mode that combines the values of the workers (default
+    "livesum"). `shared` stats are the same in every process.
+    """
+
+    def __init__(
+        self,
+        stats: Callable[[], dict],
+        counters: Dict[str, Tuple[str, str]] = None,
+        gauges: Dict[str, Tuple[str, ...]] = None,
+        shared: bool = False,
+    ):
+        self.stats = stats
+        self.counters = counters or {}
+        self.gauges = {key: spec[:2] for key, spec in (gauges or {}).items()}
+        self.shared = shared
+        self._published = {}
+        self._counter_metrics = {}
+        self._gauge_metrics = {}
+        if MULTIPROCESS and not shared:
+            # Values go to this process's metric files; registry=None, as
+            # /metrics reads them through a MultiProcessCollector
+            self._counter_metrics = {
+                key: Counter(name, documentation, registry=None)
+                for key, (name, documentation) in self.counters.items()
+            }
+            self._gauge_metrics = {
+                key: Gauge(
+                    spec[0],
+                    spec[1],
+                    registry=None,
+                    multiprocess_mode=spec[2] if len(spec) > 2 else "livesum",
+                )
+                for key, spec in (gauges or {}).items()
+            }
+
+    def publish(self) -> None:
+        """Write the current stats to the metric files (multiprocess mode)."""
+        stats = self.stats()
+        for key, counter in self._counter_metrics.items():
+            # Counters only move up, by what was added since the last publish
+            counter.inc(max(stats[key] - self._published.get(key, 0), 0))
+            self._published[key] = stats[key]
+        for key, gauge in self._gauge_metrics.items():
+            gauge.set(stats[key])
+
+    def describe(self):
+        # The registry learns the names from here instead of calling stats()
+        for name, documentation in self.counters.values():
+            yield CounterMetricFamily(name, documentation)
+        for name, documentation in self.gauges.values():
+            yield GaugeMetricFamily(name, documentation)
+
+    def collect(self):
+        stats = self.stats()
+        for key, (name, documentation) in self.counters.items():
+            yield CounterMetricFamily(name, documentation, value=stats[key])
+        for key, (name, documentation) in self.gauges.items():
+            yield GaugeMetricFamily(name, documentation, value=stats[key])
+
+
+_stats_collectors: List[StatsCollector] = []
+
+
+def register_stats(collector: StatsCollector) -> None:
+    """Export a component's stats at /metrics (see latest_metrics)."""
+    _stats_collectors.append(collector)
+    if not MULTIPROCESS:
+        REGISTRY.register(collector)
+
+
+def publish_stats() -> None:
+    """Write this process's stats to the multiprocess metric files, if in use."""
+    if MULTIPROCESS:
+        for collector in _stats_collectors:
+            if not collector.shared:
+                collector.publish()
+
+
+def latest_metrics() -> bytes:
+    """The metrics of this process, or in multiprocess mode of all workers."""
+    if not MULTIPROCESS:
+        return generate_latest(REGISTRY)
+    publish_stats()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in _stats_collectors:
+        if collector.shared:
+            registry.register(collector)
+    return generate_latest(registry)
+
+
+class RequestSampler(logging.Filter):
+    """Keeps all records of a sampled request, and every warning or error."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        if record.levelno >= logging.WARNING or LOG_SAMPLE_RATE >= 1:
+            return True
+        key = record.request_id or f"{record.process}:{record.thread}"
+        return zlib.crc32(key.encode()) / 2**32 < LOG_SAMPLE_RATE
+
+
+class JsonFormatter(logging.Formatter):
+    # Attributes every LogRecord has; anything else was passed via `extra`
+    STANDARD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "request_id"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        entry.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in self.STANDARD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging() -> None:
+    """Send all records through the JSON formatter and the request sampler."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(RequestSampler())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)